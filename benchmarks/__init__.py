@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Performance benchmarks. Run from the repository root, e.g. python -m benchmarks.db_bench."""
@@ -0,0 +1,171 @@
+# benchmarks/concurrency_stress.py
+"""
+Concurrent payroll run writers, in separate processes, against one database.
+Every worker tries to pay the same employees for the same months (each on its
+own day of the month), through add_payroll_run and add_payroll_runs_batch, so
+the one-run-per-month and chronological-order checks race constantly. Reports
+throughput and latency, then checks the saved history and exits non-zero if
+any employee was paid twice in a month, pay dates went backwards, a reported
+save is missing, or a "database is locked" error reached a caller.
+
+    python -m benchmarks.concurrency_stress
+    python -m benchmarks.concurrency_stress --workers 16 --busy-timeout 0.01   # exercise the retries
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from db import database, generate
+from logic.payroll_calc import compute_payroll
+
+DEFAULT_WORKERS = 8
+DEFAULT_EMPLOYEES = 20
+DEFAULT_MONTHS = 12
+YEAR = 2025
+# Every BATCH_EVERY-th worker saves each month as one add_payroll_runs_batch call
+BATCH_EVERY = 4
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def worker(number, db_path, employee_ids, months, busy_timeout, seed, start, results):
+    """Pay every employee for every month, in order, and report what happened to each attempt."""
+    database.DB_PATH = db_path
+    if busy_timeout is not None:
+        database.BUSY_TIMEOUT = busy_timeout
+    rng = random.Random(seed + number)
+    payroll_data = compute_payroll(3000.0, "ON", 12)
+    use_batch = number % BATCH_EVERY == BATCH_EVERY - 1
+    counts = {"saved": 0, "refused": 0, "locked": 0, "other": 0}
+    saved, latencies, errors = [], [], []
+
+    def attempt(call, saves):
+        began = time.perf_counter()
+        try:
+            call()
+            counts["saved"] += len(saves)
+            saved.extend(saves)
+        except ValueError:
+            counts["refused"] += 1
+        except sqlite3.OperationalError as e:
+            counts["locked" if "locked" in str(e) or "busy" in str(e) else "other"] += 1
+            errors.append(str(e))
+        except Exception as e:
+            counts["other"] += 1
+            errors.append(f"{type(e).__name__}: {e}")
+        latencies.append(time.perf_counter() - began)
+
+    start.wait()
+    began = time.perf_counter()
+    for month in range(1, months + 1):
+        # Workers pay on different days, so a late worker's date can be earlier than a saved one
+        pay_date = f"{YEAR}-{month:02d}-{1 + number % 28:02d}"
+        if use_batch:
+            chosen = rng.sample(employee_ids, max(1, len(employee_ids) // 4))
+            attempt(lambda: database.add_payroll_runs_batch(pay_date, [(e, payroll_data, 12) for e in chosen]),
+                    [(e, pay_date) for e in chosen])
+        else:
+            for employee_id in rng.sample(employee_ids, len(employee_ids)):
+                attempt(lambda: database.add_payroll_run(employee_id, pay_date, payroll_data, 12),
+                        [(employee_id, pay_date)])
+    results.put({"counts": counts, "saved": saved, "latencies": latencies, "errors": errors[:5],
+                 "seconds": time.perf_counter() - began})
+
+
+def check_history(db_path, saved) -> list:
+    """Problems with the payroll runs saved in db_path, given every (employee_id, pay_date) reported saved."""
+    conn = sqlite3.connect(db_path)
+    problems = []
+    for employee_id, month, count in conn.execute("""
+        SELECT employee_id, substr(pay_date, 1, 7), COUNT(*) FROM payroll_runs
+        GROUP BY 1, 2 HAVING COUNT(*) > 1
+    """):
+        problems.append(f"employee {employee_id} has {count} payroll runs in {month}")
+    latest = {}
+    for employee_id, pay_date in conn.execute("SELECT employee_id, pay_date FROM payroll_runs ORDER BY id"):
+        if pay_date < latest.get(employee_id, ""):
+            problems.append(f"employee {employee_id} was paid on {pay_date} after {latest[employee_id]}")
+        latest[employee_id] = max(pay_date, latest.get(employee_id, ""))
+    stored = sorted(conn.execute("SELECT employee_id, pay_date FROM payroll_runs"))
+    conn.close()
+    if stored != sorted(saved):
+        problems.append(f"workers reported {len(saved)} saved runs but the table holds {len(stored)} "
+                        f"({len(set(saved) - set(stored))} missing, {len(set(stored) - set(saved))} unreported)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.concurrency_stress",
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="writer processes")
+    parser.add_argument("--employees", type=int, default=DEFAULT_EMPLOYEES)
+    parser.add_argument("--months", type=int, default=DEFAULT_MONTHS, choices=range(1, 13), metavar="1-12")
+    parser.add_argument("--busy-timeout", type=float, help="seconds each connection waits for a lock "
+                        f"(default: db.database.BUSY_TIMEOUT, {database.BUSY_TIMEOUT})")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "db", "payroll.db")
+        database.DB_PATH = db_path
+        database.init_db()
+        rng = random.Random(args.seed)
+        employees = generate.generate_employees(rng, args.employees, args.months)
+        employee_ids = [database.add_employee(name, sin, province, salary)
+                        for name, sin, province, salary, _, _ in employees]
+
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker, args=(number, db_path, employee_ids, args.months,
+                                                                  args.busy_timeout, args.seed, start, results))
+                     for number in range(args.workers)]
+        for process in processes:
+            process.start()
+        began = time.perf_counter()
+        start.set()
+        reports = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - began
+        for process in processes:
+            process.join()
+
+        counts = {key: sum(report["counts"][key] for report in reports) for key in reports[0]["counts"]}
+        saved = [tuple(run) for report in reports for run in report["saved"]]
+        latencies = sorted(latency for report in reports for latency in report["latencies"])
+        attempts = len(latencies)
+        print(f"{args.workers} workers, {args.employees} employees, {args.months} months, "
+              f"SQLite {sqlite3.sqlite_version}, {os.cpu_count()} CPUs")
+        print(f"  attempts   {attempts:8,}  ({attempts / elapsed:,.0f}/s)")
+        print(f"  saved      {counts['saved']:8,}  ({counts['saved'] / elapsed:,.0f} runs/s)")
+        print(f"  refused    {counts['refused']:8,}  (already paid that month, or a later date saved)")
+        print(f"  locked     {counts['locked']:8,}")
+        print(f"  other      {counts['other']:8,}")
+        print(f"  latency    p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms" if latencies else "  latency    -")
+
+        problems = check_history(db_path, saved)
+        if counts["locked"] or counts["other"]:
+            problems.append(f"{counts['locked'] + counts['other']} writes failed with an error, e.g. "
+                            + next(error for report in reports for error in report["errors"]))
+        if not counts["saved"]:
+            problems.append("no payroll run was saved")
+    for problem in problems[:20]:
+        print(f"  FAIL: {problem}")
+    if problems:
+        return 1
+    print("  OK: one run per employee per month, pay dates in order, every save accounted for")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# benchmarks/db_bench.py
+"""
+Database-layer benchmark at increasing database sizes.
+Builds (and caches) synthetic databases with db.generate, then times the main
+db.database operations at each size, reports p50/p95/p99 and query plans, and
+shows how each operation scales. Results are compared with a stored baseline
+so regressions are caught before release.
+
+    python -m benchmarks.db_bench                       # 10k, 100k and 1M payroll runs
+    python -m benchmarks.db_bench --sizes 10000 --quick
+    python -m benchmarks.db_bench --save-baseline       # after an intended change
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from db import database, generate, sql_trace
+from logic.payroll_calc import compute_payroll
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Years of history in the generated databases; employees are chosen to reach each size
+HISTORY_YEARS = 2
+# Calls per operation, and the most time spent on one operation at one size
+ITERATIONS = 200
+# Untimed calls first, so every operation is measured with a warm page cache
+WARMUP = 3
+TIME_LIMIT = 10.0
+# A best time slower than baseline by this factor (and by at least REGRESSION_MIN_MS) is a regression.
+# Best times are compared because they are far less noisy than percentiles on a busy machine.
+REGRESSION_FACTOR = 1.5
+REGRESSION_MIN_MS = 0.5
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def build_database(rows: int, work_dir: str, seed: int) -> str:
+    """Return the path of a generated database with about rows payroll runs, building it if needed."""
+    path = os.path.join(work_dir, f"payroll_{rows}_{seed}.db")
+    if not os.path.exists(path):
+        # About 15% of employees are hired part way through, so they have fewer months of history
+        employees = max(1, round(rows / (HISTORY_YEARS * 12 * 0.85)))
+        print(f"Building {path} ({employees:,} employees)...", file=sys.stderr)
+        generate.generate(path, employees, HISTORY_YEARS, 2024, seed)
+    return path
+
+
+class Sample:
+    """Employees, SINs and dates picked from a database to drive the operations."""
+    def __init__(self, path: str, rng: random.Random):
+        conn = sqlite3.connect(path)
+        self.employees = conn.execute("""
+            SELECT e.id, e.sin, e.province, MAX(p.pay_date)
+            FROM employees e JOIN payroll_runs p ON p.employee_id = e.id
+            GROUP BY e.id
+        """).fetchall()
+        self.dates = [row[0] for row in conn.execute("SELECT DISTINCT pay_date FROM payroll_runs")]
+        self.max_run_id = conn.execute("SELECT MAX(id) FROM payroll_runs").fetchone()[0]
+        conn.close()
+        self.rng = rng
+
+    def employee(self):
+        return self.rng.choice(self.employees)
+
+
+def operations(sample: Sample):
+    """Return [(name, make_args, call, iterations)]; make_args runs outside the timed call."""
+    payroll = compute_payroll(4000.0, "ON", 12)
+
+    def next_month(employee):
+        year, month = int(employee[3][:4]), int(employee[3][5:7])
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return f"{year:04d}-{month:02d}-15"
+
+    return [
+        ("add_payroll_run", lambda: (sample.employee(),),
+         lambda employee: database.add_payroll_run(employee[0], next_month(employee), payroll, 12), ITERATIONS),
+        ("get_ytd_contributions", lambda: (sample.employee()[0], sample.rng.choice(sample.dates)),
+         database.get_ytd_contributions, ITERATIONS),
+        ("get_payroll_runs_by_year", lambda: (sample.employee()[0], int(sample.rng.choice(sample.dates)[:4])),
+         database.get_payroll_runs_by_year, ITERATIONS),
+        ("check_sin_exists", lambda: (sample.employee()[1],), database.check_sin_exists, ITERATIONS),
+        ("get_all_payroll_runs", lambda: (), database.get_all_payroll_runs, 5),
+    ]
+
+
+def query_plans(call, args) -> list:
+    """EXPLAIN QUERY PLAN for each distinct statement one call runs (its own connection)."""
+    with sql_trace.trace() as recorded:
+        call(*args)
+    plans, seen = [], set()
+    conn = sqlite3.connect(database.DB_PATH)
+    for statement in recorded.statements:
+        shape = statement.shape
+        if shape in seen or shape.startswith(("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "INSERT")):
+            continue
+        seen.add(shape)
+        steps = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement.sql)]
+        plans.append({"statement": shape, "plan": steps})
+    conn.close()
+    return plans
+
+
+def run_size(path: str, seed: int, iterations_scale: float) -> dict:
+    """Time every operation against one database. Rows added by add_payroll_run are removed afterwards."""
+    database.DB_PATH = path
+    sample = Sample(path, random.Random(seed))
+    results = {}
+    for name, make_args, call, iterations in operations(sample):
+        iterations = max(3, int(iterations * iterations_scale))
+        if name != "add_payroll_run":
+            for _ in range(min(WARMUP, iterations)):
+                call(*make_args())
+        timings = []
+        deadline = time.perf_counter() + TIME_LIMIT
+        plan_args = None
+        for _ in range(iterations):
+            args = make_args()
+            start = time.perf_counter()
+            try:
+                call(*args)
+            except ValueError:
+                # add_payroll_run picked an employee already paid next month; not a timing sample
+                continue
+            timings.append(time.perf_counter() - start)
+            plan_args = plan_args or args
+            if time.perf_counter() > deadline:
+                break
+        if name == "add_payroll_run":
+            conn = sqlite3.connect(path)
+            conn.execute("DELETE FROM payroll_runs WHERE id > ?", (sample.max_run_id,))
+            conn.commit()
+            conn.close()
+            plans = []
+        else:
+            plans = query_plans(call, plan_args or make_args())
+        timings.sort()
+        results[name] = {
+            "iterations": len(timings),
+            "min_ms": round(timings[0] * 1000, 4) if timings else 0.0,
+            "p50_ms": round(percentile(timings, 0.50) * 1000, 4),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 4),
+            "p99_ms": round(percentile(timings, 0.99) * 1000, 4),
+            "plans": plans,
+        }
+    return results
+
+
+def scaling_report(report: dict) -> str:
+    """p50 per operation and size, with how much it grows per 10x more rows."""
+    sizes = sorted(report["sizes"], key=int)
+    names = list(report["sizes"][sizes[0]])
+    header = f"{'Operation':<26}" + "".join(f"{int(size):>18,}" for size in sizes) + f"{'Growth/10x':>18}"
+    lines = ["DB BENCHMARK (p50 / p99 ms by payroll_runs rows)", "=" * len(header), header]
+    for name in names:
+        cells = "".join(f"{report['sizes'][size][name]['p50_ms']:.2f} / {report['sizes'][size][name]['p99_ms']:.2f}"
+                        .rjust(18) for size in sizes)
+        growth = ""
+        if len(sizes) > 1:
+            first, last = report["sizes"][sizes[0]][name]["p50_ms"], report["sizes"][sizes[-1]][name]["p50_ms"]
+            decades = math.log10(int(sizes[-1]) / int(sizes[0]))
+            ratio = (last / first) ** (1 / decades) if first > 0 else 0.0
+            growth = f"{ratio:.1f}x" + (" (linear)" if ratio >= 5 else "")
+        lines.append(f"{name:<26}{cells}{growth:>18}")
+    for size in sizes:
+        lines += ["", f"Query plans at {int(size):,} rows"]
+        for name in names:
+            for entry in report["sizes"][size][name]["plans"]:
+                lines.append(f"  {name}: {'; '.join(entry['plan'])}")
+    return "\n".join(lines)
+
+
+def compare_with_baseline(report: dict, baseline: dict) -> list:
+    """Return a line for each operation whose best time regressed against the baseline."""
+    regressions = []
+    for size, operations_at_size in report["sizes"].items():
+        for name, result in operations_at_size.items():
+            previous = baseline.get("sizes", {}).get(size, {}).get(name)
+            if not previous:
+                continue
+            limit = max(previous["min_ms"] * REGRESSION_FACTOR, previous["min_ms"] + REGRESSION_MIN_MS)
+            if result["min_ms"] > limit:
+                regressions.append(f"{name} at {int(size):,} rows: best {result['min_ms']:.3f} ms "
+                                   f"vs baseline {previous['min_ms']:.3f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.db_bench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="payroll_runs rows per database")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "payroll-bench"),
+                        help="where generated databases are cached")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="a tenth of the iterations")
+    parser.add_argument("--json", metavar="PATH", help="write the full report as JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline report to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    report = {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "sqlite": sqlite3.sqlite_version, "cpus": os.cpu_count()},
+        "sizes": {},
+    }
+    for rows in args.sizes:
+        path = build_database(rows, args.work_dir, args.seed)
+        print(f"Timing {rows:,} rows...", file=sys.stderr)
+        report["sizes"][str(rows)] = run_size(path, args.seed, 0.1 if args.quick else 1.0)
+
+    print(scaling_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline)
+        print(f"\nCompared with baseline from {baseline['machine']['platform']} "
+              f"(Python {baseline['machine']['python']}, SQLite {baseline['machine']['sqlite']})")
+        for line in regressions:
+            print(f"  REGRESSION: {line}")
+        if regressions:
+            return 1
+        print("  No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# benchmarks/startup_bench.py
+"""
+Startup-time benchmark for the desktop app and the command line.
+Times a cold start of each as a fresh process: until the first window is drawn
+(main.py) and until the first command result is printed (python -m payroll),
+breaks import time down per module with python -X importtime, and fails if
+either start is over its budget or a module that is meant to be imported on
+demand has crept back onto the startup path.
+
+    python -m benchmarks.startup_bench
+    python -m benchmarks.startup_bench --runs 20 --json startup.json
+    python -m benchmarks.startup_bench --binary dist/PayrollCalculator   # PyInstaller build
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The command timed for time-to-first-CLI-result; it needs no database
+CLI_COMMAND = ["-m", "payroll", "compute", "--gross", "3000", "--province", "ON"]
+# Printed by main.py (PAYROLL_STARTUP_REPORT) once the first screen has been drawn
+FIRST_WINDOW_MARK = "first screen shown"
+
+# Median wall time budgets, from process start, in milliseconds
+CLI_BUDGET_MS = 250
+GUI_BUDGET_MS = 1500
+# Cumulative import time budgets for each entry point, in milliseconds
+IMPORT_BUDGETS_MS = {"payroll.cli": 60, "main": 80}
+# Modules each start must not import; they are loaded on first use
+DEFERRED_MODULES = {
+    "cli": ["tkinter", "ui", "db.database", "utils.profiling", "logic.pay_stub_generator"],
+    "gui": ["utils.profiling", "db.sql_trace", "logic.pay_stub_generator", "multiprocessing",
+            "concurrent.futures"],
+}
+# Rows shown in each import breakdown
+REPORT_ROWS = 15
+# Seconds before a start that never reaches its first result counts as hung
+START_TIMEOUT = 60
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parse python -X importtime output into [{module, self_ms, cumulative_ms, depth}] in import order."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({"module": name, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    return modules
+
+
+def import_breakdown(args: list, env: dict = None) -> list:
+    """Run the interpreter with -X importtime and the given arguments and return the parsed imports."""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=START_TIMEOUT)
+    return parse_importtime(result.stderr)
+
+
+def time_cli(runs: int, command: list) -> list:
+    """Wall seconds from process start to exit for each run of a CLI command."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, timeout=START_TIMEOUT)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} failed:\n{result.stderr.strip()}")
+        timings.append(elapsed)
+    return timings
+
+
+def time_first_window(runs: int, command: list) -> list:
+    """
+    Wall seconds from process start until the app reports its first screen, for each run.
+    Each run uses an empty database in a temporary directory so it is a true cold start.
+    Returns [] when no window can be opened (no display).
+    """
+    env = dict(os.environ, PAYROLL_STARTUP_REPORT="1", PAYROLL_EXIT_AFTER_STARTUP="1")
+    timings = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as work_dir:
+            # The app keeps its database at db/payroll.db relative to the working directory
+            os.makedirs(os.path.join(work_dir, "db"))
+            start = time.perf_counter()
+            process = subprocess.Popen(command, cwd=work_dir, env=env, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, text=True)
+            elapsed = None
+            for line in process.stdout:
+                if FIRST_WINDOW_MARK in line and elapsed is None:
+                    elapsed = time.perf_counter() - start
+            _, stderr = process.communicate(timeout=START_TIMEOUT)
+            if elapsed is None:
+                if "TclError" in stderr and "display" in stderr:
+                    return []
+                raise RuntimeError(f"{' '.join(command)} exited without showing a window:\n{stderr.strip()}")
+            timings.append(elapsed)
+    return timings
+
+
+def summarize(timings: list) -> dict:
+    if not timings:
+        return {"runs": 0}
+    return {"runs": len(timings), "min_ms": round(min(timings) * 1000, 1),
+            "median_ms": round(statistics.median(timings) * 1000, 1), "max_ms": round(max(timings) * 1000, 1)}
+
+
+def deferred_violations(entry_point: str, modules: list) -> list:
+    """Modules that should load on demand but were imported at startup (including their submodules)."""
+    imported = {entry["module"] for entry in modules}
+    return sorted(name for name in DEFERRED_MODULES[entry_point]
+                  if name in imported or any(module.startswith(name + ".") for module in imported))
+
+
+def format_breakdown(title: str, modules: list) -> list:
+    """The slowest imports by cumulative time, with their own (self) time."""
+    total = sum(entry["self_ms"] for entry in modules)
+    lines = ["", f"{title}: {len(modules)} modules, {total:.1f} ms",
+             f"{'Module':<48}{'Self ms':>10}{'Cumulative ms':>15}"]
+    for entry in sorted(modules, key=lambda item: -item["cumulative_ms"])[:REPORT_ROWS]:
+        name = "  " * min(entry["depth"], 4) + entry["module"]
+        lines.append(f"{name[:47]:<48}{entry['self_ms']:>10.1f}{entry['cumulative_ms']:>15.1f}")
+    return lines
+
+
+def check_budgets(report: dict, cli_budget_ms: float, gui_budget_ms: float) -> list:
+    """Return a line for each budget the report goes over."""
+    problems = []
+    cli, gui = report["cli"], report["gui"]
+    if cli["runs"] and cli["median_ms"] > cli_budget_ms:
+        problems.append(f"first CLI result took {cli['median_ms']:.0f} ms (budget {cli_budget_ms:.0f} ms)")
+    if gui["runs"] and gui["median_ms"] > gui_budget_ms:
+        problems.append(f"first window took {gui['median_ms']:.0f} ms (budget {gui_budget_ms:.0f} ms)")
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        spent = report["imports"].get(module)
+        if spent is not None and spent > budget:
+            problems.append(f"importing {module} took {spent:.1f} ms (budget {budget} ms)")
+    for entry_point, modules in report["deferred_violations"].items():
+        for module in modules:
+            problems.append(f"{module} is imported at {entry_point} startup; it should be imported on first use")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup_bench",
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="cold starts timed for each entry point (default 10)")
+    parser.add_argument("--binary", help="time this packaged app (e.g. the PyInstaller build) instead of main.py")
+    parser.add_argument("--cli-budget-ms", type=float, default=CLI_BUDGET_MS)
+    parser.add_argument("--gui-budget-ms", type=float, default=GUI_BUDGET_MS)
+    parser.add_argument("--json", metavar="PATH", help="write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    print("Timing interpreter start...", file=sys.stderr)
+    interpreter = summarize(time_cli(args.runs, [sys.executable, "-c", "pass"]))
+    print("Timing first CLI result...", file=sys.stderr)
+    cli = summarize(time_cli(args.runs, [sys.executable] + CLI_COMMAND))
+    print("Timing first window...", file=sys.stderr)
+    app_command = [os.path.abspath(args.binary)] if args.binary else [sys.executable, os.path.join(ROOT, "main.py")]
+    gui = summarize(time_first_window(args.runs, app_command))
+
+    cli_imports = import_breakdown(CLI_COMMAND)
+    gui_imports = import_breakdown(["-c", "import main"])
+    cumulative = {entry["module"]: entry["cumulative_ms"] for entry in cli_imports + gui_imports}
+    report = {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "interpreter": interpreter,
+        "cli": cli,
+        "gui": gui,
+        "imports": {module: cumulative.get(module) for module in IMPORT_BUDGETS_MS},
+        "deferred_violations": {"cli": deferred_violations("cli", cli_imports),
+                                "gui": deferred_violations("gui", gui_imports)},
+        "import_breakdown": {"cli": cli_imports, "gui": gui_imports},
+    }
+
+    lines = ["STARTUP BENCHMARK (wall ms from process start)", "=" * 73,
+             f"{'Start':<28}{'Runs':>6}{'Min':>9}{'Median':>9}{'Max':>9}{'Budget':>12}"]
+    for label, result, budget in [("Interpreter only", interpreter, ""),
+                                  ("First CLI result", cli, f"{args.cli_budget_ms:.0f}"),
+                                  ("First window", gui, f"{args.gui_budget_ms:.0f}")]:
+        if result["runs"]:
+            lines.append(f"{label:<28}{result['runs']:>6}{result['min_ms']:>9.1f}{result['median_ms']:>9.1f}"
+                         f"{result['max_ms']:>9.1f}{budget:>12}")
+        else:
+            lines.append(f"{label:<28}  skipped (no display)")
+    lines += format_breakdown("CLI imports (python -m payroll compute)", cli_imports)
+    lines += format_breakdown("App imports (import main)", gui_imports)
+    print("\n".join(lines))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    problems = check_budgets(report, args.cli_budget_ms, args.gui_budget_ms)
+    print()
+    for line in problems:
+        print(f"  OVER BUDGET: {line}")
+    if problems:
+        return 1
+    print("  Within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
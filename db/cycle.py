@@ -0,0 +1,223 @@
+# db/cycle.py
+"""
+Payroll cycles: every employee's run for one pay date, saved as a unit.
+A cycle is recorded in payroll_cycles before any run is written, then all its
+runs are inserted in one transaction, a chunk at a time under a savepoint,
+and committed once at the end together with the cycle's final status. If the
+process dies part way, SQLite discards the uncommitted runs and the cycle is
+left "running": saving the same pay date again resumes it. A saved cycle can
+be rolled back as a whole while none of its employees has been paid since.
+"""
+import sqlite3
+from db.database import _INSERT_PAYROLL_RUN, _payroll_run_values, _write_transaction, get_connection
+
+# Runs inserted per savepoint
+CHUNK_SIZE = 1000
+
+# payroll_cycles.status values
+CYCLE_RUNNING = "running"        # started and not finished; the process may have died
+CYCLE_COMPLETED = "completed"    # every employee paid
+CYCLE_PARTIAL = "partial"        # saved with partial=True, some employees not paid (see error)
+CYCLE_FAILED = "failed"          # nothing saved by the last attempt (see error)
+CYCLE_ROLLED_BACK = "rolled_back"
+# Statuses a new save of the same pay date picks up where they left off
+_RESUMABLE = (CYCLE_RUNNING, CYCLE_PARTIAL, CYCLE_FAILED)
+
+CYCLE_FIELDS = ["id", "pay_date", "status", "employee_count", "saved_count", "already_paid_count",
+                "failed_count", "attempts", "error", "started_at", "finished_at"]
+
+
+def _max_run_id(cursor) -> int:
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM payroll_runs")
+    return cursor.fetchone()[0]
+
+
+class PayrollCycle:
+    """
+    One pay date's payroll runs for many employees.
+    save() writes them all in one transaction and records the outcome in payroll_cycles;
+    rollback() deletes the runs of a saved cycle.
+    """
+
+    def __init__(self, pay_date: str, chunk_size: int = CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.pay_date = pay_date
+        self.chunk_size = chunk_size
+        self.id = None
+
+    def _latest(self, cursor):
+        cursor.execute("SELECT * FROM payroll_cycles WHERE pay_date = ? ORDER BY id DESC LIMIT 1",
+                       (self.pay_date,))
+        return cursor.fetchone()
+
+    def _start(self, employee_count: int) -> bool:
+        """Record the cycle as running before any run is written; True if it resumes an unfinished one."""
+        def start(cursor):
+            cycle = self._latest(cursor)
+            if cycle and cycle['status'] == CYCLE_COMPLETED:
+                raise ValueError(f"The payroll cycle for {self.pay_date} has already been saved. "
+                                 f"Roll it back first to run it again.")
+            if cycle and cycle['status'] in _RESUMABLE:
+                cursor.execute("""
+                    UPDATE payroll_cycles
+                    SET status = ?, employee_count = ?, attempts = attempts + 1, error = NULL, finished_at = NULL
+                    WHERE id = ?
+                """, (CYCLE_RUNNING, employee_count, cycle['id']))
+                return cycle['id'], True
+            cursor.execute("INSERT INTO payroll_cycles (pay_date, status, employee_count) VALUES (?, ?, ?)",
+                           (self.pay_date, CYCLE_RUNNING, employee_count))
+            return cursor.lastrowid, False
+
+        self.id, resumed = _write_transaction(start)
+        return resumed
+
+    def save(self, runs: list, partial: bool = False) -> dict:
+        """
+        Save runs, a list of (employee_id, payroll_data, period_count) tuples, all paid on pay_date.
+        The one-per-month and chronological-order rules of add_payroll_runs_batch apply, except that
+        when resuming, employees already paid on this pay date are left as they are.
+        If any employee breaks them, nothing is saved and ValueError is raised; with partial=True the
+        others are saved and the cycle is marked partial, so saving it again later pays the rest.
+        Returns {"cycle_id", "status", "resumed", "saved": count, "already_paid": [employee_id],
+        "failed": [(employee_id, reason)]}.
+        """
+        resumed = self._start(len(runs))
+
+        def save(cursor):
+            # Latest pay date per employee, in one query
+            cursor.execute("""
+                SELECT employee_id, MAX(pay_date) as latest_date
+                FROM payroll_runs
+                GROUP BY employee_id
+            """)
+            latest_dates = {row['employee_id']: row['latest_date'] for row in cursor.fetchall()}
+
+            year_month = self.pay_date[:7]
+            pending, already_paid, failed = [], [], []
+            for employee_id, payroll_data, period_count in runs:
+                latest_date = latest_dates.get(employee_id)
+                if resumed and latest_date == self.pay_date:
+                    already_paid.append(employee_id)
+                elif latest_date and latest_date[:7] == year_month:
+                    failed.append((employee_id, f"a payroll run already exists in {year_month}"))
+                elif latest_date and self.pay_date < latest_date:
+                    failed.append((employee_id, f"pay date {self.pay_date} is earlier than the most recent "
+                                                f"payroll run ({latest_date})"))
+                else:
+                    pending.append(_payroll_run_values(employee_id, self.pay_date, payroll_data, period_count))
+            if failed and not partial:
+                raise ValueError("Payroll cycle not saved. Each employee can only have one payroll run per month, "
+                                 "and payroll runs must be in chronological order.\n"
+                                 + "\n".join(f"Employee {employee_id}: {reason}." for employee_id, reason in failed))
+
+            saved = 0
+            for start in range(0, len(pending), self.chunk_size):
+                chunk = pending[start:start + self.chunk_size]
+                first_id = _max_run_id(cursor) + 1
+                cursor.execute("SAVEPOINT cycle_chunk")
+                try:
+                    cursor.executemany(_INSERT_PAYROLL_RUN, chunk)
+                    count = len(chunk)
+                except sqlite3.IntegrityError:
+                    if not partial:
+                        raise
+                    # Undo the chunk and insert it row by row, keeping every run that can be saved
+                    cursor.execute("ROLLBACK TO cycle_chunk")
+                    count = 0
+                    for values in chunk:
+                        cursor.execute("SAVEPOINT cycle_run")
+                        try:
+                            cursor.execute(_INSERT_PAYROLL_RUN, values)
+                            count += 1
+                        except sqlite3.IntegrityError as e:
+                            cursor.execute("ROLLBACK TO cycle_run")
+                            failed.append((values[0], str(e)))
+                        cursor.execute("RELEASE cycle_run")
+                cursor.execute("RELEASE cycle_chunk")
+                if count:
+                    cursor.execute("""
+                        INSERT INTO payroll_cycle_chunks (cycle_id, first_run_id, last_run_id, run_count)
+                        VALUES (?, ?, ?, ?)
+                    """, (self.id, first_id, _max_run_id(cursor), count))
+                saved += count
+
+            status = CYCLE_PARTIAL if failed else CYCLE_COMPLETED
+            error = "; ".join(f"employee {employee_id}: {reason}" for employee_id, reason in failed) or None
+            cursor.execute("""
+                UPDATE payroll_cycles
+                SET status = ?, saved_count = saved_count + ?, already_paid_count = ?, failed_count = ?,
+                    error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (status, saved, len(already_paid), len(failed), error, self.id))
+            return {"cycle_id": self.id, "status": status, "resumed": resumed, "saved": saved,
+                    "already_paid": already_paid, "failed": failed}
+
+        try:
+            return _write_transaction(save)
+        except Exception as e:
+            # The runs were rolled back with the transaction; keep a record of why
+            _write_transaction(lambda cursor: cursor.execute("""
+                UPDATE payroll_cycles SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (CYCLE_FAILED, str(e), self.id)))
+            if isinstance(e, sqlite3.IntegrityError):
+                raise ValueError(f"Payroll cycle not saved. {e}") from e
+            raise
+
+    def rollback(self) -> int:
+        """
+        Delete every run the latest cycle for pay_date saved and mark it rolled back.
+        Raises ValueError if there is no such cycle, or if one of its employees has been paid since
+        (removing the run would break their later YTD). Returns the number of runs deleted.
+        """
+        def rollback(cursor):
+            cycle = self._latest(cursor)
+            if not cycle or cycle['status'] == CYCLE_ROLLED_BACK:
+                raise ValueError(f"There is no saved payroll cycle for {self.pay_date} to roll back.")
+            self.id = cycle['id']
+            runs_of_cycle = """
+                SELECT run.id, run.employee_id FROM payroll_runs run
+                JOIN payroll_cycle_chunks chunk
+                    ON run.id BETWEEN chunk.first_run_id AND chunk.last_run_id
+                WHERE chunk.cycle_id = ? AND run.pay_date = ?
+            """
+            cursor.execute(f"""
+                SELECT COUNT(DISTINCT cycle_run.employee_id) FROM ({runs_of_cycle}) cycle_run
+                JOIN payroll_runs later
+                    ON later.employee_id = cycle_run.employee_id AND later.pay_date > ?
+            """, (self.id, self.pay_date, self.pay_date))
+            paid_since = cursor.fetchone()[0]
+            if paid_since:
+                raise ValueError(f"The payroll cycle for {self.pay_date} can't be rolled back: "
+                                 f"{paid_since} of its employee(s) have been paid since.")
+            cursor.execute(f"DELETE FROM payroll_runs WHERE id IN (SELECT id FROM ({runs_of_cycle}))",
+                           (self.id, self.pay_date))
+            deleted = cursor.rowcount
+            cursor.execute("DELETE FROM payroll_cycle_chunks WHERE cycle_id = ?", (self.id,))
+            cursor.execute("""
+                UPDATE payroll_cycles SET status = ?, error = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (CYCLE_ROLLED_BACK, self.id))
+            return deleted
+
+        return _write_transaction(rollback)
+
+
+def save_payroll_cycle(pay_date: str, runs: list, partial: bool = False) -> dict:
+    """PayrollCycle(pay_date).save(runs, partial), e.g. for a background worker."""
+    return PayrollCycle(pay_date).save(runs, partial)
+
+
+def get_payroll_cycles(date_from: str = None, date_to: str = None) -> list:
+    """Every cycle attempt record with a pay date in date_from..date_to (YYYY-MM-DD, inclusive), newest first."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT * FROM payroll_cycles
+        WHERE pay_date >= ? AND pay_date <= ?
+        ORDER BY pay_date DESC, id DESC
+    """, (date_from or "0000-00-00", date_to or "9999-99-99"))
+    cycles = cursor.fetchall()
+    conn.close()
+    return cycles
@@ -1,22 +1,89 @@
 # db/database.py
 import sqlite3
 import os
+import random
+import threading
+import time
 from datetime import datetime
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from utils.validators import validate_sin, format_sin
+from utils.validators import SIN_ERROR_MESSAGES, validate_sin, validate_sins, format_sin
+from db import sql_trace
 
 DB_PATH = "db/payroll.db"
 
+# Seconds a statement waits for another connection's lock before failing with "database is locked"
+BUSY_TIMEOUT = 5.0
+# Write transactions still locked out after BUSY_TIMEOUT are retried this many times, waiting
+# about RETRY_BACKOFF seconds before the first retry and twice as long before each later one
+WRITE_RETRIES = 4
+RETRY_BACKOFF = 0.05
+
+# Per-thread reusable connections (see use_thread_connection)
+_thread_connections = threading.local()
+
+class _ThreadConnection(sql_trace.TracedConnection):
+    """Connection kept open for reuse by its thread. close() only ends any open transaction."""
+    def close(self):
+        self.rollback()
+
 def get_connection():
-    """Get a connection to the SQLite database."""
+    """Get a connection to the SQLite database (this thread's reusable one, if it has one)."""
+    conn = getattr(_thread_connections, "conn", None)
+    if conn is not None:
+        return conn
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, factory=sql_trace.TracedConnection, timeout=BUSY_TIMEOUT)
+    sql_trace.connection_opened(conn)
     conn.row_factory = sqlite3.Row
     # Enable foreign key constraints (off by default in SQLite)
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
+def use_thread_connection():
+    """
+    Open one connection for the calling thread and reuse it for every later call in that thread,
+    instead of opening a new one per query. Meant for long-lived server worker threads.
+    """
+    if getattr(_thread_connections, "conn", None) is None:
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, factory=_ThreadConnection, timeout=BUSY_TIMEOUT)
+        sql_trace.connection_opened(conn)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        _thread_connections.conn = conn
+
+def _is_locked(error: sqlite3.OperationalError) -> bool:
+    message = str(error)
+    return "database is locked" in message or "database is busy" in message
+
+def _write_transaction(work):
+    """
+    Run work(cursor) inside one BEGIN IMMEDIATE transaction and commit, so any checks it makes
+    still hold when it writes. Any error rolls everything back. If another writer keeps the
+    database locked past BUSY_TIMEOUT, the whole transaction is retried up to WRITE_RETRIES
+    times after a growing, randomized wait. Returns what work returns.
+    """
+    for attempt in range(WRITE_RETRIES + 1):
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            result = work(cursor)
+            conn.commit()
+            return result
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            if not _is_locked(e) or attempt == WRITE_RETRIES:
+                raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        # Randomized so writers that collided don't all come back at the same moment
+        time.sleep(RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
 def init_db():
     """Initialize database with schema and seed data."""
     conn = get_connection()
@@ -29,10 +96,38 @@ def init_db():
             name TEXT NOT NULL,
             sin TEXT,
             province TEXT DEFAULT 'ON',
+            salary REAL DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
     
+    # Add salary column to databases created before it existed
+    columns = [row['name'] for row in cursor.execute("PRAGMA table_info(employees)")]
+    if 'salary' not in columns:
+        cursor.execute("ALTER TABLE employees ADD COLUMN salary REAL DEFAULT 0")
+    
+    # Case-insensitive name index for type-ahead prefix search
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_employees_name
+        ON employees (name COLLATE NOCASE)
+    """)
+    
+    # Indexes for sorting and filtering the employee list
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_employees_province
+        ON employees (province)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_employees_salary
+        ON employees (salary)
+    """)
+    
+    # Index for SIN uniqueness checks
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_employees_sin
+        ON employees (sin)
+    """)
+    
     # Create payroll_runs table with CASCADE delete
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS payroll_runs (
@@ -54,6 +149,109 @@ def init_db():
         )
     """)
     
+    # Index for newest-first paging through payroll runs
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_runs_pay_date
+        ON payroll_runs (pay_date)
+    """)
+    
+    # Indexes for sorting and filtering payroll records by amount
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_runs_gross
+        ON payroll_runs (gross)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_runs_net
+        ON payroll_runs (net)
+    """)
+    
+    # Index for per-employee YTD sums and latest-date lookups
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_runs_employee_date
+        ON payroll_runs (employee_id, pay_date)
+    """)
+    
+    # One payroll run per employee per month, enforced by the database for every writer
+    try:
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_payroll_runs_employee_month
+            ON payroll_runs (employee_id, substr(pay_date, 1, 7))
+        """)
+    except sqlite3.IntegrityError:
+        print("Warning: some employees have more than one payroll run in a month; the database "
+              "can't enforce one run per month until the extra runs are removed.", file=sys.stderr)
+    
+    # Remittance totals for closed periods (see db.remittance), by remitter type and period start
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS remittance_periods (
+            remitter TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            period_end TEXT NOT NULL,
+            month TEXT NOT NULL,
+            run_count INTEGER NOT NULL,
+            employee_count INTEGER NOT NULL,
+            gross REAL NOT NULL,
+            cpp_employee REAL NOT NULL,
+            cpp_employer REAL NOT NULL,
+            ei_employee REAL NOT NULL,
+            ei_employer REAL NOT NULL,
+            federal_withholding REAL NOT NULL,
+            provincial_withholding REAL NOT NULL,
+            PRIMARY KEY (remitter, period_start)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_remittance_periods_month
+        ON remittance_periods (month)
+    """)
+    
+    # Any change to a payroll run drops the cached totals of the periods it was and is in.
+    # Every period lies within one month, so the month index finds them.
+    for event, dates in (("INSERT", ["NEW"]), ("UPDATE", ["OLD", "NEW"]), ("DELETE", ["OLD"])):
+        deletes = "".join(f"""
+            DELETE FROM remittance_periods
+            WHERE month = substr({row}.pay_date, 1, 7)
+            AND {row}.pay_date BETWEEN period_start AND period_end;""" for row in dates)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS payroll_runs_remittance_{event.lower()}
+            AFTER {event} ON payroll_runs
+            BEGIN{deletes}
+            END
+        """)
+    
+    # One row per attempt to save a whole pay date's runs (see db.cycle), kept as a record of how it ended
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_cycles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pay_date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            employee_count INTEGER NOT NULL DEFAULT 0,
+            saved_count INTEGER NOT NULL DEFAULT 0,
+            already_paid_count INTEGER NOT NULL DEFAULT 0,
+            failed_count INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            error TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_cycles_pay_date
+        ON payroll_cycles (pay_date)
+    """)
+    
+    # The payroll run ids each cycle chunk saved, so a cycle can be rolled back
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_cycle_chunks (
+            cycle_id INTEGER NOT NULL,
+            first_run_id INTEGER NOT NULL,
+            last_run_id INTEGER NOT NULL,
+            run_count INTEGER NOT NULL,
+            PRIMARY KEY (cycle_id, first_run_id),
+            FOREIGN KEY (cycle_id) REFERENCES payroll_cycles(id) ON DELETE CASCADE
+        )
+    """)
+    
     # Create company_settings table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS company_settings (
@@ -102,7 +300,7 @@ def check_sin_exists(sin: str, exclude_employee_id: int = None) -> bool:
     conn.close()
     return result is not None
 
-def add_employee(name: str, sin: str = "", province: str = "ON"):
+def add_employee(name: str, sin: str = "", province: str = "ON", salary: float = 0.0):
     """Add a new employee. Validates SIN format and uniqueness."""
     # Validate SIN
     is_valid, error_msg = validate_sin(sin)
@@ -119,19 +317,125 @@ def add_employee(name: str, sin: str = "", province: str = "ON"):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO employees (name, sin, province)
-        VALUES (?, ?, ?)
-    """, (name, sin_formatted, province))
+        INSERT INTO employees (name, sin, province, salary)
+        VALUES (?, ?, ?, ?)
+    """, (name, sin_formatted, province, salary))
     conn.commit()
     employee_id = cursor.lastrowid
     conn.close()
     return employee_id
 
+def add_employees(employees: list) -> list:
+    """
+    Add many employees, e.g. a whole import file, in a single transaction.
+    employees is a list of (name, sin, province, salary) tuples. Applies the same SIN checks as
+    add_employee to every row (a SIN repeated within the list is a duplicate of its first row)
+    without a query per row. Rows that fail are left out; the others are all saved.
+    Returns [(employee_id, "")] or [(None, error message)], one per row.
+    """
+    valid, codes, normalized = validate_sins([sin for _, sin, _, _ in employees])
+    
+    def save(cursor):
+        cursor.execute("SELECT sin FROM employees WHERE sin IS NOT NULL AND sin != ''")
+        taken = {row['sin'] for row in cursor.fetchall()}
+        results = []
+        for (name, _, province, salary), is_valid, code, sin in zip(employees, valid, codes, normalized):
+            if not is_valid:
+                results.append((None, SIN_ERROR_MESSAGES[code]))
+            elif sin in taken:
+                results.append((None, f"An employee with SIN {sin} already exists"))
+            else:
+                taken.add(sin)
+                cursor.execute("""
+                    INSERT INTO employees (name, sin, province, salary)
+                    VALUES (?, ?, ?, ?)
+                """, (name, sin, province, salary))
+                results.append((cursor.lastrowid, ""))
+        return results
+    
+    return _write_transaction(save)
+
 def get_all_employees():
     """Get all employees."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM employees ORDER BY name")
+    cursor.execute("SELECT * FROM employees ORDER BY name, id")
+    employees = cursor.fetchall()
+    conn.close()
+    return employees
+
+def _like_prefix(prefix: str) -> str:
+    """LIKE pattern matching values that start with prefix (use with ESCAPE '\\')."""
+    # Escape LIKE wildcards so they match literally
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def search_employees(prefix: str, limit: int = 20):
+    """
+    Find employees whose name starts with prefix (case-insensitive), ordered by name.
+    Uses the NOCASE name index, so only the matching rows are read. Returns at most limit rows.
+    """
+    pattern = _like_prefix(prefix)
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT * FROM employees 
+        WHERE name LIKE ? ESCAPE '\\'
+        ORDER BY name COLLATE NOCASE, id
+        LIMIT ?
+    """, (pattern, limit))
+    employees = cursor.fetchall()
+    conn.close()
+    return employees
+
+# Sortable employee columns and their SQL expressions; each is indexed (ties broken by id)
+EMPLOYEE_SORT_COLUMNS = {
+    "id": "id",
+    "name": "name COLLATE NOCASE",
+    "province": "province",
+    "salary": "salary",
+}
+
+def get_employees_page(limit: int = 100, after: tuple = None, filters: dict = None,
+                       sort: tuple = ("name", False)):
+    """
+    Get one page of employees.
+    sort is (column, descending) with column one of EMPLOYEE_SORT_COLUMNS; ties are ordered by id.
+    after is the (sort value, id) of the last row of the previous page; None starts at the top.
+    filters may contain name (case-insensitive prefix), province, min_salary and max_salary.
+    """
+    column, descending = sort
+    if column not in EMPLOYEE_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort employees by {column}")
+    expr = EMPLOYEE_SORT_COLUMNS[column]
+    direction = "DESC" if descending else "ASC"
+    filters = filters or {}
+    
+    conditions, params = [], []
+    if filters.get('name'):
+        conditions.append("name LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(filters['name']))
+    if filters.get('province'):
+        conditions.append("province = ?")
+        params.append(filters['province'])
+    if filters.get('min_salary') is not None:
+        conditions.append("salary >= ?")
+        params.append(filters['min_salary'])
+    if filters.get('max_salary') is not None:
+        conditions.append("salary <= ?")
+        params.append(filters['max_salary'])
+    if after:
+        conditions.append(f"({expr}, id) {'<' if descending else '>'} (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT * FROM employees 
+        {where}
+        ORDER BY {expr} {direction}, id {direction}
+        LIMIT ?
+    """, params + [limit])
     employees = cursor.fetchall()
     conn.close()
     return employees
@@ -145,7 +449,7 @@ def get_employee(employee_id: int):
     conn.close()
     return employee
 
-def update_employee(employee_id: int, name: str, sin: str = "", province: str = "ON"):
+def update_employee(employee_id: int, name: str, sin: str = "", province: str = "ON", salary: float = 0.0):
     """Update an employee. Validates SIN format and uniqueness."""
     # Validate SIN
     is_valid, error_msg = validate_sin(sin)
@@ -163,9 +467,9 @@ def update_employee(employee_id: int, name: str, sin: str = "", province: str =
     cursor = conn.cursor()
     cursor.execute("""
         UPDATE employees 
-        SET name = ?, sin = ?, province = ?
+        SET name = ?, sin = ?, province = ?, salary = ?
         WHERE id = ?
-    """, (name, sin_formatted, province, employee_id))
+    """, (name, sin_formatted, province, salary, employee_id))
     conn.commit()
     conn.close()
 
@@ -194,7 +498,7 @@ def check_payroll_run_exists(employee_id: int, pay_date: str):
     cursor.execute("""
         SELECT id FROM payroll_runs 
         WHERE employee_id = ? 
-        AND strftime('%Y-%m', pay_date) = ?
+        AND substr(pay_date, 1, 7) = ?
     """, (employee_id, year_month))
     
     result = cursor.fetchone()
@@ -219,37 +523,141 @@ def get_latest_payroll_date(employee_id: int) -> str:
     
     return result['pay_date'] if result else None
 
+# Messages for the one-per-month and chronological-order rules
+_RUN_EXISTS_MESSAGE = ("A payroll run already exists for this employee in {month}. "
+                       "Each employee can only have one payroll run per month.")
+_RUN_ORDER_MESSAGE = ("Pay date {pay_date} cannot be earlier than the most recent payroll run ({latest}). "
+                      "Payroll runs must be in chronological order to maintain accurate YTD calculations.")
+
+_INSERT_PAYROLL_RUN = """
+    INSERT INTO payroll_runs 
+    (employee_id, pay_date, gross, cpp_employee, cpp_employer, 
+     ei_employee, ei_employer, federal_withholding, provincial_withholding,
+     total_deductions, net, period_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _payroll_run_values(employee_id, pay_date, payroll_data, period_count):
+    return (employee_id, pay_date, payroll_data['gross'],
+            payroll_data['cpp_employee'], payroll_data['cpp_employer'],
+            payroll_data['ei_employee'], payroll_data['ei_employer'],
+            payroll_data['federal_withholding'], payroll_data['provincial_withholding'],
+            payroll_data['total_deductions'], payroll_data['net'], period_count)
+
+def _is_duplicate_month(error: sqlite3.IntegrityError) -> bool:
+    return "UNIQUE constraint failed" in str(error)
+
 def add_payroll_run(employee_id: int, pay_date: str, payroll_data: dict, period_count: int = 12):
-    """Add a new payroll run. Raises ValueError if a run already exists for this month."""
-    # Check for duplicate
-    if check_payroll_run_exists(employee_id, pay_date):
+    """
+    Add a new payroll run. Raises ValueError if a run already exists for this month or a later
+    date. The checks and the insert are one transaction, so concurrent writers can't both pass.
+    """
+    def save(cursor):
+        cursor.execute("""
+            SELECT MAX(pay_date) as latest_date,
+                   MAX(substr(pay_date, 1, 7) = ?) as same_month
+            FROM payroll_runs
+            WHERE employee_id = ?
+        """, (pay_date[:7], employee_id))
+        row = cursor.fetchone()
+        # Check for duplicate
+        if row['same_month']:
+            raise ValueError(_RUN_EXISTS_MESSAGE.format(month=pay_date[:7]))
+        # Check chronological order
+        if row['latest_date'] and pay_date < row['latest_date']:
+            raise ValueError(_RUN_ORDER_MESSAGE.format(pay_date=pay_date, latest=row['latest_date']))
+        cursor.execute(_INSERT_PAYROLL_RUN, _payroll_run_values(employee_id, pay_date, payroll_data, period_count))
+        return cursor.lastrowid
+    
+    try:
+        return _write_transaction(save)
+    except sqlite3.IntegrityError as e:
+        # Only reachable if the rules were bypassed by another program; the index still holds
+        if _is_duplicate_month(e):
+            raise ValueError(_RUN_EXISTS_MESSAGE.format(month=pay_date[:7]))
+        raise
+
+def add_payroll_runs_batch(pay_date: str, runs: list):
+    """
+    Save a whole payroll cycle in a single transaction.
+    runs is a list of (employee_id, payroll_data, period_count) tuples, all paid on pay_date.
+    Applies the same one-per-month and chronological-order rules as add_payroll_run
+    to every employee; if any run breaks them nothing is saved and ValueError is raised.
+    Returns the number of runs saved.
+    """
+    def save(cursor):
+        # Latest pay date per employee, in one query
+        cursor.execute("""
+            SELECT employee_id, MAX(pay_date) as latest_date
+            FROM payroll_runs
+            GROUP BY employee_id
+        """)
+        latest_dates = {row['employee_id']: row['latest_date'] for row in cursor.fetchall()}
+        
         year_month = pay_date[:7]
-        raise ValueError(f"A payroll run already exists for this employee in {year_month}. Each employee can only have one payroll run per month.")
+        errors = []
+        for employee_id, _, _ in runs:
+            latest_date = latest_dates.get(employee_id)
+            if not latest_date:
+                continue
+            if latest_date[:7] == year_month:
+                errors.append(f"Employee {employee_id}: a payroll run already exists in {year_month}.")
+            elif pay_date < latest_date:
+                errors.append(f"Employee {employee_id}: pay date {pay_date} is earlier than the most recent payroll run ({latest_date}).")
+        if errors:
+            raise ValueError("Payroll cycle not saved. Each employee can only have one payroll run per month, "
+                             "and payroll runs must be in chronological order.\n" + "\n".join(errors))
+        
+        cursor.executemany(_INSERT_PAYROLL_RUN, [
+            _payroll_run_values(employee_id, pay_date, payroll_data, period_count)
+            for employee_id, payroll_data, period_count in runs
+        ])
+        return len(runs)
     
-    # Check chronological order
-    latest_date = get_latest_payroll_date(employee_id)
-    if latest_date and pay_date < latest_date:
-        raise ValueError(f"Pay date {pay_date} cannot be earlier than the most recent payroll run ({latest_date}). Payroll runs must be in chronological order to maintain accurate YTD calculations.")
+    try:
+        return _write_transaction(save)
+    except sqlite3.IntegrityError as e:
+        if _is_duplicate_month(e):
+            raise ValueError(f"Payroll cycle not saved. An employee in it already has a payroll run in {pay_date[:7]}.")
+        raise
+
+def add_payroll_runs(runs: list):
+    """
+    Save many payroll runs on any pay dates in a single transaction.
+    runs is a list of (employee_id, pay_date, payroll_data, period_count) tuples.
+    Unlike add_payroll_runs_batch the chronological-order rule is not checked here; callers
+    check it against get_pay_contexts() first. A second run for an employee in the same month
+    is still refused by the database: nothing is saved and ValueError is raised.
+    Returns the number of runs saved.
+    """
+    def save(cursor):
+        cursor.executemany(_INSERT_PAYROLL_RUN, [
+            _payroll_run_values(employee_id, pay_date, payroll_data, period_count)
+            for employee_id, pay_date, payroll_data, period_count in runs
+        ])
+        return len(runs)
     
+    try:
+        return _write_transaction(save)
+    except sqlite3.IntegrityError as e:
+        if _is_duplicate_month(e):
+            raise ValueError("Payroll runs not saved. Each employee can only have one payroll run per month, "
+                             "and another run was saved for one of these employees and months meanwhile.")
+        raise
+
+def get_payroll_run(run_id: int):
+    """Get a single payroll run with the employee name and province."""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO payroll_runs 
-        (employee_id, pay_date, gross, cpp_employee, cpp_employer, 
-         ei_employee, ei_employer, federal_withholding, provincial_withholding,
-         total_deductions, net, period_count)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        employee_id, pay_date, payroll_data['gross'],
-        payroll_data['cpp_employee'], payroll_data['cpp_employer'],
-        payroll_data['ei_employee'], payroll_data['ei_employer'],
-        payroll_data['federal_withholding'], payroll_data['provincial_withholding'],
-        payroll_data['total_deductions'], payroll_data['net'], period_count
-    ))
-    conn.commit()
-    run_id = cursor.lastrowid
+        SELECT p.*, e.name as employee_name, e.province as employee_province 
+        FROM payroll_runs p
+        JOIN employees e ON p.employee_id = e.id
+        WHERE p.id = ?
+    """, (run_id,))
+    run = cursor.fetchone()
     conn.close()
-    return run_id
+    return run
 
 def get_all_payroll_runs():
     """Get all payroll runs with employee names."""
@@ -265,6 +673,117 @@ def get_all_payroll_runs():
     conn.close()
     return runs
 
+# Sortable payroll run columns and their SQL expressions; each is indexed (ties broken by id)
+PAYROLL_RUN_SORT_COLUMNS = {
+    "id": "p.id",
+    "employee_name": "e.name COLLATE NOCASE",
+    "pay_date": "p.pay_date",
+    "gross": "p.gross",
+    "net": "p.net",
+}
+# Columns ordered between the sort value and id, and their SQL expressions. By name, runs are read
+# employee by employee through idx_employees_name, then by date through idx_payroll_runs_employee_date;
+# ordering by name and run id alone would sort the whole joined history for every page.
+PAYROLL_RUN_TIE_BREAKS = {
+    "employee_name": {"employee_id": "e.id", "pay_date": "p.pay_date"},
+}
+
+def _payroll_run_filter_sql(filters: dict):
+    """
+    Build WHERE conditions for payroll run filters.
+    filters may contain employee_id, province, date_from, date_to, min_gross and max_gross.
+    Returns (conditions, params).
+    """
+    conditions, params = [], []
+    if not filters:
+        return conditions, params
+    if filters.get('employee_id'):
+        conditions.append("p.employee_id = ?")
+        params.append(filters['employee_id'])
+    if filters.get('province'):
+        conditions.append("e.province = ?")
+        params.append(filters['province'])
+    if filters.get('date_from'):
+        conditions.append("p.pay_date >= ?")
+        params.append(filters['date_from'])
+    if filters.get('date_to'):
+        conditions.append("p.pay_date <= ?")
+        params.append(filters['date_to'])
+    if filters.get('min_gross') is not None:
+        conditions.append("p.gross >= ?")
+        params.append(filters['min_gross'])
+    if filters.get('max_gross') is not None:
+        conditions.append("p.gross <= ?")
+        params.append(filters['max_gross'])
+    return conditions, params
+
+def get_payroll_runs_page(limit: int = 100, after: tuple = None, filters: dict = None,
+                          sort: tuple = ("pay_date", True)):
+    """
+    Get one page of payroll runs with employee names and provinces.
+    sort is (column, descending) with column one of PAYROLL_RUN_SORT_COLUMNS; ties are ordered by
+    the column's PAYROLL_RUN_TIE_BREAKS, then id.
+    after is the (sort value, tie-break values..., id) of the last row of the previous page;
+    None starts at the top.
+    filters is as for _payroll_run_filter_sql.
+    """
+    column, descending = sort
+    if column not in PAYROLL_RUN_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort payroll runs by {column}")
+    exprs = [PAYROLL_RUN_SORT_COLUMNS[column], *PAYROLL_RUN_TIE_BREAKS.get(column, {}).values(), "p.id"]
+    direction = "DESC" if descending else "ASC"
+    
+    conditions, params = _payroll_run_filter_sql(filters)
+    if after:
+        if len(after) != len(exprs):
+            raise ValueError(f"Sorting by {column} pages after {len(exprs)} values, not {len(after)}")
+        # The plain bound on the sort value lets the first table seek; the row value picks the exact row
+        conditions.append(f"{exprs[0]} {'<=' if descending else '>='} ?")
+        conditions.append(f"({', '.join(exprs)}) {'<' if descending else '>'} ({', '.join('?' * len(exprs))})")
+        params.append(after[0])
+        params.extend(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT p.*, e.name as employee_name, e.province as employee_province 
+        FROM payroll_runs p
+        JOIN employees e ON p.employee_id = e.id
+        {where}
+        ORDER BY {', '.join(f"{expr} {direction}" for expr in exprs)}
+        LIMIT ?
+    """, params + [limit])
+    runs = cursor.fetchall()
+    conn.close()
+    return runs
+
+def get_payroll_runs_summary(filters: dict = None):
+    """
+    Get record count and totals across all payroll runs, or those matching filters.
+    Returns dict with count, total_gross, total_net, total_deductions and total_cra_remittance.
+    """
+    conditions, params = _payroll_run_filter_sql(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT 
+            COUNT(*) as count,
+            COALESCE(SUM(p.gross), 0) as total_gross,
+            COALESCE(SUM(p.net), 0) as total_net,
+            COALESCE(SUM(p.total_deductions), 0) as total_deductions,
+            COALESCE(SUM(p.cpp_employee + p.ei_employee + p.federal_withholding + 
+                         p.provincial_withholding + p.cpp_employer + p.ei_employer), 0) as total_cra_remittance
+        FROM payroll_runs p
+        JOIN employees e ON p.employee_id = e.id
+        {where}
+    """, params)
+    result = cursor.fetchone()
+    conn.close()
+    return dict(result)
+
 def get_payroll_runs_by_employee(employee_id: int):
     """Get all payroll runs for a specific employee."""
     conn = get_connection()
@@ -291,6 +810,39 @@ def get_payroll_runs_by_year(employee_id: int, year: int):
     conn.close()
     return runs
 
+def get_year_end_totals(year: int, employee_id: int = None):
+    """
+    Get T4 box totals for every employee paid in the year (or one employee) in a single query.
+    Returns rows with employee_id, name, sin, province, run_count, gross, cpp_employee,
+    ei_employee, federal_withholding and provincial_withholding, ordered by name.
+    """
+    params = [f"{year}-01-01", f"{year + 1}-01-01"]
+    employee_filter = ""
+    if employee_id is not None:
+        employee_filter = "AND p.employee_id = ?"
+        params.append(employee_id)
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT 
+            e.id as employee_id, e.name, e.sin, e.province,
+            COUNT(*) as run_count,
+            SUM(p.gross) as gross,
+            SUM(p.cpp_employee) as cpp_employee,
+            SUM(p.ei_employee) as ei_employee,
+            SUM(p.federal_withholding) as federal_withholding,
+            SUM(p.provincial_withholding) as provincial_withholding
+        FROM payroll_runs p
+        JOIN employees e ON p.employee_id = e.id
+        WHERE p.pay_date >= ? AND p.pay_date < ? {employee_filter}
+        GROUP BY e.id
+        ORDER BY e.name, e.id
+    """, params)
+    totals = cursor.fetchall()
+    conn.close()
+    return totals
+
 def get_ytd_contributions(employee_id: int, pay_date: str):
     """
     Get year-to-date CPP and EI contributions for an employee up to (but not including) the given pay date.
@@ -320,6 +872,166 @@ def get_ytd_contributions(employee_id: int, pay_date: str):
         'ytd_ei': float(result['ytd_ei'])
     }
 
+def get_pay_stub_rows(pay_date: str):
+    """
+    Get every payroll run saved on the given pay date, with employee details and
+    year-to-date totals up to and including that run, in a single windowed query.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # YTD window only needs this year's runs up to the pay date
+    year_start = f"{pay_date[:4]}-01-01"
+    
+    cursor.execute("""
+        SELECT * FROM (
+            SELECT 
+                p.*,
+                e.name AS employee_name,
+                e.sin AS employee_sin,
+                e.province AS employee_province,
+                SUM(p.gross) OVER ytd AS ytd_gross,
+                SUM(p.cpp_employee) OVER ytd AS ytd_cpp,
+                SUM(p.ei_employee) OVER ytd AS ytd_ei,
+                SUM(p.federal_withholding) OVER ytd AS ytd_federal,
+                SUM(p.provincial_withholding) OVER ytd AS ytd_provincial,
+                SUM(p.total_deductions) OVER ytd AS ytd_deductions,
+                SUM(p.net) OVER ytd AS ytd_net
+            FROM payroll_runs p
+            JOIN employees e ON p.employee_id = e.id
+            WHERE p.pay_date >= ? AND p.pay_date <= ?
+            WINDOW ytd AS (PARTITION BY p.employee_id ORDER BY p.pay_date, p.id)
+        )
+        WHERE pay_date = ?
+        ORDER BY employee_name, id
+    """, (year_start, pay_date, pay_date))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_all_ytd_contributions(pay_date: str) -> dict:
+    """
+    Get year-to-date CPP and EI contributions for every employee up to (but not including)
+    the given pay date, in a single query.
+    Returns dict of employee_id -> {ytd_cpp, ytd_ei}; employees with no runs this year are omitted.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    year_start = f"{pay_date[:4]}-01-01"
+    
+    cursor.execute("""
+        SELECT 
+            employee_id,
+            COALESCE(SUM(cpp_employee), 0) as ytd_cpp,
+            COALESCE(SUM(ei_employee), 0) as ytd_ei
+        FROM payroll_runs 
+        WHERE pay_date >= ? AND pay_date < ?
+        GROUP BY employee_id
+    """, (year_start, pay_date))
+    
+    result = {row['employee_id']: {'ytd_cpp': float(row['ytd_cpp']), 'ytd_ei': float(row['ytd_ei'])}
+              for row in cursor.fetchall()}
+    conn.close()
+    return result
+
+def get_workforce_ytd(year: int):
+    """
+    Get every employee with their CPP and EI contributions and latest pay date over all runs
+    saved for the year, in a single query.
+    Returns rows with employee_id, name, province, salary, ytd_cpp, ytd_ei and last_pay_date
+    (None if not paid that year), ordered by employee id.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 
+            e.id as employee_id, e.name, e.province, e.salary,
+            COALESCE(SUM(p.cpp_employee), 0) as ytd_cpp,
+            COALESCE(SUM(p.ei_employee), 0) as ytd_ei,
+            MAX(p.pay_date) as last_pay_date
+        FROM employees e
+        LEFT JOIN payroll_runs p ON p.employee_id = e.id
+            AND p.pay_date >= ? AND p.pay_date <= ?
+        GROUP BY e.id
+        ORDER BY e.id
+    """, (f"{year:04d}-01-01", f"{year:04d}-12-31"))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def get_monthly_run_totals(date_from: str, date_to: str):
+    """
+    Get the number of saved payroll runs and their amount totals for each month with runs
+    from date_from to date_to (YYYY-MM-DD, inclusive), in a single query.
+    Returns rows with month (YYYY-MM), run_count, gross, cpp_employee, cpp_employer, ei_employee,
+    ei_employer, federal_withholding and provincial_withholding, in month order.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 
+            substr(pay_date, 1, 7) as month,
+            COUNT(*) as run_count,
+            SUM(gross) as gross,
+            SUM(cpp_employee) as cpp_employee,
+            SUM(cpp_employer) as cpp_employer,
+            SUM(ei_employee) as ei_employee,
+            SUM(ei_employer) as ei_employer,
+            SUM(federal_withholding) as federal_withholding,
+            SUM(provincial_withholding) as provincial_withholding
+        FROM payroll_runs
+        WHERE pay_date >= ? AND pay_date <= ?
+        GROUP BY 1
+        ORDER BY 1
+    """, (date_from, date_to))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+# (employee_id, pay_date) pairs per get_pay_contexts query, keeping under SQLite's 999 parameter limit
+_PAY_CONTEXT_KEYS_PER_QUERY = 450
+
+def get_pay_contexts(keys) -> dict:
+    """
+    Look up what's needed to pay many (employee_id, pay_date) pairs at once.
+    Returns dict of (employee_id, pay_date) -> {province, latest_date, ytd_cpp, ytd_ei}, where
+    latest_date is the employee's most recent saved run and ytd_cpp/ytd_ei are that year's
+    contributions before the pay date. Unknown employees are omitted.
+    """
+    keys = list(dict.fromkeys(keys))
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    contexts = {}
+    for start in range(0, len(keys), _PAY_CONTEXT_KEYS_PER_QUERY):
+        batch = keys[start:start + _PAY_CONTEXT_KEYS_PER_QUERY]
+        cursor.execute(f"""
+            WITH wanted(employee_id, pay_date) AS (VALUES {", ".join(["(?, ?)"] * len(batch))})
+            SELECT 
+                w.employee_id,
+                w.pay_date,
+                e.province,
+                (SELECT MAX(r.pay_date) FROM payroll_runs r WHERE r.employee_id = w.employee_id) as latest_date,
+                COALESCE(SUM(p.cpp_employee), 0) as ytd_cpp,
+                COALESCE(SUM(p.ei_employee), 0) as ytd_ei
+            FROM wanted w
+            JOIN employees e ON e.id = w.employee_id
+            LEFT JOIN payroll_runs p ON p.employee_id = w.employee_id
+                AND p.pay_date >= substr(w.pay_date, 1, 4) || '-01-01'
+                AND p.pay_date < w.pay_date
+            GROUP BY w.employee_id, w.pay_date
+        """, [value for key in batch for value in key])
+        for row in cursor.fetchall():
+            contexts[(row['employee_id'], row['pay_date'])] = {
+                'province': row['province'],
+                'latest_date': row['latest_date'],
+                'ytd_cpp': float(row['ytd_cpp']),
+                'ytd_ei': float(row['ytd_ei'])
+            }
+    conn.close()
+    return contexts
+
 # Company settings operations
 def get_company_settings():
     """Get company settings. Creates default if none exist."""
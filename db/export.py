@@ -0,0 +1,129 @@
+# db/export.py
+"""
+Columnar binary export of payroll history for analytics.
+Each numeric column of payroll_runs is written as its own 1-D NumPy .npy file
+(little-endian, C order) next to a schema.json sidecar, so consumers can
+memory-map them with np.load(path, mmap_mode="r") and read without copying.
+Written with the standard library only, streaming rows in chunks.
+"""
+import json
+import mmap
+import os
+import sys
+from array import array
+from datetime import datetime
+from db.database import get_connection, _payroll_run_filter_sql
+
+SCHEMA_FILE = "schema.json"
+# Rows fetched and appended to the column files at a time
+EXPORT_CHUNK_SIZE = 10000
+
+# (column, SQL expression, array typecode, .npy dtype, description) in file order
+COLUMNS = [
+    ("id", "p.id", "q", "<i8", "payroll run id"),
+    ("employee_id", "p.employee_id", "q", "<i8", "employee id"),
+    # julianday('1970-01-01') is 2440587.5
+    ("pay_date", "CAST(julianday(p.pay_date) - 2440587.5 AS INTEGER)", "i", "<i4", "days since 1970-01-01"),
+    ("period_count", "COALESCE(p.period_count, 12)", "i", "<i4", "pay periods per year"),
+    ("gross", "p.gross", "d", "<f8", "CAD"),
+    ("cpp_employee", "p.cpp_employee", "d", "<f8", "CAD"),
+    ("cpp_employer", "p.cpp_employer", "d", "<f8", "CAD"),
+    ("ei_employee", "p.ei_employee", "d", "<f8", "CAD"),
+    ("ei_employer", "p.ei_employer", "d", "<f8", "CAD"),
+    ("federal_withholding", "p.federal_withholding", "d", "<f8", "CAD"),
+    ("provincial_withholding", "p.provincial_withholding", "d", "<f8", "CAD"),
+    ("total_deductions", "p.total_deductions", "d", "<f8", "CAD"),
+    ("net", "p.net", "d", "<f8", "CAD"),
+]
+
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# Room in the header for any row count, so it can be rewritten in place once the count is known
+_SHAPE_WIDTH = 20
+
+
+def _npy_header(dtype: str, rows: int) -> bytes:
+    """Build a .npy version 1.0 header for a 1-D array, padded so the data starts on a 64-byte boundary."""
+    header = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': ({rows},), }}"
+    header += " " * (_SHAPE_WIDTH - len(str(rows)))
+    padding = -(len(_NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = header + " " * padding + "\n"
+    return _NPY_MAGIC + len(header).to_bytes(2, "little") + header.encode("latin-1")
+
+
+def export_payroll_runs(output_dir: str, filters: dict = None) -> dict:
+    """
+    Write the payroll runs matching filters (as for get_payroll_runs_page) to output_dir,
+    one <column>.npy file per entry of COLUMNS, ordered by pay date then id, plus schema.json.
+    Returns the schema that was written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    conditions, params = _payroll_run_filter_sql(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    # Plain tuples; sqlite3.Row adds nothing when every row is split into columns
+    cursor.row_factory = None
+    files = [open(os.path.join(output_dir, f"{name}.npy"), "wb") for name, _, _, _, _ in COLUMNS]
+    rows = 0
+    try:
+        for f, (_, _, _, dtype, _) in zip(files, COLUMNS):
+            f.write(_npy_header(dtype, 0))
+        cursor.execute(f"""
+            SELECT {", ".join(expr for _, expr, _, _, _ in COLUMNS)}
+            FROM payroll_runs p
+            JOIN employees e ON p.employee_id = e.id
+            {where}
+            ORDER BY p.pay_date, p.id
+        """, params)
+        while True:
+            chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            for f, (_, _, typecode, _, _), values in zip(files, COLUMNS, zip(*chunk)):
+                column = array(typecode, values)
+                if sys.byteorder == "big":
+                    column.byteswap()
+                column.tofile(f)
+            rows += len(chunk)
+        # Same header length, now with the real row count
+        for f, (_, _, _, dtype, _) in zip(files, COLUMNS):
+            f.seek(0)
+            f.write(_npy_header(dtype, rows))
+    finally:
+        for f in files:
+            f.close()
+        conn.close()
+
+    schema = {
+        "table": "payroll_runs",
+        "format": "npy",
+        "rows": rows,
+        "order": ["pay_date", "id"],
+        "filters": {key: value for key, value in (filters or {}).items() if value is not None},
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "columns": [{"name": name, "file": f"{name}.npy", "dtype": dtype, "unit": unit}
+                    for name, _, _, dtype, unit in COLUMNS],
+    }
+    with open(os.path.join(output_dir, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+    return schema
+
+
+def load_column(output_dir: str, name: str) -> memoryview:
+    """
+    Memory-map one exported column without numpy. Returns a read-only memoryview of its
+    values (e.g. column[0], sum(column)); nothing is copied into memory.
+    """
+    with open(os.path.join(output_dir, SCHEMA_FILE), encoding="utf-8") as f:
+        columns = {column['name']: column for column in json.load(f)['columns']}
+    if name not in columns:
+        raise ValueError(f"No exported column named {name}")
+    if sys.byteorder == "big":
+        raise ValueError("load_column needs a little-endian machine; use numpy.load instead")
+    typecode = {"<i8": "q", "<i4": "i", "<f8": "d"}[columns[name]['dtype']]
+
+    with open(os.path.join(output_dir, columns[name]['file']), "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header_length = int.from_bytes(mapped[len(_NPY_MAGIC):len(_NPY_MAGIC) + 2], "little")
+    return memoryview(mapped)[len(_NPY_MAGIC) + 2 + header_length:].cast(typecode)
@@ -0,0 +1,196 @@
+# db/generate.py
+"""
+Synthetic workforce and payroll history for load testing and benchmarks.
+Creates a new database with N employees (valid, unique SINs, a Canadian
+province mix and a log-normal salary spread) and M years of monthly payroll
+runs calculated with chained YTD CPP/EI, written cycle by cycle in bulk
+transactions. The same seed always builds the same database.
+
+    python -m db.generate --db /tmp/bench.db --employees 100000 --years 8
+"""
+import argparse
+import calendar
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date
+from db import database
+from logic.payroll_calc import get_rate_context
+from utils.validators import _luhn_check, format_sin
+
+# Approximate share of Canada's workforce by province
+PROVINCE_WEIGHTS = {
+    "ON": 0.388, "QC": 0.222, "BC": 0.137, "AB": 0.121, "MB": 0.036, "SK": 0.030, "NS": 0.026,
+    "NB": 0.021, "NL": 0.013, "PE": 0.004, "NT": 0.001, "YT": 0.001, "NU": 0.001,
+}
+# Pay frequency mix (periods per year)
+PERIOD_WEIGHTS = {12: 0.20, 24: 0.25, 26: 0.45, 52: 0.10}
+# Log-normal annual salary: median and spread, clamped to a plausible range
+SALARY_MEDIAN = 62000
+SALARY_SIGMA = 0.45
+SALARY_RANGE = (28000, 450000)
+# Share of employees hired part way through the history, and yearly raise range
+LATE_HIRE_SHARE = 0.3
+RAISE_RANGE = (0.0, 0.05)
+
+FIRST_NAMES = ["Olivia", "Liam", "Emma", "Noah", "Charlotte", "William", "Amelia", "Benjamin", "Ava", "Lucas",
+               "Sophia", "Jacob", "Chloe", "Ethan", "Léa", "Félix", "Mia", "Nathan", "Zoé", "Arjun",
+               "Priya", "Wei", "Mei", "Hiroshi", "Fatima", "Omar", "Aisha", "Mateo", "Isabella", "Jean"]
+LAST_NAMES = ["Smith", "Tremblay", "Brown", "Martin", "Roy", "Wilson", "Gagnon", "MacDonald", "Taylor", "Côté",
+              "Campbell", "Anderson", "Bouchard", "Lee", "Gauthier", "Morin", "Singh", "Patel", "Wong", "Chen",
+              "Nguyen", "Kim", "Thompson", "White", "Pelletier", "Lavoie", "Fortin", "Johnson", "Clark", "Young"]
+
+# Rows per executemany/commit while loading employees
+EMPLOYEE_BATCH = 50000
+
+
+def random_sin(rng: random.Random) -> str:
+    """A 9-digit SIN that passes the Luhn check (first digit 1-7 or 9, as issued to individuals)."""
+    digits = [rng.choice("1234567") if rng.random() < 0.97 else "9"] + [str(rng.randrange(10)) for _ in range(7)]
+    for check in "0123456789":
+        if _luhn_check("".join(digits) + check):
+            return "".join(digits) + check
+    raise AssertionError("no Luhn check digit found")
+
+
+def month_ends(first_year: int, years: int) -> list:
+    """Last day of each month, as YYYY-MM-DD, for the given years."""
+    return [date(year, month, calendar.monthrange(year, month)[1]).isoformat()
+            for year in range(first_year, first_year + years) for month in range(1, 13)]
+
+
+def generate_employees(rng: random.Random, count: int, months: int) -> list:
+    """Return [(name, sin, province, salary, period_count, first_month_index)] for count employees."""
+    provinces, province_weights = zip(*PROVINCE_WEIGHTS.items())
+    periods, period_weights = zip(*PERIOD_WEIGHTS.items())
+    sins = set()
+    employees = []
+    for _ in range(count):
+        sin = random_sin(rng)
+        while sin in sins:
+            sin = random_sin(rng)
+        sins.add(sin)
+        salary = SALARY_MEDIAN * math.exp(rng.gauss(0, SALARY_SIGMA))
+        salary = round(min(max(salary, SALARY_RANGE[0]), SALARY_RANGE[1]), -2)
+        first_month = rng.randrange(months) if rng.random() < LATE_HIRE_SHARE else 0
+        employees.append((f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", format_sin(sin),
+                          rng.choices(provinces, province_weights)[0], salary,
+                          rng.choices(periods, period_weights)[0], first_month))
+    return employees
+
+
+def generate(db_path: str, employees: int, years: int, first_year: int, seed: int = 0, progress=None) -> dict:
+    """
+    Build a new database at db_path. Each employee is paid once a month (the app allows one run
+    per employee per month) at salary / period_count, with YTD CPP/EI chained through the year.
+    Salaries rise each January. Returns counts and timings.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    pay_dates = month_ends(first_year, years)
+
+    database.DB_PATH = db_path
+    database.init_db()
+    conn = sqlite3.connect(db_path)
+    # Build-only settings: a crash leaves a half-built database to delete, not a corrupt live one
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+    # Secondary indexes are rebuilt once at the end, which is much faster than updating them per row.
+    # The remittance cache triggers go too: a new database has no cached totals to invalidate.
+    dropped = conn.execute("""
+        SELECT type, name FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND tbl_name = 'payroll_runs' AND sql IS NOT NULL
+    """).fetchall()
+    for kind, name in dropped:
+        conn.execute(f"DROP {kind.upper()} {name}")
+
+    workforce = generate_employees(rng, employees, len(pay_dates))
+    for start in range(0, len(workforce), EMPLOYEE_BATCH):
+        batch = workforce[start:start + EMPLOYEE_BATCH]
+        conn.executemany("INSERT INTO employees (name, sin, province, salary) VALUES (?, ?, ?, ?)",
+                         [employee[:4] for employee in batch])
+        conn.commit()
+    ids = [row[0] for row in conn.execute("SELECT id FROM employees ORDER BY id")][-len(workforce):]
+
+    # Per employee: [id, context, annual salary, first month, ytd_cpp, ytd_ei]
+    state = [[employee_id, get_rate_context(province, period_count), salary, first_month, 0.0, 0.0]
+             for employee_id, (_, _, province, salary, period_count, first_month) in zip(ids, workforce)]
+    runs = 0
+    for month_index, pay_date in enumerate(pay_dates):
+        new_year = pay_date[5:7] == "01"
+        rows = []
+        for employee in state:
+            employee_id, context, salary, first_month, ytd_cpp, ytd_ei = employee
+            if month_index < first_month:
+                continue
+            if new_year:
+                ytd_cpp = ytd_ei = 0.0
+                if month_index > first_month:
+                    salary = employee[2] = round(salary * (1 + rng.uniform(*RAISE_RANGE)), -2)
+            result = context.compute(round(salary / context.period_count, 2), ytd_cpp, ytd_ei)
+            employee[4], employee[5] = result['ytd_cpp_after'], result['ytd_ei_after']
+            rows.append((employee_id, pay_date, result['gross'], result['cpp_employee'], result['cpp_employer'],
+                         result['ei_employee'], result['ei_employer'], result['federal_withholding'],
+                         result['provincial_withholding'], result['total_deductions'], result['net'],
+                         context.period_count))
+        conn.executemany("""
+            INSERT INTO payroll_runs
+            (employee_id, pay_date, gross, cpp_employee, cpp_employer,
+             ei_employee, ei_employer, federal_withholding, provincial_withholding,
+             total_deductions, net, period_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+        runs += len(rows)
+        if progress:
+            progress(pay_date, runs)
+
+    # Salaries on the employee records match the latest year's pay
+    conn.executemany("UPDATE employees SET salary = ? WHERE id = ?",
+                     [(employee[2], employee[0]) for employee in state])
+    conn.commit()
+    generated = time.perf_counter()
+    conn.close()
+    # Recreate the dropped indexes and triggers, and ANALYZE so benchmarks see realistic query plans
+    database.init_db()
+    conn = sqlite3.connect(db_path)
+    conn.execute("ANALYZE")
+    conn.close()
+
+    return {"employees": len(ids), "payroll_runs": runs, "generate_seconds": generated - started,
+            "index_seconds": time.perf_counter() - generated}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m db.generate", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", required=True, help="database file to create")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=3, help="years of monthly payroll history (default 3)")
+    parser.add_argument("--first-year", type=int, default=date.today().year - 3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replace", action="store_true", help="overwrite the database file if it exists")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        if not args.replace:
+            parser.error(f"{args.db} exists; pass --replace to overwrite it")
+        os.remove(args.db)
+    directory = os.path.dirname(os.path.abspath(args.db))
+    os.makedirs(directory, exist_ok=True)
+
+    def progress(pay_date, runs):
+        if pay_date.endswith("12-31"):
+            print(f"  {pay_date[:4]}: {runs:,} payroll runs", file=sys.stderr)
+
+    totals = generate(os.path.abspath(args.db), args.employees, args.years, args.first_year, args.seed, progress)
+    print(f"Generated {totals['employees']:,} employees and {totals['payroll_runs']:,} payroll runs in "
+          f"{totals['generate_seconds']:.1f} s (+{totals['index_seconds']:.1f} s indexing)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
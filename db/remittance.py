@@ -0,0 +1,149 @@
+# db/remittance.py
+"""
+CRA source deduction remittance (PD7A) totals by remittance period.
+Employee and employer CPP and EI and the income tax withheld on every payroll
+run are summed per period in one GROUP BY over the pay date index. Totals for
+closed periods are kept in the remittance_periods table, so reports over a
+long history read them back instead of summing again; triggers on
+payroll_runs drop a period's totals whenever one of its runs is added,
+changed or deleted, whichever program does it.
+"""
+import calendar
+from datetime import date, timedelta
+from db.database import get_connection
+
+# Regular remitters remit monthly; accelerated threshold 1 twice a month and threshold 2 four times
+REMITTER_TYPES = ("regular", "accelerated-1", "accelerated-2")
+# First day of each remittance period within a month
+_PERIOD_START_DAYS = {"regular": (1,), "accelerated-1": (1, 16), "accelerated-2": (1, 8, 15, 22)}
+
+REMITTANCE_FIELDS = ["period_start", "period_end", "due_date", "run_count", "employee_count", "gross",
+                     "cpp_employee", "cpp_employer", "ei_employee", "ei_employer", "federal_withholding",
+                     "provincial_withholding", "total_due"]
+_AMOUNT_FIELDS = ["gross", "cpp_employee", "cpp_employer", "ei_employee", "ei_employer",
+                  "federal_withholding", "provincial_withholding"]
+
+
+def _period_start_sql(remitter: str) -> str:
+    """SQL expression for the first day of the remittance period a run's pay_date falls in."""
+    days = _PERIOD_START_DAYS[remitter]
+    if len(days) == 1:
+        return "substr(pay_date, 1, 8) || '01'"
+    cases = " ".join(f"WHEN substr(pay_date, 9, 2) < '{following:02d}' THEN '{day:02d}'"
+                     for day, following in zip(days, days[1:]))
+    return f"substr(pay_date, 1, 8) || CASE {cases} ELSE '{days[-1]:02d}' END"
+
+
+def remittance_periods(date_from: str, date_to: str, remitter: str = "regular") -> list:
+    """[(period_start, period_end)] as YYYY-MM-DD for every period overlapping date_from..date_to."""
+    first, last = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    days = _PERIOD_START_DAYS[remitter]
+    periods = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        month_end = calendar.monthrange(year, month)[1]
+        ends = [day - 1 for day in days[1:]] + [month_end]
+        for start_day, end_day in zip(days, ends):
+            start, end = date(year, month, start_day), date(year, month, end_day)
+            if end >= first and start <= last:
+                periods.append((start.isoformat(), end.isoformat()))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return periods
+
+
+def due_date(remitter: str, period_start: str, period_end: str) -> str:
+    """
+    When CRA must receive a period's remittance: regular remitters by the 15th of the next month;
+    accelerated threshold 1 by the 25th for the 1st-15th and the 10th of the next month for the
+    rest; threshold 2 within three working days of the period's end (weekends skipped, public
+    holidays not).
+    """
+    end = date.fromisoformat(period_end)
+    next_month = date(end.year + 1, 1, 1) if end.month == 12 else date(end.year, end.month + 1, 1)
+    if remitter == "regular":
+        return next_month.replace(day=15).isoformat()
+    if remitter == "accelerated-1":
+        if period_start.endswith("-01"):
+            return end.replace(day=25).isoformat()
+        return next_month.replace(day=10).isoformat()
+    due, working_days = end, 0
+    while working_days < 3:
+        due += timedelta(days=1)
+        if due.weekday() < 5:
+            working_days += 1
+    return due.isoformat()
+
+
+def get_remittance_report(date_from: str, date_to: str, remitter: str = "regular", today: str = None) -> list:
+    """
+    Remittance totals for every period of the remitter type overlapping date_from..date_to
+    (YYYY-MM-DD), including periods with no runs, as dicts with REMITTANCE_FIELDS in date order.
+    total_due is employee and employer CPP and EI plus federal and provincial tax withheld.
+    Periods that ended before today (default: the current date) are closed; their totals are
+    cached, so asking again costs one small read however many runs they hold.
+    """
+    if remitter not in REMITTER_TYPES:
+        raise ValueError(f"Remitter type must be one of: {', '.join(REMITTER_TYPES)}")
+    if date_to < date_from:
+        raise ValueError("The end date must not be before the start date")
+    today = today or date.today().isoformat()
+    periods = remittance_periods(date_from, date_to, remitter)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT * FROM remittance_periods
+            WHERE remitter = ? AND period_start >= ? AND period_start <= ?
+        """, (remitter, periods[0][0], periods[-1][0]))
+        totals = {row['period_start']: dict(row) for row in cursor.fetchall()}
+        missing = [(start, end) for start, end in periods if start not in totals]
+        closed = [(start, end) for start, end in missing if end < today]
+        if missing:
+            if closed:
+                # Hold the write lock so no run can change between summing and caching the totals
+                cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(f"""
+                SELECT
+                    {_period_start_sql(remitter)} as period_start,
+                    COUNT(*) as run_count,
+                    COUNT(DISTINCT employee_id) as employee_count,
+                    {", ".join(f"COALESCE(SUM({field}), 0) as {field}" for field in _AMOUNT_FIELDS)}
+                FROM payroll_runs
+                WHERE pay_date >= ? AND pay_date <= ?
+                GROUP BY 1
+            """, (missing[0][0], missing[-1][1]))
+            found = {row['period_start']: dict(row) for row in cursor.fetchall()}
+            for start, end in missing:
+                totals[start] = found.get(start) or {"run_count": 0, "employee_count": 0,
+                                                     **dict.fromkeys(_AMOUNT_FIELDS, 0.0)}
+            if closed:
+                columns = ["run_count", "employee_count"] + _AMOUNT_FIELDS
+                cursor.executemany(f"""
+                    INSERT OR REPLACE INTO remittance_periods
+                    (remitter, period_start, period_end, month, {", ".join(columns)})
+                    VALUES (?, ?, ?, ?, {", ".join("?" * len(columns))})
+                """, [(remitter, start, end, start[:7], *(totals[start][column] for column in columns))
+                      for start, end in closed])
+                conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    report = []
+    for start, end in periods:
+        row = totals[start]
+        amounts = {field: round(row[field], 2) for field in _AMOUNT_FIELDS}
+        report.append({
+            "period_start": start,
+            "period_end": end,
+            "due_date": due_date(remitter, start, end),
+            "run_count": row['run_count'],
+            "employee_count": row['employee_count'],
+            **amounts,
+            "total_due": round(row['cpp_employee'] + row['cpp_employer'] + row['ei_employee'] + row['ei_employer']
+                               + row['federal_withholding'] + row['provincial_withholding'], 2),
+        })
+    return report
@@ -0,0 +1,322 @@
+# db/sql_trace.py
+"""
+SQL statement tracing for the database layer.
+While a trace is active, every statement SQLite runs (including BEGIN/COMMIT
+and each row of an executemany) is recorded with its duration, the db function
+that issued it and the connection it ran on, and new connections are counted.
+Statements that differ only by their parameters and are issued over and over
+from separate calls are reported as likely N+1 queries.
+
+    with sql_trace.trace() as t:
+        database.add_payroll_run(...)
+    print(t.format_report())
+
+    with sql_trace.query_budget(max_statements=1010, max_connections=1, label="save 1k cycle"):
+        database.add_payroll_runs_batch(pay_date, runs)
+
+Set PAYROLL_SQL_TRACE=1 (or pass --sql-trace on the command line) to print a
+report for the whole run on exit.
+"""
+import atexit
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Shapes issued from at least this many separate calls are flagged as possible N+1 queries
+REPEAT_THRESHOLD = 10
+# Rows shown in each section of the report
+REPORT_ROWS = 15
+
+_lock = threading.Lock()
+_active = []
+_call_ids = iter(range(1, sys.maxsize))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_VALUE_LISTS = re.compile(r"\(\?(?:,\s*\?)*\)(?:,\s*\(\?(?:,\s*\?)*\))*")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(sql: str) -> str:
+    """Statement text with literal values replaced by ?, so runs with different parameters compare equal."""
+    shape = _NUMBER.sub("?", _STRING.sub("?", sql))
+    return _SPACE.sub(" ", _VALUE_LISTS.sub("(?...)", shape)).strip()
+
+
+class Statement:
+    """One statement run by SQLite while tracing."""
+    __slots__ = ("sql", "operation", "connection", "call", "seconds")
+
+    def __init__(self, sql, operation, connection, call):
+        self.sql = sql
+        self.operation = operation
+        self.connection = connection
+        self.call = call
+        self.seconds = 0.0
+
+    @property
+    def shape(self) -> str:
+        return statement_shape(self.sql)
+
+
+class SQLTrace:
+    """Statements and connection opens recorded between start and end of a trace()."""
+    def __init__(self):
+        self.statements = []
+        self.connections = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def statement_count(self) -> int:
+        """Statements SQLite ran, counting each row of an executemany."""
+        return len(self.statements)
+
+    @property
+    def call_count(self) -> int:
+        """Round trips from Python: execute/executemany/commit calls that ran at least one statement."""
+        return len({statement.call for statement in self.statements})
+
+    @property
+    def connections_opened(self) -> int:
+        return len(self.connections)
+
+    @property
+    def sql_seconds(self) -> float:
+        return sum(statement.seconds for statement in self.statements)
+
+    def operations(self) -> dict:
+        """Per db function: {statements, calls, connections, seconds}, in first-use order."""
+        summary = {}
+        for operation in self.connections:
+            summary.setdefault(operation, {"statements": 0, "calls": set(), "connections": 0, "seconds": 0.0})
+            summary[operation]["connections"] += 1
+        for statement in self.statements:
+            entry = summary.setdefault(statement.operation,
+                                       {"statements": 0, "calls": set(), "connections": 0, "seconds": 0.0})
+            entry["statements"] += 1
+            entry["calls"].add(statement.call)
+            entry["seconds"] += statement.seconds
+        for entry in summary.values():
+            entry["calls"] = len(entry["calls"])
+        return summary
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> list:
+        """
+        Statement shapes issued from at least threshold separate calls (one executemany counts once),
+        as [(shape, calls, seconds)] with the most repeated first. These are the N+1 suspects.
+        """
+        calls, seconds = {}, {}
+        for statement in self.statements:
+            shape = statement.shape
+            calls.setdefault(shape, set()).add(statement.call)
+            seconds[shape] = seconds.get(shape, 0.0) + statement.seconds
+        found = [(shape, len(call_ids), seconds[shape]) for shape, call_ids in calls.items()
+                 if len(call_ids) >= threshold and not shape.startswith(("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA"))]
+        return sorted(found, key=lambda item: -item[1])
+
+    def format_report(self) -> str:
+        """Totals, the busiest db functions and any repeated statements, as text tables."""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        lines = ["SQL TRACE", "=" * 90,
+                 f"Statements: {self.statement_count} in {self.call_count} call(s), "
+                 f"{self.connections_opened} connection(s) opened, "
+                 f"{self.sql_seconds * 1000:.1f} ms in SQL of {elapsed * 1000:.1f} ms",
+                 "", f"{'Operation':<50}{'Conns':>7}{'Calls':>8}{'Stmts':>9}{'SQL ms':>11}"]
+        operations = sorted(self.operations().items(), key=lambda item: -item[1]["seconds"])
+        for operation, entry in operations[:REPORT_ROWS]:
+            lines.append(f"{operation[:49]:<50}{entry['connections']:>7}{entry['calls']:>8}"
+                         f"{entry['statements']:>9}{entry['seconds'] * 1000:>11.1f}")
+        repeated = self.repeated()
+        if repeated:
+            lines += ["", f"Possible N+1: statements repeated from {REPEAT_THRESHOLD}+ separate calls",
+                      f"{'Statement':<72}{'Calls':>8}{'SQL ms':>10}"]
+            for shape, calls, seconds in repeated[:REPORT_ROWS]:
+                lines.append(f"{shape[:71]:<72}{calls:>8}{seconds * 1000:>10.1f}")
+        return "\n".join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget() when a block issues more statements or connections than allowed."""
+
+
+def _operation() -> str:
+    """The outermost db function on the stack (e.g. database.add_payroll_run), or "other"."""
+    operation = "other"
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        name = frame.f_code.co_name
+        if module.startswith("db.") and module != __name__ and not name.startswith("_") and name != "get_connection":
+            operation = f"{module[3:]}.{name}"
+        frame = frame.f_back
+    return operation
+
+
+def connection_opened(conn):
+    """Count a new connection against every active trace. Called by db.database when it connects."""
+    if _active:
+        if isinstance(conn, TracedConnection):
+            conn._attach_trace()
+        operation = _operation()
+        with _lock:
+            for active in _active:
+                active.connections.append(operation)
+
+
+def _on_statement(conn, sql):
+    if not _active:
+        return
+    statement = Statement(sql, _operation(), id(conn), conn._trace_call or next(_call_ids))
+    if conn._trace_records is not None:
+        conn._trace_records.append(statement)
+    with _lock:
+        for active in _active:
+            active.statements.append(statement)
+
+
+def _timed(conn, records, method, *args):
+    """Run a cursor or connection method, sharing its time among the statements it ran (into records)."""
+    conn._trace_call = next(_call_ids)
+    conn._trace_records = records
+    start = time.perf_counter()
+    try:
+        return method(*args)
+    finally:
+        elapsed = time.perf_counter() - start
+        conn._trace_call = None
+        conn._trace_records = None
+        for statement in records:
+            statement.seconds += elapsed / len(records)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times its statements while a trace is active."""
+    _last_records = ()
+
+    def execute(self, sql, parameters=()):
+        if not _active:
+            return super().execute(sql, parameters)
+        return self._traced(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _active:
+            return super().executemany(sql, seq_of_parameters)
+        return self._traced(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        if not _active:
+            return super().executescript(sql_script)
+        return self._traced(super().executescript, sql_script)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def _traced(self, method, *args):
+        self.connection._attach_trace()
+        self._last_records = []
+        return _timed(self.connection, self._last_records, method, *args)
+
+    def _fetch(self, method, *args):
+        """Add the time spent stepping through rows to the statement that produced them."""
+        if not (_active and self._last_records):
+            return method(*args)
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._last_records[-1].seconds += time.perf_counter() - start
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose statements are recorded by active traces. Costs one check per call otherwise."""
+    _trace_attached = False
+    _trace_call = None
+    _trace_records = None
+
+    def _attach_trace(self):
+        if not self._trace_attached:
+            self.set_trace_callback(lambda sql: _on_statement(self, sql))
+            self._trace_attached = True
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def commit(self):
+        if not _active:
+            return super().commit()
+        self._attach_trace()
+        return _timed(self, [], super().commit)
+
+    def rollback(self):
+        if not _active:
+            return super().rollback()
+        self._attach_trace()
+        return _timed(self, [], super().rollback)
+
+
+@contextmanager
+def trace():
+    """Record every statement and connection open inside the block. Yields the SQLTrace."""
+    recorded = SQLTrace()
+    with _lock:
+        _active.append(recorded)
+    try:
+        yield recorded
+    finally:
+        recorded.finished = time.perf_counter()
+        with _lock:
+            _active.remove(recorded)
+
+
+@contextmanager
+def query_budget(max_statements: int = None, max_calls: int = None, max_connections: int = None,
+                 label: str = "block"):
+    """
+    Fail with QueryBudgetExceeded if the block runs more statements, Python round trips or
+    new connections than allowed. Yields the SQLTrace.
+    """
+    with trace() as recorded:
+        yield recorded
+    problems = []
+    if max_statements is not None and recorded.statement_count > max_statements:
+        problems.append(f"{recorded.statement_count} statements (budget {max_statements})")
+    if max_calls is not None and recorded.call_count > max_calls:
+        problems.append(f"{recorded.call_count} calls (budget {max_calls})")
+    if max_connections is not None and recorded.connections_opened > max_connections:
+        problems.append(f"{recorded.connections_opened} connections (budget {max_connections})")
+    if problems:
+        raise QueryBudgetExceeded(f"{label} used {', '.join(problems)}\n{recorded.format_report()}")
+
+
+def start_from_env() -> bool:
+    """If PAYROLL_SQL_TRACE is set, trace until exit and print the report to stderr then."""
+    if os.environ.get("PAYROLL_SQL_TRACE", "") in ("", "0"):
+        return False
+    start()
+    return True
+
+
+def start():
+    """Trace until exit, then print the report to stderr."""
+    recorded = SQLTrace()
+    with _lock:
+        _active.append(recorded)
+
+    def finish():
+        recorded.finished = time.perf_counter()
+        with _lock:
+            if recorded in _active:
+                _active.remove(recorded)
+        print(recorded.format_report(), file=sys.stderr)
+    atexit.register(finish)
@@ -0,0 +1,170 @@
+# logic/csv_pipeline.py
+"""
+Streaming payroll import for large timesheet exports.
+Rows flow through a chain of generators: read CSV -> validate -> chunk -> prefetch
+YTD -> calculate -> save -> write results CSV. Each stage pulls from the one before
+it, so input is only read as fast as results are written, and at most one chunk of
+rows is in memory at a time. Bad rows are written out with their error and never
+stop the stream.
+"""
+import csv
+from datetime import datetime
+from db.database import get_pay_contexts, add_payroll_runs
+from logic.payroll_calc import get_rate_context
+from payroll.inputs import parse_amount
+from utils.validators import validate_gross_pay, validate_pay_period_count
+
+# Rows per YTD lookup, calculation batch and insert transaction
+CHUNK_SIZE = 1000
+
+# Input needs employee_id, pay_date and gross; period_count is optional
+OUTPUT_FIELDS = ["line", "employee_id", "pay_date", "period_count", "status", "error",
+                 "gross", "cpp_employee", "cpp_employer", "ei_employee", "ei_employer",
+                 "federal_withholding", "provincial_withholding", "total_deductions", "net",
+                 "ytd_cpp_after", "ytd_ei_after"]
+
+
+def read_rows(f):
+    """Yield (line_no, row) for every CSV data row; the header is line 1."""
+    return enumerate(csv.DictReader(f), start=2)
+
+
+def parse_row(row: dict, default_period_count: int = 12) -> dict:
+    """Parse and validate one input row. Raises ValueError with the reason it can't be paid."""
+    try:
+        employee_id = int((row.get('employee_id') or "").strip())
+    except ValueError:
+        raise ValueError("employee_id must be a whole number")
+
+    pay_date = (row.get('pay_date') or "").strip()
+    try:
+        datetime.strptime(pay_date, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("pay_date must be in YYYY-MM-DD format")
+
+    gross = parse_amount(row.get('gross') or "", "gross")
+    is_valid, error_msg = validate_gross_pay(gross)
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    period_text = (row.get('period_count') or "").strip()
+    try:
+        period_count = int(period_text) if period_text else default_period_count
+    except ValueError:
+        raise ValueError("period_count must be a whole number")
+    is_valid, error_msg = validate_pay_period_count(period_count)
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    return {"employee_id": employee_id, "pay_date": pay_date, "gross": gross, "period_count": period_count}
+
+
+def validate_rows(rows, default_period_count: int = 12):
+    """Turn (line_no, row) pairs into records; rows that fail validation carry their error."""
+    for line_no, row in rows:
+        record = {"line": line_no, "employee_id": row.get('employee_id'), "pay_date": row.get('pay_date'),
+                  "period_count": row.get('period_count'), "gross": row.get('gross'), "error": None}
+        try:
+            record.update(parse_row(row, default_period_count))
+        except ValueError as e:
+            record['error'] = str(e)
+        yield record
+
+
+def chunked(records, size: int = CHUNK_SIZE):
+    """Group records into lists of up to size."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def prefetch_contexts(chunks):
+    """Attach each valid record's province, latest saved run and YTD, in one lookup per chunk."""
+    for chunk in chunks:
+        contexts = get_pay_contexts([(record['employee_id'], record['pay_date'])
+                                     for record in chunk if not record['error']])
+        for record in chunk:
+            if record['error']:
+                continue
+            record['context'] = contexts.get((record['employee_id'], record['pay_date']))
+            if record['context'] is None:
+                record['error'] = f"employee {record['employee_id']} not found"
+        yield chunk
+
+
+def calculate(chunks, carry: dict):
+    """
+    Check the one-run-per-month and chronological-order rules and calculate each valid record.
+    carry maps employee_id -> (pay_date, ytd_cpp_after, ytd_ei_after) for the employee's last
+    accepted row in this stream, so earlier rows count towards YTD before they are saved.
+    """
+    for chunk in chunks:
+        for record in chunk:
+            context = record.pop('context', None)
+            if record['error']:
+                continue
+            pay_date = record['pay_date']
+            latest_date = context['latest_date']
+            ytd_cpp, ytd_ei = context['ytd_cpp'], context['ytd_ei']
+            previous = carry.get(record['employee_id'])
+            if previous and (not latest_date or previous[0] > latest_date):
+                # Earlier row in the stream that isn't in the database yet
+                latest_date = previous[0]
+                if latest_date[:4] == pay_date[:4]:
+                    ytd_cpp, ytd_ei = previous[1], previous[2]
+
+            if latest_date and latest_date[:7] == pay_date[:7]:
+                record['error'] = f"a payroll run already exists in {pay_date[:7]}"
+                continue
+            if latest_date and pay_date < latest_date:
+                record['error'] = f"pay date is earlier than the most recent payroll run ({latest_date})"
+                continue
+
+            result = get_rate_context(context['province'], record['period_count']).compute(
+                record['gross'], ytd_cpp, ytd_ei)
+            record.update(result)
+            carry[record['employee_id']] = (pay_date, result['ytd_cpp_after'], result['ytd_ei_after'])
+        yield chunk
+
+
+def save_chunks(chunks):
+    """Insert each chunk's calculated runs in one transaction."""
+    for chunk in chunks:
+        runs = [(record['employee_id'], record['pay_date'], record, record['period_count'])
+                for record in chunk if not record['error']]
+        if runs:
+            add_payroll_runs(runs)
+        yield chunk
+
+
+def process_timesheet(source, destination, default_period_count: int = 12, save: bool = True,
+                      chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Pay every row of a timesheet CSV (employee_id, pay_date, gross[, period_count]) read from
+    the file object source, writing one result row per input row to destination.
+    Rows are saved as payroll runs unless save is False. Rows are paid in file order, so each
+    employee's rows must be in date order. Returns counts of rows, paid and errors.
+    """
+    stream = calculate(prefetch_contexts(chunked(validate_rows(read_rows(source), default_period_count),
+                                                 chunk_size)), carry={})
+    if save:
+        stream = save_chunks(stream)
+
+    writer = csv.DictWriter(destination, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    paid_status = "saved" if save else "calculated"
+    counts = {"rows": 0, "paid": 0, "errors": 0}
+    for chunk in stream:
+        for record in chunk:
+            record['status'] = "error" if record['error'] else paid_status
+            writer.writerow(record)
+        errors = sum(1 for record in chunk if record['error'])
+        counts['rows'] += len(chunk)
+        counts['errors'] += errors
+        counts['paid'] += len(chunk) - errors
+    return counts
@@ -0,0 +1,98 @@
+# logic/forecast.py
+"""
+Employer cost and CRA remittance forecast for the rest of the year.
+Every employee's CPP and EI and latest pay date over the runs saved for the
+year come from one aggregate query; the months after each employee's latest
+saved run are then projected for the whole workforce at once, one pay run per
+employee per month at salary / period_count (as run-cycle pays), with YTD
+carried forward so contributions stop when an employee reaches the CPP or EI
+maximum. Totals are reported month by month, saved runs included.
+"""
+import calendar
+from datetime import date
+from db.database import get_monthly_run_totals, get_workforce_ytd
+from logic.payroll_calc import get_rate_context
+from utils.validators import validate_gross_pay, validate_pay_period_count
+
+FORECAST_FIELDS = ["month", "pay_date", "remittance_due", "employees_paid", "runs_saved", "gross", "cpp_employee",
+                   "cpp_employer", "ei_employee", "ei_employer", "federal_withholding",
+                   "provincial_withholding", "employer_cost", "remittance", "reached_cpp_max", "reached_ei_max"]
+# Summed per month; employer_cost and remittance are derived from these
+_AMOUNT_FIELDS = ["gross", "cpp_employee", "cpp_employer", "ei_employee", "ei_employer",
+                  "federal_withholding", "provincial_withholding"]
+
+
+def remittance_due_date(year: int, month: int) -> str:
+    """Regular remitters pay a month's source deductions by the 15th of the next month."""
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return date(year, month, 15).isoformat()
+
+
+def forecast_employer_costs(as_of: str, period_count: int = 12) -> dict:
+    """
+    Forecast each month from the month of as_of (YYYY-MM-DD) to December. Runs already saved for
+    those months are counted as they are (runs_saved); every employee with a salary is projected
+    from the month after their latest saved run of the year, or as_of's month if later, starting
+    from the CPP and EI of all their saved runs that year.
+    Returns {"months": [dicts with FORECAST_FIELDS], "employees": count projected,
+    "skipped": count with no salary}. employees_paid counts saved and projected runs;
+    reached_cpp_max and reached_ei_max count projected runs only. employer_cost is gross plus
+    employer CPP and EI; remittance is employee and employer CPP and EI plus income tax withheld.
+    """
+    is_valid, error_msg = validate_pay_period_count(period_count)
+    if not is_valid:
+        raise ValueError(error_msg)
+    year, first_month = int(as_of[:4]), int(as_of[5:7])
+
+    # Per employee: [context, gross, first month, ytd_cpp, ytd_ei]
+    workforce, skipped = [], 0
+    for row in get_workforce_ytd(year):
+        gross = round((row['salary'] or 0) / period_count, 2)
+        if not validate_gross_pay(gross)[0]:
+            skipped += 1
+            continue
+        # Months up to the latest saved run are paid already, including any after as_of
+        starts = first_month
+        if row['last_pay_date'] is not None:
+            starts = max(first_month, int(row['last_pay_date'][5:7]) + 1)
+        workforce.append([get_rate_context(row['province'], period_count), gross, starts,
+                          float(row['ytd_cpp']), float(row['ytd_ei'])])
+    saved = {row['month']: row for row in get_monthly_run_totals(f"{as_of[:7]}-01", f"{year:04d}-12-31")}
+
+    months = []
+    for month in range(first_month, 13):
+        totals = dict.fromkeys(_AMOUNT_FIELDS, 0.0)
+        saved_runs = saved.get(f"{year:04d}-{month:02d}")
+        if saved_runs:
+            totals = {field: float(saved_runs[field] or 0) for field in _AMOUNT_FIELDS}
+        runs_saved = saved_runs['run_count'] if saved_runs else 0
+        paid = reached_cpp = reached_ei = 0
+        for employee in workforce:
+            context, gross, starts, ytd_cpp, ytd_ei = employee
+            if month < starts:
+                continue
+            result = context.compute(gross, ytd_cpp, ytd_ei)
+            employee[3], employee[4] = result['ytd_cpp_after'], result['ytd_ei_after']
+            paid += 1
+            for field in _AMOUNT_FIELDS:
+                totals[field] += result[field]
+            if ytd_cpp < context.annual_max_cpp <= result['ytd_cpp_after'] + 0.005:
+                reached_cpp += 1
+            if ytd_ei < context.annual_max_ei <= result['ytd_ei_after'] + 0.005:
+                reached_ei += 1
+        totals = {field: round(value, 2) for field, value in totals.items()}
+        months.append({
+            "month": f"{year:04d}-{month:02d}",
+            "pay_date": date(year, month, calendar.monthrange(year, month)[1]).isoformat(),
+            "remittance_due": remittance_due_date(year, month),
+            "employees_paid": runs_saved + paid,
+            "runs_saved": runs_saved,
+            **totals,
+            "employer_cost": round(totals['gross'] + totals['cpp_employer'] + totals['ei_employer'], 2),
+            "remittance": round(totals['cpp_employee'] + totals['cpp_employer'] + totals['ei_employee']
+                                + totals['ei_employer'] + totals['federal_withholding']
+                                + totals['provincial_withholding'], 2),
+            "reached_cpp_max": reached_cpp,
+            "reached_ei_max": reached_ei,
+        })
+    return {"months": months, "employees": len(workforce), "skipped": skipped}
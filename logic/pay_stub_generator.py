@@ -0,0 +1,113 @@
+# logic/pay_stub_generator.py
+"""
+Pay stub generation for a saved payroll cycle.
+Renders one stub per payroll run saved on a pay date, with current-period
+figures and YTD totals, and streams them to per-employee files or a ZIP archive.
+"""
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from utils.resource_path import resource_path
+from db.database import get_company_settings, get_pay_stub_rows
+from logic.t4_generator import format_company_address
+
+PAY_STUB_TEMPLATE = resource_path("data/pay_stub_template.html")
+
+# Cycles with at least this many runs are rendered across worker processes
+PARALLEL_THRESHOLD = 200
+CHUNK_SIZE = 50
+
+# Compiled template (bound format_map of the template text), loaded once per process
+_compiled_template = None
+
+def _get_compiled_template():
+    """Load the pay stub template once and return its renderer."""
+    global _compiled_template
+    if _compiled_template is None:
+        with open(PAY_STUB_TEMPLATE, "r", encoding="utf-8") as f:
+            _compiled_template = f.read().format_map
+    return _compiled_template
+
+def get_company_header() -> dict:
+    """Get the company fields printed on every stub."""
+    company_settings = dict(get_company_settings())
+    return {
+        "COMPANY_NAME": company_settings.get("company_name", "Not Set"),
+        "COMPANY_ADDRESS": format_company_address(company_settings),
+    }
+
+def pay_stub_filename(row: dict) -> str:
+    """Build a filesystem-safe file name for one employee's stub."""
+    safe_name = re.sub(r'[^A-Za-z0-9]+', '_', row['employee_name']).strip('_')
+    return f"PayStub_{safe_name}_{row['pay_date']}_{row['id']}.html"
+
+def render_pay_stub(row: dict, company: dict) -> str:
+    """Render one pay stub from a row returned by get_pay_stub_rows()."""
+    render = _get_compiled_template()
+    return render({
+        **company,
+        "PAY_DATE": row['pay_date'],
+        "RUN_ID": row['id'],
+        "EMP_NAME": row['employee_name'],
+        "EMP_SIN": row['employee_sin'] or "Not Provided",
+        "EMP_PROVINCE": row['employee_province'],
+        "PERIOD_COUNT": row['period_count'],
+        "GROSS": f"{row['gross']:.2f}",
+        "CPP": f"{row['cpp_employee']:.2f}",
+        "EI": f"{row['ei_employee']:.2f}",
+        "FEDERAL": f"{row['federal_withholding']:.2f}",
+        "PROVINCIAL": f"{row['provincial_withholding']:.2f}",
+        "DEDUCTIONS": f"{row['total_deductions']:.2f}",
+        "NET": f"{row['net']:.2f}",
+        "YTD_GROSS": f"{row['ytd_gross']:.2f}",
+        "YTD_CPP": f"{row['ytd_cpp']:.2f}",
+        "YTD_EI": f"{row['ytd_ei']:.2f}",
+        "YTD_FEDERAL": f"{row['ytd_federal']:.2f}",
+        "YTD_PROVINCIAL": f"{row['ytd_provincial']:.2f}",
+        "YTD_DEDUCTIONS": f"{row['ytd_deductions']:.2f}",
+        "YTD_NET": f"{row['ytd_net']:.2f}",
+    })
+
+def _render_chunk(rows: list, company: dict) -> list:
+    """Render a chunk of stubs. Runs in a worker process for large cycles."""
+    return [(pay_stub_filename(row), render_pay_stub(row, company)) for row in rows]
+
+def iter_pay_stubs(pay_date: str, processes: int = None):
+    """
+    Yield (filename, html) for every payroll run saved on pay_date, in employee order.
+    Cycles of PARALLEL_THRESHOLD runs or more are rendered in a process pool.
+    """
+    # sqlite3.Row objects can't be pickled, so hand plain dicts to the workers
+    rows = [dict(row) for row in get_pay_stub_rows(pay_date)]
+    company = get_company_header()
+
+    if len(rows) < PARALLEL_THRESHOLD:
+        for row in rows:
+            yield pay_stub_filename(row), render_pay_stub(row, company)
+        return
+
+    chunks = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for rendered in pool.map(_render_chunk, chunks, [company] * len(chunks)):
+            yield from rendered
+
+def generate_pay_stubs(pay_date: str, output_path: str, archive: bool = False, processes: int = None) -> int:
+    """
+    Write a pay stub for every payroll run saved on pay_date.
+    Writes one HTML file per employee into the output_path directory, or a single
+    ZIP archive at output_path if archive is True. Returns the number of stubs written.
+    """
+    count = 0
+    if archive:
+        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for filename, html in iter_pay_stubs(pay_date, processes):
+                zf.writestr(filename, html)
+                count += 1
+    else:
+        os.makedirs(output_path, exist_ok=True)
+        for filename, html in iter_pay_stubs(pay_date, processes):
+            with open(os.path.join(output_path, filename), "w", encoding="utf-8") as f:
+                f.write(html)
+            count += 1
+    return count
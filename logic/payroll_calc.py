@@ -109,3 +109,99 @@ def compute_payroll(gross: float, province: str="ON", period_count:int=12, ytd_c
         "ytd_cpp_after": round(ytd_cpp + cpp_emp, 2),
         "ytd_ei_after": round(ytd_ei + ei_emp, 2)
     }
+
+class RateContext:
+    """
+    Rates for one province and pay frequency, resolved once and reused for every calculation.
+    compute() returns exactly what compute_payroll() returns for the same inputs, without
+    re-deriving annual maximums or looking up brackets on each call. Withholding doesn't
+    depend on YTD, so it is remembered per gross amount.
+    """
+    # Withholding results remembered per context before the memo is reset
+    MAX_MEMO = 4096
+    
+    def __init__(self, province: str = "ON", period_count: int = 12):
+        self.province = province
+        self.period_count = period_count
+        self.max_pensionable = tax_tables.CPP_YMPE_2025 - tax_tables.CPP_BASIC_EXEMPTION
+        self.annual_max_cpp = self.max_pensionable * tax_tables.CPP_RATE_2025
+        self.annual_max_ei = tax_tables.EI_MAX_INSURABLE_2025 * tax_tables.EI_RATE_2025
+        self.federal_brackets = tax_tables.FEDERAL_BRACKETS_2025
+        self.provincial_brackets = tax_tables.PROVINCIAL_BRACKETS_2025.get(province.upper())
+        self._withholding = {}
+    
+    def withholding(self, gross: float) -> Tuple[float, float]:
+        """Federal and provincial withholding, as calc_federal_and_provincial_withholding()."""
+        cached = self._withholding.get(gross)
+        if cached is not None:
+            return cached
+        annual = gross * self.period_count
+        fed_tax = progressive_tax_from_brackets(annual, self.federal_brackets)
+        prov_tax = progressive_tax_from_brackets(annual, self.provincial_brackets) if self.provincial_brackets else 0.0
+        result = (round(fed_tax / self.period_count, 2), round(prov_tax / self.period_count, 2))
+        if len(self._withholding) >= self.MAX_MEMO:
+            self._withholding = {}
+        self._withholding[gross] = result
+        return result
+    
+    def compute(self, gross: float, ytd_cpp: float = 0.0, ytd_ei: float = 0.0) -> dict:
+        """Compute all deductions, as compute_payroll()."""
+        period_count = self.period_count
+        annual_gross = gross * period_count
+        
+        # CPP, as calc_cpp_for_period()
+        if ytd_cpp >= self.annual_max_cpp:
+            cpp_emp = 0.0
+        else:
+            pensionable = max(0.0, min(annual_gross - tax_tables.CPP_BASIC_EXEMPTION, self.max_pensionable))
+            per_period = min(pensionable * tax_tables.CPP_RATE_2025 / period_count, self.annual_max_cpp - ytd_cpp)
+            cpp_emp = round(per_period, 2)
+        
+        # EI, as calc_ei_for_period()
+        if ytd_ei >= self.annual_max_ei:
+            ei_emp, ei_er = 0.0, 0.0
+        else:
+            insurable = min(annual_gross, tax_tables.EI_MAX_INSURABLE_2025)
+            per_period_emp = min(insurable * tax_tables.EI_RATE_2025 / period_count, self.annual_max_ei - ytd_ei)
+            ei_emp = round(per_period_emp, 2)
+            ei_er = round(per_period_emp * tax_tables.EI_EMPLOYER_MULTIPLIER, 2)
+        
+        fed, prov = self.withholding(gross)
+        total_deductions = round(cpp_emp + ei_emp + fed + prov, 2)
+        return {
+            "gross": round(gross,2),
+            "cpp_employee": cpp_emp,
+            "cpp_employer": cpp_emp,
+            "ei_employee": ei_emp,
+            "ei_employer": ei_er,
+            "federal_withholding": fed,
+            "provincial_withholding": prov,
+            "total_deductions": total_deductions,
+            "net": round(gross - total_deductions, 2),
+            "ytd_cpp_after": round(ytd_cpp + cpp_emp, 2),
+            "ytd_ei_after": round(ytd_ei + ei_emp, 2)
+        }
+
+# Shared contexts by (province, period_count)
+_rate_contexts = {}
+
+def get_rate_context(province: str = "ON", period_count: int = 12) -> RateContext:
+    """Get the shared RateContext for a province and pay frequency, creating it on first use."""
+    key = (province, period_count)
+    context = _rate_contexts.get(key)
+    if context is None:
+        context = _rate_contexts[key] = RateContext(province, period_count)
+    return context
+
+def compute_payroll_batch(entries):
+    """
+    Compute payroll for many employees in one call.
+    entries is an iterable of dicts with gross, province, period_count and optional ytd_cpp/ytd_ei.
+    Returns a list of result dicts in the same order, identical to calling compute_payroll() per entry.
+    Rates are resolved once per (province, period_count) and withholding once per distinct gross.
+    """
+    results = []
+    for entry in entries:
+        context = get_rate_context(entry.get('province', "ON"), entry.get('period_count', 12))
+        results.append(context.compute(entry['gross'], entry.get('ytd_cpp', 0.0), entry.get('ytd_ei', 0.0)))
+    return results
@@ -0,0 +1,195 @@
+# logic/simulation.py
+"""
+What-if salary sweeps over provinces and pay frequencies.
+salary_sweep() evaluates the payroll calculation for every combination of a
+list of salaries (or per-period gross amounts), provinces and period counts,
+one column at a time: CPP, EI and federal tax are worked out once per period
+count and shared by every province, and bracket taxes are looked up with
+bisect against running totals instead of walking the brackets for each point.
+Every result is identical to compute_payroll() for a first pay of the year
+(no YTD contributions).
+
+marginal_breakpoints() lists the incomes where the marginal deduction rate
+changes (CPP exemption and maximum, EI maximum, tax brackets).
+"""
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List
+from . import tax_tables
+
+PROVINCES = list(tax_tables.PROVINCIAL_BRACKETS_2025)
+PERIOD_COUNTS = [12, 24, 26, 52]
+
+SWEEP_FIELDS = ["province", "period_count", "salary", "gross", "cpp_employee", "cpp_employer",
+                "ei_employee", "ei_employer", "federal_withholding", "provincial_withholding",
+                "total_deductions", "net", "annual_net", "effective_rate", "marginal_rate"]
+BREAKPOINT_FIELDS = ["province", "period_count", "annual_income", "gross_per_period", "rate_below",
+                     "rate_above", "reason"]
+
+
+def amount_grid(start: float, stop: float, step: float) -> List[float]:
+    """Amounts from start to stop inclusive, step apart, in whole cents (no drift from adding floats)."""
+    if step <= 0:
+        raise ValueError("step must be greater than zero")
+    if stop < start:
+        raise ValueError("the end of the range must not be below its start")
+    start_cents, step_cents = round(start * 100), round(step * 100)
+    if step_cents == 0:
+        raise ValueError("step must be at least 0.01")
+    count = (round(stop * 100) - start_cents) // step_cents + 1
+    return [(start_cents + i * step_cents) / 100 for i in range(count)]
+
+
+def _bracket_taxes(annual_amounts: List[float], brackets: list) -> List[float]:
+    """
+    progressive_tax_from_brackets() for every amount. The tax of the full brackets below each
+    one is summed in the same order as the loop there, so the results are bit-for-bit the same.
+    """
+    uppers = [upper for upper, _ in brackets]
+    rates = [rate for _, rate in brackets]
+    lowers = [0.0] + uppers[:-1]
+    below = [0.0]
+    for lower, upper, rate in zip(lowers, uppers, rates):
+        below.append(below[-1] + max(0.0, upper - lower) * rate)
+    last = len(brackets)
+    taxes = []
+    for amount, k in zip(annual_amounts, [bisect_left(uppers, amount) for amount in annual_amounts]):
+        taxes.append(below[k] + max(0.0, amount - lowers[k]) * rates[k] if k < last else below[last])
+    return taxes
+
+
+def _thresholds(province: str) -> list:
+    """[(annual income, reason)] where some deduction's marginal rate changes, sorted by income."""
+    found = [(float(tax_tables.CPP_BASIC_EXEMPTION), "CPP basic exemption"),
+             (float(tax_tables.CPP_YMPE_2025), "CPP maximum pensionable earnings"),
+             (float(tax_tables.EI_MAX_INSURABLE_2025), "EI maximum insurable earnings")]
+    found += [(float(upper), "federal bracket") for upper, _ in tax_tables.FEDERAL_BRACKETS_2025
+              if upper != float("inf")]
+    found += [(float(upper), f"{province} bracket")
+              for upper, _ in tax_tables.PROVINCIAL_BRACKETS_2025.get(province.upper()) or []
+              if upper != float("inf")]
+    return sorted(found)
+
+
+def marginal_rate(annual_income: float, province: str = "ON") -> float:
+    """
+    Share of the next dollar of pay that goes to CPP, EI and income tax at this annual income
+    (rounding to cents aside). At a threshold, the rate just above it.
+    """
+    rate = 0.0
+    if tax_tables.CPP_BASIC_EXEMPTION <= annual_income < tax_tables.CPP_YMPE_2025:
+        rate += tax_tables.CPP_RATE_2025
+    if annual_income < tax_tables.EI_MAX_INSURABLE_2025:
+        rate += tax_tables.EI_RATE_2025
+    for brackets in (tax_tables.FEDERAL_BRACKETS_2025, tax_tables.PROVINCIAL_BRACKETS_2025.get(province.upper())):
+        if brackets:
+            index = bisect_right([upper for upper, _ in brackets], annual_income)
+            rate += brackets[min(index, len(brackets) - 1)][1]
+    return round(rate, 6)
+
+
+def marginal_breakpoints(province: str = "ON", period_counts: Iterable[int] = PERIOD_COUNTS) -> List[dict]:
+    """
+    The incomes where the marginal rate changes, for each period count, as dicts with
+    BREAKPOINT_FIELDS. Thresholds shared by several rules are reported once, with all reasons.
+    """
+    merged = {}
+    for income, reason in _thresholds(province):
+        merged.setdefault(income, []).append(reason)
+    breakpoints = []
+    for period_count in period_counts:
+        previous = 0.0
+        for income, reasons in merged.items():
+            breakpoints.append({
+                "province": province,
+                "period_count": period_count,
+                "annual_income": round(income, 2),
+                "gross_per_period": round(income / period_count, 2),
+                "rate_below": marginal_rate(previous, province),
+                "rate_above": marginal_rate(income, province),
+                "reason": "; ".join(reasons),
+            })
+            previous = income
+    return breakpoints
+
+
+def salary_sweep(amounts: Iterable[float], provinces: Iterable[str] = None,
+                 period_counts: Iterable[int] = PERIOD_COUNTS, annual: bool = True) -> dict:
+    """
+    Evaluate the payroll calculation over amounts x provinces x period_counts.
+    With annual=True the amounts are salaries, paid as round(salary / period_count, 2) per period;
+    otherwise they are per-period gross amounts.
+    Returns {field: [values]} for SWEEP_FIELDS, ordered by province, then period count, then amount.
+    """
+    amounts = list(amounts)
+    provinces = [province.upper() for province in (provinces or PROVINCES)]
+    period_counts = list(period_counts)
+    for province in provinces:
+        if province not in tax_tables.PROVINCIAL_BRACKETS_2025:
+            raise ValueError(f"unknown province {province}")
+
+    cpp_rate, ei_rate = tax_tables.CPP_RATE_2025, tax_tables.EI_RATE_2025
+    exemption, ei_max_insurable = tax_tables.CPP_BASIC_EXEMPTION, tax_tables.EI_MAX_INSURABLE_2025
+    ei_multiplier = tax_tables.EI_EMPLOYER_MULTIPLIER
+    max_pensionable = tax_tables.CPP_YMPE_2025 - exemption
+    annual_max_cpp = max_pensionable * cpp_rate
+    annual_max_ei = ei_max_insurable * ei_rate
+
+    # Everything but provincial tax depends only on the period count
+    by_period = {}
+    for period_count in period_counts:
+        gross = [round(amount / period_count, 2) for amount in amounts] if annual else amounts
+        annual_gross = [value * period_count for value in gross]
+        cpp_per_period = [min(max(0.0, min(value - exemption, max_pensionable)) * cpp_rate / period_count,
+                              annual_max_cpp) for value in annual_gross]
+        ei_per_period = [min(min(value, ei_max_insurable) * ei_rate / period_count, annual_max_ei)
+                         for value in annual_gross]
+        federal = [round(tax / period_count, 2)
+                   for tax in _bracket_taxes(annual_gross, tax_tables.FEDERAL_BRACKETS_2025)]
+        cpp = [round(value, 2) for value in cpp_per_period]
+        ei = [round(value, 2) for value in ei_per_period]
+        by_period[period_count] = {
+            "salary": amounts if annual else [round(value, 2) for value in annual_gross],
+            "gross": gross,
+            "annual_gross": annual_gross,
+            "cpp": cpp,
+            "ei": ei,
+            "ei_employer": [round(value * ei_multiplier, 2) for value in ei_per_period],
+            "federal": federal,
+            # Added in compute_payroll's order, so the total rounds the same way
+            "base": [c + e + f for c, e, f in zip(cpp, ei, federal)],
+        }
+
+    columns = {field: [] for field in SWEEP_FIELDS}
+    for province in provinces:
+        thresholds = sorted({income for income, _ in _thresholds(province)})
+        rates = [marginal_rate(0.0, province)] + [marginal_rate(income, province) for income in thresholds]
+        for period_count in period_counts:
+            part = by_period[period_count]
+            provincial = [round(tax / period_count, 2) for tax in
+                          _bracket_taxes(part["annual_gross"], tax_tables.PROVINCIAL_BRACKETS_2025[province])]
+            total = [round(base + prov, 2) for base, prov in zip(part["base"], provincial)]
+            net = [round(gross - deductions, 2) for gross, deductions in zip(part["gross"], total)]
+            columns["province"] += [province] * len(amounts)
+            columns["period_count"] += [period_count] * len(amounts)
+            columns["salary"] += part["salary"]
+            columns["gross"] += [round(gross, 2) for gross in part["gross"]]
+            columns["cpp_employee"] += part["cpp"]
+            columns["cpp_employer"] += part["cpp"]
+            columns["ei_employee"] += part["ei"]
+            columns["ei_employer"] += part["ei_employer"]
+            columns["federal_withholding"] += part["federal"]
+            columns["provincial_withholding"] += provincial
+            columns["total_deductions"] += total
+            columns["net"] += net
+            columns["annual_net"] += [round(value * period_count, 2) for value in net]
+            columns["effective_rate"] += [round(deductions / gross, 4) if gross else 0.0
+                                          for deductions, gross in zip(total, part["gross"])]
+            columns["marginal_rate"] += [rates[bisect_right(thresholds, value)] for value in part["annual_gross"]]
+    return columns
+
+
+def sweep_rows(columns: dict):
+    """Yield the sweep as one dict per point, for writing out."""
+    fields = list(columns)
+    for values in zip(*(columns[field] for field in fields)):
+        yield dict(zip(fields, values))
@@ -1,21 +1,14 @@
 # logic/t4_generator.py
 import os
+import re
 from datetime import date
 from utils.resource_path import resource_path
 from db.database import get_company_settings
 
 T4_TEMPLATE = resource_path("data/t4_template.html")
 
-def generate_t4_html(employee: dict, year: int, totals: dict) -> str:
-    """
-    Generate HTML for a T4 slip using the template file.
-    Includes company information from database.
-    Template supports placeholders for employee, company, and box amounts.
-    """
-    # Get company settings and convert Row to dict
-    company_settings = dict(get_company_settings())
-    
-    # Format company address
+def format_company_address(company_settings: dict) -> str:
+    """Format the company street, city, province and postal code as one line."""
     address_parts = []
     if company_settings['address_street']:
         address_parts.append(company_settings['address_street'])
@@ -26,7 +19,22 @@ def generate_t4_html(employee: dict, year: int, totals: dict) -> str:
         if company_settings['address_postal']:
             city_prov += f" {company_settings['address_postal']}"
         address_parts.append(city_prov)
-    company_address = ", ".join(address_parts) if address_parts else "Address not provided"
+    return ", ".join(address_parts) if address_parts else "Address not provided"
+
+def t4_filename(employee: dict, year: int) -> str:
+    """Build a filesystem-safe file name for one employee's T4 slip."""
+    safe_name = re.sub(r'[^A-Za-z0-9]+', '_', employee['name']).strip('_')
+    return f"T4_{safe_name}_{employee['id']}_{year}.html"
+
+def generate_t4_html(employee: dict, year: int, totals: dict) -> str:
+    """
+    Generate HTML for a T4 slip using the template file.
+    Includes company information from database.
+    Template supports placeholders for employee, company, and box amounts.
+    """
+    # Get company settings and convert Row to dict
+    company_settings = dict(get_company_settings())
+    company_address = format_company_address(company_settings)
     
     if not os.path.exists(T4_TEMPLATE):
         # fallback simple inline template
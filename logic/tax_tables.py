@@ -6,6 +6,7 @@ Falls back to hardcoded 2025 values if JSON not found.
 """
 import json
 import os
+import sys
 from datetime import datetime
 
 # Hardcoded fallback values for 2025 (in case JSON fails to load)
@@ -89,7 +90,7 @@ def load_tax_rates(year: int = None):
         
     except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
         # Fall back to hardcoded 2025 values
-        print(f"Warning: Could not load tax rates for {year}, using fallback values. Error: {e}")
+        print(f"Warning: Could not load tax rates for {year}, using fallback values. Error: {e}", file=sys.stderr)
         rates = {
             "year": 2025,
             "cpp_rate": _FALLBACK_CPP_RATE,
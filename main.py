@@ -1,16 +1,25 @@
 # main.py
+from utils import startup_timing
 import tkinter as tk
-from tkinter import ttk
+import os
 import sys
 from ui.main_window import MainWindow
-from db.database import init_db
 
 def main():
-    # Initialize database
-    init_db()
+    startup_timing.mark("imports done")
+    # PAYROLL_PROFILE=1|cprofile|sample reports where the time went when the app exits.
+    # Both tools are imported only when asked for, to keep them off the startup path.
+    if os.environ.get("PAYROLL_PROFILE", "") not in ("", "0"):
+        from utils import profiling
+        profiling.enable_from_env()
+    # PAYROLL_SQL_TRACE=1 reports statement and connection counts per db operation on exit
+    if os.environ.get("PAYROLL_SQL_TRACE", "") not in ("", "0"):
+        from db import sql_trace
+        sql_trace.start_from_env()
     
-    # Create main window
+    # Create main window (the database is initialized by the app's background worker)
     root = tk.Tk()
+    startup_timing.mark("Tk created")
     
     # Force classic theme on macOS to allow button color customization
     try:
@@ -33,8 +42,22 @@ def main():
     # Create app
     app = MainWindow(root)
     
+    # Report startup timing once the first screen has been drawn
+    def on_first_paint():
+        startup_timing.mark("first screen shown")
+        if startup_timing.report_enabled():
+            print(startup_timing.format_report(), flush=True)
+        # Used by benchmarks.startup_bench to time a cold start without a person closing the window
+        if startup_timing.exit_requested():
+            root.destroy()
+    root.after_idle(on_first_paint)
+    
     # Start the application
     root.mainloop()
 
 if __name__ == "__main__":
+    # Needed for process pools (pay stub rendering) in the PyInstaller build
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
     main()
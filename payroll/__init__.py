@@ -0,0 +1,5 @@
+# payroll/__init__.py
+"""
+Headless command-line interface: python -m payroll --help
+Imports only the logic and db layers, never tkinter.
+"""
@@ -0,0 +1,6 @@
+# payroll/__main__.py
+import sys
+from payroll.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
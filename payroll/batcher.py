@@ -0,0 +1,227 @@
+# payroll/batcher.py
+"""
+asyncio micro-batching in front of the calculation engine.
+Concurrent single calculations are collected for a short window (or until a
+batch is full) and run as one compute_payroll_batch call; each caller's future
+is resolved with its own result. Also serves them over HTTP:
+python -m payroll serve --batching
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from logic.payroll_calc import compute_payroll_batch
+from payroll.inputs import parse_compute_row
+
+# Defaults: wait at most 2 ms for more requests, and never batch more than 256
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 256
+# Latencies kept for the percentiles
+LATENCY_SAMPLES = 10000
+# Same request limits as the threaded service
+MAX_BODY_BYTES = 5 * 1024 * 1024
+MAX_BATCH = 10000
+
+
+class BatchMetrics:
+    """Counters and recent latencies for a MicroBatcher."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start counting again from now."""
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.compute_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def record_batch(self, size, compute_seconds, latencies):
+        """Record one flushed batch and the queue-to-result latency of each request in it."""
+        self.requests += size
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.compute_seconds += compute_seconds
+        self.latencies.extend(latencies)
+
+    def snapshot(self) -> dict:
+        """Current throughput, batch sizes and latency percentiles (ms)."""
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "requests_per_second": round(self.requests / elapsed, 1) if elapsed > 0 else 0.0,
+            "mean_batch_compute_ms": round(self.compute_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "latency_p50_ms": round(percentile(0.50), 3),
+            "latency_p95_ms": round(percentile(0.95), 3),
+            "latency_p99_ms": round(percentile(0.99), 3),
+        }
+
+
+class MicroBatcher:
+    """
+    Collects calculations submitted from coroutines into batches.
+    A batch is run when max_batch entries are waiting, or window_ms after its first entry
+    arrived, whichever comes first. window_ms=0 runs whatever has queued by the next loop turn.
+    batch_func takes a list of entries and returns a list of results in the same order.
+    """
+    def __init__(self, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH, batch_func=compute_payroll_batch):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batch_func = batch_func
+        self.metrics = BatchMetrics()
+        self._pending = []
+        self._timer = None
+
+    async def compute(self, entry: dict) -> dict:
+        """Calculate one validated entry (as from parse_compute_row) as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((entry, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        """Run everything waiting as one batch and resolve each caller's future."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        started = time.perf_counter()
+        try:
+            results = self.batch_func([entry for entry, _, _ in pending])
+        except Exception as e:
+            for _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        for (_, future, _), result in zip(pending, results):
+            # Callers that gave up (cancelled) just don't get their result
+            if not future.done():
+                future.set_result(result)
+        self.metrics.record_batch(len(pending), finished - started,
+                                  [finished - queued for _, _, queued in pending])
+
+
+class BatchingHTTPFrontEnd:
+    """
+    Minimal asyncio HTTP/1.1 front end with keep-alive.
+    POST /compute goes through the MicroBatcher; POST /compute/batch calls the batch path
+    directly; GET /metrics returns BatchMetrics.snapshot() (?reset=1 starts a new window).
+    """
+    def __init__(self, batcher: MicroBatcher, verbose=False):
+        self.batcher = batcher
+        self.verbose = verbose
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {"error": "request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, target, body)
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                await self.respond(writer, status, payload, close)
+                if self.verbose:
+                    print(f"{method} {target} {status}", file=sys.stderr)
+                if close:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        """Run one request. Returns (status, payload)."""
+        path, _, query = target.partition("?")
+        try:
+            if path == "/health" and method == "GET":
+                return 200, {"status": "ok"}
+            if path == "/metrics" and method == "GET":
+                snapshot = self.batcher.metrics.snapshot()
+                if "reset=1" in query.split("&"):
+                    self.batcher.metrics.reset()
+                return 200, snapshot
+            if path not in ("/compute", "/compute/batch") or method != "POST":
+                return 404, {"error": f"no endpoint for {method} {path}"}
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                return 400, {"error": "request body must be JSON"}
+            if path == "/compute":
+                return 200, await self.batcher.compute(parse_compute_row(request if isinstance(request, dict) else {}))
+            entries = request.get('entries') if isinstance(request, dict) else None
+            if not isinstance(entries, list):
+                return 400, {"error": "body must be an object with an entries list"}
+            if len(entries) > MAX_BATCH:
+                return 400, {"error": f"at most {MAX_BATCH} entries per batch"}
+            parsed = []
+            for index, entry in enumerate(entries):
+                try:
+                    parsed.append(parse_compute_row(entry if isinstance(entry, dict) else {}))
+                except ValueError as e:
+                    return 400, {"error": f"entries[{index}]: {e}"}
+            return 200, {"results": compute_payroll_batch(parsed)}
+        except ValueError as e:
+            # An input parse_compute_row rejected
+            return 400, {"error": str(e)}
+
+    async def respond(self, writer, status, payload, close=False):
+        """Write a JSON response in one send."""
+        body = json.dumps(payload).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}.get(status, "")
+        head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def _serve(host, port, window_ms, max_batch, verbose):
+    front_end = BatchingHTTPFrontEnd(MicroBatcher(window_ms, max_batch), verbose)
+    server = await asyncio.start_server(front_end.handle_connection, host, port)
+    print(f"Batching payroll service on http://{host}:{port} "
+          f"(window {window_ms} ms, max batch {max_batch}; Ctrl+C to stop)", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(host="127.0.0.1", port=8080, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH, verbose=False):
+    """Run the batching front end until interrupted."""
+    try:
+        asyncio.run(_serve(host, port, window_ms, max_batch, verbose))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,600 @@
+# payroll/cli.py
+"""
+Command-line entry point for scripted and scheduled payroll jobs.
+Each command imports the logic and db modules it needs when it runs, so startup
+stays fast and no GUI toolkit is ever loaded. CSV input is read from a file or
+from stdin ("-"), and output goes to a file or stdout, so commands can be
+chained in shell pipelines and cron jobs.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from payroll.inputs import parse_amount, parse_compute_row
+
+# Calculation columns written by compute and run-cycle
+RESULT_FIELDS = ["gross", "cpp_employee", "cpp_employer", "ei_employee", "ei_employer",
+                 "federal_withholding", "provincial_withholding", "total_deductions", "net",
+                 "ytd_cpp_after", "ytd_ei_after"]
+RUN_FIELDS = ["id", "employee_id", "employee_name", "pay_date", "period_count", "gross",
+              "cpp_employee", "cpp_employer", "ei_employee", "ei_employer", "federal_withholding",
+              "provincial_withholding", "total_deductions", "net"]
+EMPLOYEE_FIELDS = ["id", "name", "sin", "province", "salary"]
+
+# Input rows calculated per batch, so large files are streamed rather than loaded whole
+COMPUTE_CHUNK_SIZE = 1000
+# Rows read per query when exporting
+EXPORT_PAGE_SIZE = 1000
+
+
+@contextmanager
+def open_input(path):
+    """Open a CSV input file, or stdin for "-"."""
+    if path == "-":
+        yield sys.stdin
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield f
+
+
+@contextmanager
+def open_output(path):
+    """Open an output file, or stdout for "-"."""
+    if path == "-":
+        yield sys.stdout
+        sys.stdout.flush()
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            yield f
+
+
+def make_writer(out, fields, output_format):
+    """Return a function that writes one row dict as CSV (with a header first) or as a JSON line."""
+    if output_format == "jsonl":
+        return lambda row: out.write(json.dumps({field: row[field] for field in fields}) + "\n")
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    return writer.writerow
+
+
+def use_database(path):
+    """Point the db layer at the database file, make sure the schema exists, and return the module."""
+    from db import database
+    if path:
+        database.DB_PATH = os.path.abspath(path)
+    database.init_db()
+    return database
+
+
+def report(message):
+    """Write a progress or summary line to stderr, keeping stdout for data."""
+    print(message, file=sys.stderr)
+
+
+def pay_date_arg(text):
+    """argparse type for YYYY-MM-DD dates."""
+    try:
+        datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text} is not a date in YYYY-MM-DD format")
+    return text
+
+
+def cmd_compute(args):
+    """Calculate deductions for one set of arguments, or for every row of a CSV input."""
+    from logic.payroll_calc import compute_payroll_batch
+
+    fields = ["province", "period_count", "ytd_cpp", "ytd_ei"] + RESULT_FIELDS
+    errors = 0
+
+    with open_input(args.input) as f, open_output(args.output) as out:
+        if args.gross is not None:
+            rows = [(0, {"gross": args.gross, "province": args.province, "period_count": args.periods,
+                         "ytd_cpp": args.ytd_cpp, "ytd_ei": args.ytd_ei})]
+        else:
+            # Header is line 1
+            rows = enumerate(csv.DictReader(f), start=2)
+        write = make_writer(out, fields, args.format)
+
+        def flush(chunk):
+            for entry, result in zip(chunk, compute_payroll_batch(chunk)):
+                write({**entry, **result})
+
+        chunk = []
+        for line_no, row in rows:
+            try:
+                chunk.append(parse_compute_row(row))
+            except ValueError as e:
+                report(f"line {line_no}: {e}" if line_no else f"error: {e}")
+                errors += 1
+                continue
+            if len(chunk) >= COMPUTE_CHUNK_SIZE:
+                flush(chunk)
+                chunk = []
+        flush(chunk)
+
+    return 1 if errors else 0
+
+
+def cmd_remittance(args):
+    """Write CRA remittance totals for each remittance period in a date range."""
+    from db.remittance import REMITTANCE_FIELDS, get_remittance_report
+    use_database(args.db)
+
+    periods = get_remittance_report(args.date_from, args.date_to, args.remitter)
+    with open_output(args.output) as out:
+        write = make_writer(out, REMITTANCE_FIELDS, args.format)
+        for period in periods:
+            write(period)
+
+    report(f"{len(periods)} {args.remitter} remittance period(s): "
+           f"{sum(period['total_due'] for period in periods):,.2f} due in total")
+    return 0
+
+
+def cmd_forecast(args):
+    """Write the projected employer cost and remittance for each remaining month of the year."""
+    from logic.forecast import FORECAST_FIELDS, forecast_employer_costs
+    database = use_database(args.db)
+
+    period_count = args.periods or database.get_company_settings()['default_pay_frequency'] or 12
+    forecast = forecast_employer_costs(args.as_of or datetime.now().strftime("%Y-%m-%d"), period_count)
+
+    with open_output(args.output) as out:
+        write = make_writer(out, FORECAST_FIELDS, args.format)
+        for month in forecast['months']:
+            write(month)
+
+    months = forecast['months']
+    report(f"Forecast {len(months)} month(s) for {forecast['employees']} employee(s) ({period_count} periods/year): "
+           f"employer cost {sum(month['employer_cost'] for month in months):,.2f}, "
+           f"remittances {sum(month['remittance'] for month in months):,.2f}; "
+           f"{forecast['skipped']} employee(s) skipped with no salary")
+    return 0
+
+
+def cmd_sweep(args):
+    """Write take-home pay over a range of salaries for each province and pay frequency."""
+    from logic.simulation import (BREAKPOINT_FIELDS, PERIOD_COUNTS, PROVINCES, SWEEP_FIELDS, amount_grid,
+                                  marginal_breakpoints, salary_sweep, sweep_rows)
+
+    provinces = [province.upper() for province in args.province] if args.province else None
+    period_counts = args.periods or PERIOD_COUNTS
+    for period_count in period_counts:
+        if period_count not in PERIOD_COUNTS:
+            raise ValueError(f"--periods must be among {', '.join(map(str, PERIOD_COUNTS))}")
+
+    with open_output(args.output) as out:
+        if args.breakpoints:
+            write = make_writer(out, BREAKPOINT_FIELDS, args.format)
+            for province in provinces or PROVINCES:
+                for row in marginal_breakpoints(province, period_counts):
+                    write(row)
+            return 0
+
+        started = time.perf_counter()
+        amounts = amount_grid(args.min, args.max, args.step)
+        columns = salary_sweep(amounts, provinces, period_counts, annual=not args.per_period)
+        elapsed = time.perf_counter() - started
+        if args.format == "csv":
+            # Straight from the columns; building a dict per row would take longer than the sweep
+            writer = csv.writer(out)
+            writer.writerow(SWEEP_FIELDS)
+            writer.writerows(zip(*(columns[field] for field in SWEEP_FIELDS)))
+        else:
+            write = make_writer(out, SWEEP_FIELDS, args.format)
+            for row in sweep_rows(columns):
+                write(row)
+    report(f"Evaluated {len(columns['net']):,} points in {elapsed:.2f} s")
+    return 0
+
+
+def read_gross_overrides(path):
+    """Read employee_id,gross rows overriding the salary-based gross pay for run-cycle."""
+    overrides = {}
+    with open_input(path) as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                overrides[int(row['employee_id'])] = parse_amount(row['gross'], "gross")
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path} line {line_no}: expected employee_id and gross columns ({e})")
+    return overrides
+
+
+def cmd_run_cycle(args):
+    """Calculate and save one pay date for every employee in a single transaction."""
+    from logic.payroll_calc import compute_payroll_batch
+    from utils.validators import validate_gross_pay, validate_pay_period_count
+    database = use_database(args.db)
+
+    period_count = args.periods or database.get_company_settings()['default_pay_frequency'] or 12
+    is_valid, error_msg = validate_pay_period_count(period_count)
+    if not is_valid:
+        raise ValueError(error_msg)
+    overrides = read_gross_overrides(args.gross_file) if args.gross_file else {}
+
+    employees = database.get_all_employees()
+    ytd_by_employee = database.get_all_ytd_contributions(args.pay_date)
+    unknown = set(overrides) - {emp['id'] for emp in employees}
+    if unknown:
+        raise ValueError(f"gross pay given for unknown employee id(s): {', '.join(map(str, sorted(unknown)))}")
+
+    paid, entries, skipped = [], [], []
+    for emp in employees:
+        gross = overrides.get(emp['id'], round((emp['salary'] or 0) / period_count, 2))
+        if not validate_gross_pay(gross)[0]:
+            skipped.append(emp)
+            continue
+        ytd = ytd_by_employee.get(emp['id'], {'ytd_cpp': 0.0, 'ytd_ei': 0.0})
+        paid.append(emp)
+        entries.append({"gross": gross, "province": emp['province'], "period_count": period_count,
+                        "ytd_cpp": ytd['ytd_cpp'], "ytd_ei": ytd['ytd_ei']})
+    results = compute_payroll_batch(entries)
+
+    saved = {"saved": len(results), "resumed": False, "already_paid": [], "failed": []}
+    if not args.dry_run and results:
+        from db.cycle import PayrollCycle
+        saved = PayrollCycle(args.pay_date).save([
+            (emp['id'], result, period_count) for emp, result in zip(paid, results)
+        ], partial=args.partial)
+    not_saved = set(saved['already_paid']) | {employee_id for employee_id, _ in saved['failed']}
+
+    with open_output(args.output) as out:
+        write = make_writer(out, ["employee_id", "employee_name", "province"] + RESULT_FIELDS, args.format)
+        for emp, result in zip(paid, results):
+            if emp['id'] not in not_saved:
+                write({"employee_id": emp['id'], "employee_name": emp['name'], "province": emp['province'], **result})
+
+    for employee_id, reason in saved['failed']:
+        report(f"employee {employee_id}: {reason}")
+    action = "Calculated" if args.dry_run else "Resumed the cycle and saved" if saved['resumed'] else "Saved"
+    report(f"{action} {saved['saved']} payroll run(s) for {args.pay_date} ({period_count} periods/year); "
+           f"{len(skipped)} employee(s) skipped with no gross pay"
+           + (f", {len(saved['already_paid'])} already paid" if saved['already_paid'] else "")
+           + (f", {len(saved['failed'])} not paid" if saved['failed'] else ""))
+    return 1 if saved['failed'] else 0
+
+
+def cmd_cycles(args):
+    """Write the record of every payroll cycle save, newest first."""
+    from db.cycle import CYCLE_FIELDS, get_payroll_cycles
+    use_database(args.db)
+
+    cycles = get_payroll_cycles(args.date_from, args.date_to)
+    with open_output(args.output) as out:
+        write = make_writer(out, CYCLE_FIELDS, args.format)
+        for cycle in cycles:
+            write(dict(cycle))
+    report(f"{len(cycles)} payroll cycle(s)")
+    return 0
+
+
+def cmd_rollback_cycle(args):
+    """Delete every payroll run saved by the latest cycle for a pay date."""
+    from db.cycle import PayrollCycle
+    use_database(args.db)
+
+    deleted = PayrollCycle(args.pay_date).rollback()
+    report(f"Rolled back the payroll cycle for {args.pay_date}: {deleted} payroll run(s) deleted")
+    return 0
+
+
+def cmd_import_timesheet(args):
+    """Calculate and save payroll runs for every row of a timesheet CSV, streamed in chunks."""
+    from logic.csv_pipeline import process_timesheet
+    from utils.validators import validate_pay_period_count
+    database = use_database(args.db)
+
+    period_count = args.periods or database.get_company_settings()['default_pay_frequency'] or 12
+    is_valid, error_msg = validate_pay_period_count(period_count)
+    if not is_valid:
+        raise ValueError(error_msg)
+    if args.chunk_size < 1:
+        raise ValueError("--chunk-size must be at least 1")
+
+    with open_input(args.input) as f, open_output(args.output) as out:
+        counts = process_timesheet(f, out, period_count, save=not args.dry_run, chunk_size=args.chunk_size)
+
+    action = "Calculated" if args.dry_run else "Saved"
+    report(f"{action} {counts['paid']} of {counts['rows']} row(s); {counts['errors']} rejected "
+           f"(see the status and error columns)")
+    return 1 if counts['errors'] else 0
+
+
+def cmd_import_employees(args):
+    """Add employees from CSV rows with name, sin, province and salary columns."""
+    database = use_database(args.db)
+    # Line number and error of every rejected row, and line number and fields of the rest
+    errors, lines, employees = [], [], []
+
+    with open_input(args.input) as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                name = (row.get('name') or "").strip()
+                if not name:
+                    raise ValueError("name is required")
+                province = (row.get('province') or "ON").strip().upper()
+                salary = parse_amount(row.get('salary') or 0, "salary")
+            except ValueError as e:
+                errors.append((line_no, str(e)))
+                continue
+            lines.append(line_no)
+            employees.append((name, (row.get('sin') or "").strip(), province, salary))
+
+    # SINs are checked for the whole file at once, and every valid row is saved in one transaction
+    results = database.add_employees(employees) if employees else []
+    errors += [(line_no, error) for line_no, (_, error) in zip(lines, results) if error]
+    for line_no, error in sorted(errors):
+        report(f"line {line_no}: {error}")
+    imported, rejected = sum(1 for employee_id, _ in results if employee_id), len(errors)
+    report(f"Imported {imported} employee(s); {rejected} rejected")
+    return 1 if rejected else 0
+
+
+def cmd_t4(args):
+    """Write a T4 slip for every employee paid in the year, or for one employee."""
+    from logic.t4_generator import generate_t4_html, t4_filename
+    database = use_database(args.db)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    count = 0
+    for row in database.get_year_end_totals(args.year, args.employee):
+        employee = {"id": row['employee_id'], "name": row['name'], "sin": row['sin'], "province": row['province']}
+        totals = {
+            "gross": row['gross'],
+            "cpp_employee": row['cpp_employee'],
+            "ei_employee": row['ei_employee'],
+            "tax_withheld": row['federal_withholding'] + row['provincial_withholding'],
+        }
+        path = os.path.join(args.output_dir, t4_filename(employee, args.year))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generate_t4_html(employee, args.year, totals))
+        # One path per line, for piping into other tools
+        print(path)
+        count += 1
+
+    report(f"Wrote {count} T4 slip(s) for {args.year}")
+    return 0
+
+
+def iter_pages(fetch_page, filters, sort):
+    """Yield every row of a keyset-paged query, one page at a time."""
+    after = None
+    while True:
+        rows = fetch_page(EXPORT_PAGE_SIZE, after=after, filters=filters, sort=sort)
+        yield from rows
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        after = (rows[-1][sort[0]], rows[-1]['id'])
+
+
+def cmd_export(args):
+    """Export payroll runs or employees as CSV or JSON lines."""
+    database = use_database(args.db)
+
+    if args.table == "runs":
+        filters = {"employee_id": args.employee, "province": args.province,
+                   "date_from": args.date_from, "date_to": args.date_to}
+        rows = iter_pages(database.get_payroll_runs_page, filters, ("pay_date", False))
+        fields = RUN_FIELDS
+    else:
+        filters = {"province": args.province}
+        rows = iter_pages(database.get_employees_page, filters, ("id", False))
+        fields = EMPLOYEE_FIELDS
+
+    count = 0
+    with open_output(args.output) as out:
+        write = make_writer(out, fields, args.format)
+        for row in rows:
+            write(dict(row))
+            count += 1
+
+    report(f"Exported {count} {'payroll run' if args.table == 'runs' else 'employee'} row(s)")
+    return 0
+
+
+def cmd_export_columns(args):
+    """Export payroll runs as one binary .npy file per numeric column, for analytics."""
+    from db.export import export_payroll_runs
+    use_database(args.db)
+    filters = {"employee_id": args.employee, "province": args.province,
+               "date_from": args.date_from, "date_to": args.date_to}
+    schema = export_payroll_runs(args.output_dir, filters)
+    report(f"Exported {schema['rows']} payroll run(s) as {len(schema['columns'])} column file(s) to {args.output_dir}")
+    return 0
+
+
+def cmd_serve(args):
+    """Run the HTTP JSON calculation service until interrupted."""
+    from db import database
+    if args.db:
+        database.DB_PATH = os.path.abspath(args.db)
+    if args.batching:
+        from payroll.batcher import serve as serve_batching
+        serve_batching(args.host, args.port, args.window_ms, args.max_batch, args.verbose)
+        return 0
+    from payroll.server import serve
+    serve(args.host, args.port, args.threads, args.verbose)
+    return 0
+
+
+def build_parser():
+    """Build the argument parser with one subcommand per job."""
+    parser = argparse.ArgumentParser(prog="python -m payroll",
+                                     description="Payroll Calculator command line (no GUI).")
+    parser.add_argument("--db", help="database file (default: db/payroll.db)")
+    parser.add_argument("--profile", choices=["timers", "cprofile", "sample"],
+                        help="time database calls, calculations and T4 rendering and print a report to stderr")
+    parser.add_argument("--profile-json", metavar="PATH", help="also write the profile report as JSON")
+    parser.add_argument("--sql-trace", action="store_true",
+                        help="print every db operation's statement and connection counts to stderr on exit, "
+                             "flagging repeated queries")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    compute = commands.add_parser(
+        "compute", help="calculate deductions without saving",
+        description="Calculate deductions for --gross, or for every row of a CSV with gross and optional "
+                    "province, period_count, ytd_cpp and ytd_ei columns.")
+    compute.add_argument("input", nargs="?", default="-", help="CSV file, or - for stdin (default)")
+    compute.add_argument("--gross", type=float, help="calculate one pay instead of reading CSV")
+    compute.add_argument("--province", default="ON")
+    compute.add_argument("--periods", type=int, default=12, help="pay periods per year (default 12)")
+    compute.add_argument("--ytd-cpp", type=float, default=0.0)
+    compute.add_argument("--ytd-ei", type=float, default=0.0)
+    compute.set_defaults(func=cmd_compute)
+
+    cycle = commands.add_parser(
+        "run-cycle", help="calculate and save a pay date for every employee",
+        description="Pay every employee their annual salary / periods, or the gross from --gross-file, "
+                    "and save the whole cycle in one transaction. If an earlier save of the pay date did "
+                    "not finish, it is resumed: employees already paid on the pay date are left as they are.")
+    cycle.add_argument("--pay-date", type=pay_date_arg, required=True, help="YYYY-MM-DD")
+    cycle.add_argument("--periods", type=int, help="pay periods per year (default: company setting)")
+    cycle.add_argument("--gross-file", help="CSV of employee_id,gross overrides, or - for stdin")
+    cycle.add_argument("--dry-run", action="store_true", help="calculate and print without saving")
+    cycle.add_argument("--partial", action="store_true",
+                       help="save the employees that can be paid even if others can't (default: save none)")
+    cycle.set_defaults(func=cmd_run_cycle)
+
+    cycles = commands.add_parser(
+        "cycles", help="list payroll cycle saves and how they ended",
+        description="List every run-cycle save (also from the app's batch payroll) with its status: running "
+                    "(not finished; run the cycle again to resume), completed, partial, failed or rolled_back.")
+    cycles.add_argument("--from", dest="date_from", type=pay_date_arg, help="pay dates on or after YYYY-MM-DD")
+    cycles.add_argument("--to", dest="date_to", type=pay_date_arg, help="pay dates on or before YYYY-MM-DD")
+    cycles.set_defaults(func=cmd_cycles)
+
+    rollback = commands.add_parser(
+        "rollback-cycle", help="delete the payroll runs of a saved cycle",
+        description="Delete every payroll run saved by the latest cycle for --pay-date. Refused if any of "
+                    "its employees has been paid since.")
+    rollback.add_argument("--pay-date", type=pay_date_arg, required=True, help="YYYY-MM-DD")
+    rollback.set_defaults(func=cmd_rollback_cycle)
+
+    timesheet = commands.add_parser(
+        "import-timesheet", help="pay every row of a timesheet CSV",
+        description="Stream a CSV of employee_id, pay_date, gross and optional period_count rows, saving "
+                    "one payroll run per row in chunks. Writes every row back with its result or error; "
+                    "bad rows don't stop the import. Each employee's rows must be in date order.")
+    timesheet.add_argument("input", nargs="?", default="-", help="CSV file, or - for stdin (default)")
+    timesheet.add_argument("--periods", type=int,
+                           help="pay periods per year for rows without period_count (default: company setting)")
+    timesheet.add_argument("--chunk-size", type=int, default=1000, help="rows per database round trip (default 1000)")
+    timesheet.add_argument("--dry-run", action="store_true", help="calculate and write results without saving")
+    timesheet.add_argument("--output", "-o", default="-", help="results CSV file, or - for stdout (default)")
+    timesheet.set_defaults(func=cmd_import_timesheet)
+
+    employees = commands.add_parser(
+        "import-employees", help="add employees from CSV",
+        description="Add one employee per CSV row with name, sin, province and salary columns.")
+    employees.add_argument("input", nargs="?", default="-", help="CSV file, or - for stdin (default)")
+    employees.set_defaults(func=cmd_import_employees)
+
+    t4 = commands.add_parser("t4", help="write year-end T4 slips",
+                             description="Write one T4 HTML slip per employee paid in the year.")
+    t4.add_argument("--year", type=int, required=True)
+    t4.add_argument("--employee", type=int, help="only this employee id")
+    t4.add_argument("--output-dir", required=True)
+    t4.set_defaults(func=cmd_t4)
+
+    export = commands.add_parser("export", help="export payroll runs or employees")
+    export.add_argument("table", choices=["runs", "employees"])
+    export.add_argument("--employee", type=int, help="runs for this employee id only")
+    export.add_argument("--province")
+    export.add_argument("--from", dest="date_from", type=pay_date_arg, help="runs on or after YYYY-MM-DD")
+    export.add_argument("--to", dest="date_to", type=pay_date_arg, help="runs on or before YYYY-MM-DD")
+    export.set_defaults(func=cmd_export)
+
+    columns = commands.add_parser(
+        "export-columns", help="export payroll runs as binary column files",
+        description="Write each numeric payroll run column as a .npy array (pay_date as days since "
+                    "1970-01-01) plus schema.json, for numpy.load(..., mmap_mode='r').")
+    columns.add_argument("--output-dir", required=True)
+    columns.add_argument("--employee", type=int, help="runs for this employee id only")
+    columns.add_argument("--province")
+    columns.add_argument("--from", dest="date_from", type=pay_date_arg, help="runs on or after YYYY-MM-DD")
+    columns.add_argument("--to", dest="date_to", type=pay_date_arg, help="runs on or before YYYY-MM-DD")
+    columns.set_defaults(func=cmd_export_columns)
+
+    remittance = commands.add_parser(
+        "remittance", help="CRA remittance totals by remittance period",
+        description="Total employee and employer CPP and EI and income tax withheld for each remittance "
+                    "period from --from to --to, with the date each payment is due.")
+    remittance.add_argument("--from", dest="date_from", type=pay_date_arg, required=True, help="YYYY-MM-DD")
+    remittance.add_argument("--to", dest="date_to", type=pay_date_arg, required=True, help="YYYY-MM-DD")
+    remittance.add_argument("--remitter", choices=["regular", "accelerated-1", "accelerated-2"], default="regular",
+                            help="remitter type: monthly (default), or accelerated threshold 1 or 2")
+    remittance.set_defaults(func=cmd_remittance)
+
+    forecast = commands.add_parser(
+        "forecast", help="employer cost and remittances for the rest of the year",
+        description="Project one pay run per employee per month (salary / periods) from --as-of to December, "
+                    "starting from each employee's saved YTD, and total employer cost and CRA remittances by "
+                    "month. CPP and EI stop as employees reach the annual maximums.")
+    forecast.add_argument("--as-of", type=pay_date_arg, help="YYYY-MM-DD (default: today)")
+    forecast.add_argument("--periods", type=int, help="pay periods per year (default: company setting)")
+    forecast.set_defaults(func=cmd_forecast)
+
+    sweep = commands.add_parser(
+        "sweep", help="take-home pay over a salary range, by province and pay frequency",
+        description="Calculate every salary from --min to --max (in --step increments) for each province "
+                    "and pay frequency, as a first pay of the year, with effective and marginal rates. "
+                    "--breakpoints lists the incomes where the marginal rate changes instead.")
+    sweep.add_argument("--min", type=float, default=20000, help="first salary (default 20000)")
+    sweep.add_argument("--max", type=float, default=250000, help="last salary (default 250000)")
+    sweep.add_argument("--step", type=float, default=1000, help="salary increment (default 1000)")
+    sweep.add_argument("--per-period", action="store_true",
+                       help="treat --min/--max/--step as per-period gross pay rather than annual salary")
+    sweep.add_argument("--province", nargs="+", help="provinces to include (default: all 13)")
+    sweep.add_argument("--periods", type=int, nargs="+", help="pay periods per year to include (default: 12 24 26 52)")
+    sweep.add_argument("--breakpoints", action="store_true", help="write the marginal-rate breakpoints instead")
+    sweep.set_defaults(func=cmd_sweep)
+
+    server = commands.add_parser("serve", help="run the HTTP JSON calculation service",
+                                 description="Serve calculations, YTD lookups and T4 totals as JSON over HTTP.")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8080)
+    server.add_argument("--threads", type=int, default=8, help="worker threads (default 8)")
+    server.add_argument("--verbose", action="store_true", help="log every request")
+    server.add_argument("--batching", action="store_true",
+                        help="serve /compute from one asyncio loop, calculating concurrent requests in "
+                             "micro-batches (no database endpoints; adds GET /metrics)")
+    server.add_argument("--window-ms", type=float, default=2.0,
+                        help="with --batching: longest wait for a batch to fill (default 2)")
+    server.add_argument("--max-batch", type=int, default=256,
+                        help="with --batching: largest batch calculated at once (default 256)")
+    server.set_defaults(func=cmd_serve)
+
+    for command in (compute, cycle, cycles, export, remittance, forecast, sweep):
+        command.add_argument("--output", "-o", default="-", help="output file, or - for stdout (default)")
+        command.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    return parser
+
+
+def main(argv=None) -> int:
+    """Run one command. Returns the process exit status."""
+    args = build_parser().parse_args(argv)
+    if args.sql_trace:
+        from db import sql_trace
+        sql_trace.start()
+    profiling = None
+    profile_mode = args.profile or os.environ.get("PAYROLL_PROFILE", "") or ("1" if args.profile_json else "")
+    try:
+        if profile_mode not in ("", "0"):
+            from utils import profiling
+            profiling.enable("timers" if profile_mode == "1" else profile_mode)
+        return args.func(args)
+    except ValueError as e:
+        report(f"error: {e}")
+        return 1
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); don't print a traceback
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if profiling:
+            profiling.finish(args.profile_json or os.environ.get("PAYROLL_PROFILE_JSON"))
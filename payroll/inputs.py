@@ -0,0 +1,61 @@
+# payroll/inputs.py
+"""
+Parsing and validation of calculation inputs from CSV rows and JSON requests.
+Raises ValueError with a message suitable for showing to the caller.
+"""
+import math
+
+
+def parse_amount(value, label):
+    """
+    Parse a money amount from a JSON number or CSV text, allowing $ and thousands separators.
+    NaN and infinity are rejected: they would pass every range check and can't be written as JSON.
+    """
+    try:
+        amount = float(str(value).strip().replace(",", "").lstrip("$"))
+    except ValueError:
+        raise ValueError(f"{label} must be a number, got {value!r}")
+    if not math.isfinite(amount):
+        raise ValueError(f"{label} must be a finite number, got {value!r}")
+    return amount
+
+
+def parse_ytd(value, label):
+    """Parse a year-to-date contribution, which can't be negative."""
+    amount = parse_amount(value, label)
+    if amount < 0:
+        raise ValueError(f"{label} cannot be negative, got {value!r}")
+    return amount
+
+
+def parse_compute_row(row):
+    """Turn one compute input (CSV row or JSON object) into a calculation entry. Raises ValueError if it is invalid."""
+    from logic import tax_tables
+    from utils.validators import validate_gross_pay, validate_pay_period_count
+
+    if not row.get('gross'):
+        raise ValueError("gross is required")
+    gross = parse_amount(row['gross'], "gross")
+    is_valid, error_msg = validate_gross_pay(gross)
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    province = str(row.get('province') or "ON").strip().upper()
+    if province not in tax_tables.PROVINCIAL_BRACKETS_2025:
+        raise ValueError(f"unknown province {province}")
+
+    try:
+        period_count = int(row.get('period_count') or 12)
+    except (TypeError, ValueError):
+        raise ValueError(f"period_count must be a whole number, got {row['period_count']!r}")
+    is_valid, error_msg = validate_pay_period_count(period_count)
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    return {
+        "gross": gross,
+        "province": province,
+        "period_count": period_count,
+        "ytd_cpp": parse_ytd(row.get('ytd_cpp') or 0, "ytd_cpp"),
+        "ytd_ei": parse_ytd(row.get('ytd_ei') or 0, "ytd_ei"),
+    }
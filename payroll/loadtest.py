@@ -0,0 +1,186 @@
+# payroll/loadtest.py
+"""
+Load test for the HTTP calculation service.
+Starts the service in a separate process (or uses --url), then runs client
+processes that each hold one keep-alive connection and send requests back to
+back for a fixed time. Reports sustained requests per second and latency
+percentiles.
+
+    python -m payroll.loadtest --clients 8 --duration 10 --endpoint compute
+    python -m payroll.loadtest --clients 64 --endpoint compute --batching --window-ms 2 --max-batch 256
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import date
+from urllib.parse import urlsplit
+
+ENDPOINTS = ("compute", "batch", "ytd", "health")
+# Entries per request for the batch endpoint
+BATCH_SIZE = 100
+PROVINCES = ["ON", "QC", "BC", "AB", "SK", "MB", "NB", "NS", "PE", "NL", "YT", "NT", "NU"]
+
+
+def request_plan(endpoint, employee_id):
+    """Return (method, path, list of bodies) for the endpoint; bodies are cycled through."""
+    if endpoint == "compute":
+        bodies = [json.dumps({"gross": 1500 + (i * 37) % 6000, "province": PROVINCES[i % len(PROVINCES)],
+                              "period_count": (12, 24, 26, 52)[i % 4], "ytd_cpp": 0, "ytd_ei": 0}).encode()
+                  for i in range(256)]
+        return "POST", "/compute", bodies
+    if endpoint == "batch":
+        entries = [{"gross": 1500 + (i * 37) % 6000, "province": PROVINCES[i % len(PROVINCES)],
+                    "period_count": 26} for i in range(BATCH_SIZE)]
+        return "POST", "/compute/batch", [json.dumps({"entries": entries}).encode()]
+    if endpoint == "ytd":
+        return "GET", f"/employees/{employee_id}/ytd?pay_date={date.today().isoformat()}", [None]
+    return "GET", "/health", [None]
+
+
+def run_client(url, endpoint, employee_id, duration):
+    """Send requests on one keep-alive connection for duration seconds. Returns (latencies, errors)."""
+    parts = urlsplit(url)
+    method, path, bodies = request_plan(endpoint, employee_id)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies, errors
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def start_server(port, threads, db_path, batching=None):
+    """
+    Start the service in a child process and wait until it accepts connections.
+    batching is None for the threaded service, or (window_ms, max_batch) for the batching front end.
+    """
+    command = [sys.executable, "-m", "payroll"]
+    if db_path:
+        command += ["--db", db_path]
+    command += ["serve", "--port", str(port), "--threads", str(threads)]
+    if batching:
+        command += ["--batching", "--window-ms", str(batching[0]), "--max-batch", str(batching[1])]
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("service did not start")
+
+
+def fetch_metrics(url):
+    """Batching front end metrics, or None if the service doesn't report them."""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+    try:
+        conn.request("GET", "/metrics")
+        response = conn.getresponse()
+        return json.loads(response.read()) if response.status == 200 else None
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+    finally:
+        conn.close()
+
+
+def free_port():
+    """Pick an unused local TCP port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m payroll.loadtest", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="test a running service instead of starting one")
+    parser.add_argument("--db", help="database file for the started service")
+    parser.add_argument("--threads", type=int, default=8, help="service worker threads (default 8)")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client connections (default 8)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (default 10)")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="compute")
+    parser.add_argument("--employee-id", type=int, default=1, help="employee for the ytd endpoint")
+    parser.add_argument("--batching", action="store_true", help="start the micro-batching front end")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="batching window (default 2)")
+    parser.add_argument("--max-batch", type=int, default=256, help="largest batch (default 256)")
+    args = parser.parse_args(argv)
+    if args.batching and args.endpoint == "ytd":
+        parser.error("the batching front end has no ytd endpoint")
+
+    server = None
+    url = args.url
+    if not url:
+        port = free_port()
+        server = start_server(port, args.threads, args.db,
+                              (args.window_ms, args.max_batch) if args.batching else None)
+        url = f"http://127.0.0.1:{port}"
+
+    try:
+        with multiprocessing.Pool(args.clients) as pool:
+            started = time.perf_counter()
+            outcomes = pool.starmap(run_client, [(url, args.endpoint, args.employee_id, args.duration)] * args.clients)
+            elapsed = time.perf_counter() - started
+        metrics = fetch_metrics(url)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    latencies = sorted(latency for client_latencies, _ in outcomes for latency in client_latencies)
+    errors = sum(client_errors for _, client_errors in outcomes)
+    per_request = BATCH_SIZE if args.endpoint == "batch" else 1
+
+    print(f"LOAD TEST: {args.endpoint} against {url}")
+    print("=" * 50)
+    print(f"Clients:             {args.clients}")
+    print(f"Duration:            {elapsed:.1f} s")
+    print(f"Requests:            {len(latencies)} ok, {errors} failed")
+    print(f"Requests/second:     {len(latencies) / elapsed:,.0f}")
+    if per_request > 1:
+        print(f"Calculations/second: {len(latencies) * per_request / elapsed:,.0f}")
+    print(f"Latency p50:         {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"Latency p95:         {percentile(latencies, 0.95) * 1000:.2f} ms")
+    print(f"Latency p99:         {percentile(latencies, 0.99) * 1000:.2f} ms")
+    if metrics:
+        print(f"Batches:             {metrics['batches']} (mean size {metrics['mean_batch_size']}, "
+              f"max {metrics['max_batch_size']})")
+        print(f"Batch compute:       {metrics['mean_batch_compute_ms']:.3f} ms mean")
+        print(f"Queue+compute p99:   {metrics['latency_p99_ms']:.3f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
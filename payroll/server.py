@@ -0,0 +1,231 @@
+# payroll/server.py
+"""
+HTTP JSON calculation service: python -m payroll serve
+Built on the standard library. Connections are handled by a fixed pool of worker
+threads with HTTP/1.1 keep-alive, and each worker thread keeps one database
+connection open for its lifetime. Calculations go through the shared
+precompiled rate contexts.
+
+Endpoints:
+  GET  /health
+  POST /compute                    {"gross", "province", "period_count", "ytd_cpp", "ytd_ei"}
+  POST /compute/batch              {"entries": [...]} (at most MAX_BATCH entries)
+  GET  /employees/<id>/ytd?pay_date=YYYY-MM-DD
+  GET  /t4/<year>[?employee_id=<id>]
+"""
+import json
+import re
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlsplit, parse_qs
+from db import database
+from logic.payroll_calc import compute_payroll_batch, get_rate_context
+from payroll.inputs import parse_compute_row
+
+DEFAULT_THREADS = 8
+# Idle keep-alive connections are closed after this many seconds, freeing their worker thread
+KEEP_ALIVE_TIMEOUT = 15
+# Largest request body and batch accepted
+MAX_BODY_BYTES = 5 * 1024 * 1024
+MAX_BATCH = 10000
+
+
+class RequestError(Exception):
+    """A client error returned as a JSON error body with the given status."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def handle_health(request):
+    """Liveness check."""
+    return {"status": "ok"}
+
+
+def handle_compute(request):
+    """Calculate one pay."""
+    body = request.json_body()
+    if not isinstance(body, dict):
+        raise RequestError(400, "body must be a JSON object")
+    try:
+        entry = parse_compute_row(body)
+    except ValueError as e:
+        raise RequestError(400, str(e))
+    return get_rate_context(entry['province'], entry['period_count']).compute(
+        entry['gross'], entry['ytd_cpp'], entry['ytd_ei'])
+
+
+def handle_compute_batch(request):
+    """Calculate many pays in one request."""
+    body = request.json_body()
+    entries = body.get('entries') if isinstance(body, dict) else None
+    if not isinstance(entries, list):
+        raise RequestError(400, "body must be an object with an entries list")
+    if len(entries) > MAX_BATCH:
+        raise RequestError(400, f"at most {MAX_BATCH} entries per batch")
+    parsed = []
+    for index, entry in enumerate(entries):
+        try:
+            parsed.append(parse_compute_row(entry if isinstance(entry, dict) else {}))
+        except ValueError as e:
+            raise RequestError(400, f"entries[{index}]: {e}")
+    return {"results": compute_payroll_batch(parsed)}
+
+
+def handle_ytd(request, employee_id):
+    """YTD CPP and EI for an employee before a pay date."""
+    pay_date = request.query.get('pay_date')
+    if not pay_date:
+        raise RequestError(400, "pay_date is required")
+    try:
+        datetime.strptime(pay_date, "%Y-%m-%d")
+    except ValueError:
+        raise RequestError(400, "pay_date must be in YYYY-MM-DD format")
+    if not database.get_employee(int(employee_id)):
+        raise RequestError(404, f"employee {employee_id} not found")
+    ytd = database.get_ytd_contributions(int(employee_id), pay_date)
+    return {"employee_id": int(employee_id), "pay_date": pay_date, **ytd}
+
+
+def handle_t4(request, year):
+    """T4 box totals for every employee paid in the year, or one employee."""
+    employee_id = request.query.get('employee_id')
+    if employee_id is not None and not employee_id.isdigit():
+        raise RequestError(400, "employee_id must be a number")
+    rows = database.get_year_end_totals(int(year), int(employee_id) if employee_id else None)
+    employees = []
+    for row in rows:
+        totals = dict(row)
+        totals['tax_withheld'] = round(row['federal_withholding'] + row['provincial_withholding'], 2)
+        employees.append(totals)
+    return {"year": int(year), "employees": employees}
+
+
+# (method, path pattern, handler); path groups are passed to the handler
+ROUTES = [
+    ("GET", re.compile(r"/health"), handle_health),
+    ("POST", re.compile(r"/compute"), handle_compute),
+    ("POST", re.compile(r"/compute/batch"), handle_compute_batch),
+    ("GET", re.compile(r"/employees/(\d+)/ytd"), handle_ytd),
+    ("GET", re.compile(r"/t4/(\d{4})"), handle_t4),
+]
+
+
+class PayrollRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the endpoint handlers and writes JSON responses."""
+    protocol_version = "HTTP/1.1"
+    server_version = "PayrollCalculator"
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body are written separately; without TCP_NODELAY each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method):
+        """Read the request, run the matching endpoint and send its result or error."""
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            # Always consume the body, so the connection is ready for the next request
+            self.body = self.read_body()
+            path_found = False
+            for route_method, pattern, handler in ROUTES:
+                match = pattern.fullmatch(url.path)
+                if match:
+                    path_found = True
+                    if route_method == method:
+                        self.send_json(200, handler(self, *match.groups()))
+                        return
+            if path_found:
+                raise RequestError(405, f"{method} is not supported for {url.path}")
+            raise RequestError(404, f"no endpoint for {url.path}")
+        except RequestError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            self.send_json(500, {"error": "internal server error"})
+
+    def read_body(self) -> bytes:
+        """Read the request body. Bodies that can't be read drop the connection afterwards."""
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            self.close_connection = True
+            raise RequestError(400, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise RequestError(413, "request body too large")
+        return self.rfile.read(length) if length > 0 else b""
+
+    def json_body(self):
+        """Decode the JSON request body."""
+        try:
+            return json.loads(self.body or b"{}")
+        except ValueError:
+            raise RequestError(400, "request body must be JSON")
+
+    def send_json(self, status, payload):
+        """Send a JSON response, keeping the connection open for the next request."""
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Log requests only in verbose mode."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that handles each connection on a fixed pool of worker threads.
+    Each worker thread reuses one database connection for every request it serves.
+    A keep-alive connection holds its thread until it goes idle for KEEP_ALIVE_TIMEOUT.
+    """
+    def __init__(self, address, handler_class=PayrollRequestHandler, threads=DEFAULT_THREADS, verbose=False):
+        super().__init__(address, handler_class)
+        self.verbose = verbose
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="payroll-http",
+                                       initializer=database.use_thread_connection)
+
+    def process_request(self, request, client_address):
+        """Hand the connection to a worker thread."""
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        """Serve every request on one connection, then close it."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """Stop listening and drop connections still waiting for a thread."""
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def serve(host="127.0.0.1", port=8080, threads=DEFAULT_THREADS, verbose=False):
+    """Run the service until interrupted."""
+    database.init_db()
+    server = PooledHTTPServer((host, port), threads=threads, verbose=verbose)
+    print(f"Payroll service on http://{host}:{server.server_port} with {threads} threads "
+          f"(Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
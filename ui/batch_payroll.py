@@ -0,0 +1,377 @@
+# ui/batch_payroll.py
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+from datetime import datetime
+from logic.payroll_calc import compute_payroll_batch
+from db.database import get_all_employees, get_all_ytd_contributions, get_company_settings
+from db.cycle import save_payroll_cycle
+from ui.custom_button import CustomButton
+from ui.events import EmployeeUpdated, EmployeeDeleted, PayrollCycleSaved
+from utils.validators import validate_gross_pay, validate_pay_period_count
+
+# Employees computed per background job; the progress bar advances once per chunk
+CHUNK_SIZE = 200
+
+
+def fetch_cycle_inputs(pay_date: str):
+    """Get all employees and their YTD contributions for the pay date. Runs on the background worker."""
+    return get_all_employees(), get_all_ytd_contributions(pay_date)
+
+
+def compute_entries(entries, period_count: int):
+    """Run the batch engine over entries that have a valid gross pay. Runs on the background worker."""
+    valid = [entry for entry in entries if validate_gross_pay(entry['gross'])[0]]
+    results = compute_payroll_batch([{
+        "gross": entry['gross'],
+        "province": entry['employee']['province'],
+        "period_count": period_count,
+        "ytd_cpp": entry['ytd_cpp'],
+        "ytd_ei": entry['ytd_ei'],
+    } for entry in valid])
+    by_id = {id(entry): result for entry, result in zip(valid, results)}
+    return [by_id.get(id(entry)) for entry in entries]
+
+
+class BatchPayrollFrame(tk.Frame):
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+        # Employee id -> {employee, gross, ytd_cpp, ytd_ei, result}
+        self.entries = {}
+        self.cycle_pay_date = None
+        self.cycle_period_count = None
+        # True once every chunk of the cycle has been calculated; a cancelled calculation leaves it False
+        self.cycle_calculated = False
+        self.create_widgets()
+        
+        controller.events.subscribe(EmployeeUpdated, self.on_employee_updated)
+        controller.events.subscribe(EmployeeDeleted, self.on_employee_deleted)
+
+    def create_widgets(self):
+        # Header
+        header = tk.Frame(self, bg="#0044aa", height=60)
+        header.pack(fill="x")
+        tk.Label(header, text="Run Payroll for Everyone", font=("Arial", 20, "bold"),
+                 bg="#0044aa", fg="white").pack(pady=15)
+
+        # Main content
+        content = tk.Frame(self, padx=20, pady=20)
+        content.pack(fill="both", expand=True)
+
+        # Form frame
+        form = tk.LabelFrame(content, text="Cycle Details", padx=15, pady=15,
+                            font=("Arial", 12, "bold"), fg="#000000")
+        form.pack(fill="x", pady=(0, 15))
+
+        # Pay date
+        tk.Label(form, text="Pay Date:", font=("Arial", 11, "bold"), fg="#000000").grid(row=0, column=0, sticky="w", pady=5)
+        date_frame = tk.Frame(form)
+        date_frame.grid(row=0, column=1, pady=5, sticky="w")
+
+        current_year = datetime.now().year
+        years = [str(y) for y in range(current_year - 2, current_year + 2)]
+        self.year_var = tk.StringVar(value=str(current_year))
+        ttk.Combobox(date_frame, textvariable=self.year_var, values=years,
+                     state="readonly", width=6, font=("Arial", 11)).pack(side="left", padx=(0, 5))
+
+        months = ["01-Jan", "02-Feb", "03-Mar", "04-Apr", "05-May", "06-Jun",
+                 "07-Jul", "08-Aug", "09-Sep", "10-Oct", "11-Nov", "12-Dec"]
+        self.month_var = tk.StringVar(value=months[datetime.now().month - 1])
+        ttk.Combobox(date_frame, textvariable=self.month_var, values=months,
+                     state="readonly", width=10, font=("Arial", 11)).pack(side="left", padx=(0, 5))
+
+        days = [str(d).zfill(2) for d in range(1, 32)]
+        self.day_var = tk.StringVar(value=str(datetime.now().day).zfill(2))
+        ttk.Combobox(date_frame, textvariable=self.day_var, values=days,
+                     state="readonly", width=4, font=("Arial", 11)).pack(side="left")
+
+        # Period count
+        tk.Label(form, text="Pay Periods/Year:", font=("Arial", 11, "bold"), fg="#000000").grid(row=1, column=0, sticky="w", pady=5)
+        period_frame = tk.Frame(form)
+        period_frame.grid(row=1, column=1, pady=5, sticky="w")
+        self.period_count = ttk.Combobox(period_frame, values=["12", "24", "26", "52"],
+                                         state="readonly", width=10, font=("Arial", 11))
+        self.period_count.set("12")
+        self.period_count.pack(side="left")
+        tk.Label(period_frame, text="  Gross pay defaults to each employee's annual salary / periods",
+                font=("Arial", 9), fg="#666666").pack(side="left")
+
+        # Buttons frame
+        btn_frame = tk.Frame(content)
+        btn_frame.pack(fill="x", pady=(0, 10))
+
+        calc_btn = CustomButton(btn_frame, text="Calculate All", command=self.calculate_all,
+                                bg_color="#009933", padx=25, pady=10)
+        calc_btn.pack(side="left", padx=5)
+
+        save_btn = CustomButton(btn_frame, text="Save Cycle", command=self.save_cycle,
+                                bg_color="#0066cc", padx=25, pady=10)
+        save_btn.pack(side="left", padx=5)
+
+        clear_btn = CustomButton(btn_frame, text="Clear", command=self.clear_grid,
+                                 bg_color="#333333", padx=25, pady=10)
+        clear_btn.pack(side="left", padx=5)
+
+        # Progress bar
+        self.progress = ttk.Progressbar(content, mode="determinate")
+        self.progress.pack(fill="x", pady=(0, 10))
+
+        # Review grid
+        tree_frame = tk.Frame(content)
+        tree_frame.pack(fill="both", expand=True)
+
+        scrollbar_y = tk.Scrollbar(tree_frame)
+        scrollbar_y.pack(side="right", fill="y")
+
+        style = ttk.Style()
+        style.configure("BatchTree.Treeview",
+                       font=("Arial", 10),
+                       rowheight=25,
+                       background="white",
+                       foreground="black",
+                       fieldbackground="white")
+        style.configure("BatchTree.Treeview.Heading",
+                       font=("Arial", 11, "bold"),
+                       background="#0044aa",
+                       foreground="white",
+                       relief="raised",
+                       borderwidth=2)
+        style.map("BatchTree.Treeview",
+                 background=[("selected", "#0044aa")],
+                 foreground=[("selected", "white")])
+
+        columns = ("Employee", "Province", "Gross", "CPP", "EI", "Fed Tax", "Prov Tax", "Net", "Status")
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings",
+                                 yscrollcommand=scrollbar_y.set, style="BatchTree.Treeview")
+        widths = {"Employee": 160, "Province": 70, "Status": 140}
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=widths.get(col, 80))
+        self.tree.pack(fill="both", expand=True)
+        scrollbar_y.config(command=self.tree.yview)
+
+        # Double-click a row to override its gross pay
+        self.tree.bind("<Double-1>", self.edit_gross)
+
+        # Summary
+        self.summary_label = tk.Label(content, text="Choose a pay date and click Calculate All",
+                                      font=("Arial", 11, "bold"), fg="#000000")
+        self.summary_label.pack(pady=(10, 0))
+
+    def get_pay_date(self):
+        """Get pay date in YYYY-MM-DD format from dropdowns."""
+        year = self.year_var.get()
+        month = self.month_var.get().split('-')[0]
+        day = self.day_var.get()
+        return f"{year}-{month}-{day}"
+
+    def refresh(self):
+        """Default the period count to the company pay frequency when frame is shown."""
+        if not self.entries:
+            self.controller.worker.submit(get_company_settings, key="batch.settings",
+                                          on_success=self.show_default_frequency)
+
+    def show_default_frequency(self, settings):
+        """Set the period count to the company default pay frequency."""
+        freq = settings['default_pay_frequency'] or 12
+        self.period_count.set(str(freq))
+
+    def calculate_all(self):
+        """Prefetch employees and YTD values, then compute everyone in chunks."""
+        pay_date = self.get_pay_date()
+        try:
+            datetime.strptime(pay_date, "%Y-%m-%d")
+            period_count = int(self.period_count.get())
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please select a valid pay date and period count.")
+            return
+
+        is_valid, error_msg = validate_pay_period_count(period_count)
+        if not is_valid:
+            messagebox.showerror("Invalid Pay Period", error_msg)
+            return
+
+        # Stop any calculation still running for a previous cycle
+        self.controller.worker.cancel("batch.compute")
+        self.clear_grid()
+        self.cycle_pay_date = pay_date
+        self.cycle_period_count = period_count
+        self.summary_label.config(text="Loading employees and YTD values...")
+        self.controller.worker.submit(fetch_cycle_inputs, pay_date, key="batch.compute",
+                                      on_success=self.start_compute, on_error=self.on_compute_error)
+
+    def start_compute(self, inputs):
+        """Build one entry per employee and queue the chunked calculation."""
+        employees, ytd_by_employee = inputs
+        if not employees:
+            messagebox.showinfo("No Employees", "No employees found. Please add employees first.")
+            self.summary_label.config(text="No employees found")
+            return
+
+        pending = []
+        for emp in employees:
+            ytd = ytd_by_employee.get(emp['id'], {'ytd_cpp': 0.0, 'ytd_ei': 0.0})
+            entry = {
+                "employee": emp,
+                "gross": round((emp['salary'] or 0) / self.cycle_period_count, 2),
+                "ytd_cpp": ytd['ytd_cpp'],
+                "ytd_ei": ytd['ytd_ei'],
+                "result": None,
+            }
+            self.entries[emp['id']] = entry
+            pending.append(entry)
+
+        self.progress.config(maximum=len(pending), value=0)
+        self.compute_next_chunk(pending, 0)
+
+    def compute_next_chunk(self, pending, start):
+        """Compute one chunk on the worker, then queue the next."""
+        if start >= len(pending):
+            self.cycle_calculated = True
+            self.update_summary()
+            return
+        chunk = pending[start:start + CHUNK_SIZE]
+
+        def on_chunk_done(results):
+            for entry, result in zip(chunk, results):
+                entry['result'] = result
+                # Skip employees deleted while the cycle was being calculated
+                if entry['employee']['id'] in self.entries:
+                    self.show_entry(entry)
+            self.progress.config(value=start + len(chunk))
+            self.summary_label.config(text=f"Calculated {start + len(chunk)} of {len(pending)} employees...")
+            self.compute_next_chunk(pending, start + CHUNK_SIZE)
+
+        self.controller.worker.submit(compute_entries, chunk, self.cycle_period_count, key="batch.compute",
+                                      on_success=on_chunk_done, on_error=self.on_compute_error)
+
+    def on_compute_error(self, e):
+        """Report a failed read or chunk. The partly calculated cycle is dropped, so it can't be saved."""
+        self.clear_grid()
+        messagebox.showerror("Error", f"Failed to calculate payroll cycle: {str(e)}")
+
+    def show_entry(self, entry):
+        """Insert or update one employee's row in the review grid."""
+        emp = entry['employee']
+        result = entry['result']
+        if result:
+            values = (emp['name'], emp['province'], f"${result['gross']:.2f}",
+                      f"${result['cpp_employee']:.2f}", f"${result['ei_employee']:.2f}",
+                      f"${result['federal_withholding']:.2f}", f"${result['provincial_withholding']:.2f}",
+                      f"${result['net']:.2f}", "Ready")
+        else:
+            values = (emp['name'], emp['province'], f"${entry['gross']:.2f}",
+                      "", "", "", "", "", "Skipped - no gross pay")
+        item_id = str(emp['id'])
+        if self.tree.exists(item_id):
+            self.tree.item(item_id, values=values)
+        else:
+            self.tree.insert("", "end", iid=item_id, values=values)
+
+    def edit_gross(self, event):
+        """Override the gross pay for the double-clicked employee and recompute the row."""
+        item_id = self.tree.identify_row(event.y)
+        if not item_id:
+            return
+        entry = self.entries[int(item_id)]
+        gross = simpledialog.askfloat("Gross Pay", f"Gross pay for {entry['employee']['name']}:",
+                                      initialvalue=entry['gross'], parent=self)
+        if gross is None:
+            return
+        is_valid, error_msg = validate_gross_pay(gross)
+        if not is_valid:
+            messagebox.showerror("Invalid Gross Pay", error_msg)
+            return
+        entry['gross'] = gross
+        # Pure calculation on data already in memory
+        entry['result'] = compute_entries([entry], self.cycle_period_count)[0]
+        self.show_entry(entry)
+        self.update_summary()
+
+    def on_employee_updated(self, event):
+        """Recompute the employee's row with their new name and province."""
+        entry = self.entries.get(event.employee['id'])
+        if not entry:
+            return
+        entry['employee'] = event.employee
+        if entry['result']:
+            entry['result'] = compute_entries([entry], self.cycle_period_count)[0]
+        self.show_entry(entry)
+        self.update_summary()
+
+    def on_employee_deleted(self, event):
+        """Drop the employee from the cycle."""
+        if self.entries.pop(event.employee_id, None) is None:
+            return
+        self.tree.delete(str(event.employee_id))
+        self.update_summary()
+
+    def update_summary(self):
+        """Show totals for the employees that will be paid."""
+        ready = [entry['result'] for entry in self.entries.values() if entry['result']]
+        total_gross = sum(r['gross'] for r in ready)
+        total_net = sum(r['net'] for r in ready)
+        total_remittance = sum(r['cpp_employee'] + r['ei_employee'] + r['federal_withholding'] +
+                               r['provincial_withholding'] + r['cpp_employer'] + r['ei_employer']
+                               for r in ready)
+        skipped = len(self.entries) - len(ready)
+        self.summary_label.config(
+            text=f"Ready: {len(ready)} | Skipped: {skipped} | Gross: ${total_gross:.2f} | "
+                 f"Net: ${total_net:.2f} | CRA Remittance: ${total_remittance:.2f}"
+        )
+
+    def save_cycle(self):
+        """Save every calculated run for the cycle in a single transaction."""
+        if self.controller.worker.has_pending("batch.compute"):
+            messagebox.showerror("Calculation Running", "Please wait for the calculation to finish.")
+            return
+        if self.entries and not self.cycle_calculated:
+            # Saving now would pay only the employees calculated before the cancel
+            messagebox.showerror("Calculation Incomplete",
+                                 "The calculation was cancelled before every employee was calculated. "
+                                 "Click Calculate All to calculate the cycle again before saving.")
+            return
+        runs = [(employee_id, entry['result'], self.cycle_period_count)
+                for employee_id, entry in self.entries.items() if entry['result']]
+        if not runs:
+            messagebox.showerror("No Calculation", "Please calculate payroll first before saving.")
+            return
+
+        pay_date = self.cycle_pay_date
+        if not messagebox.askyesno("Confirm Save", f"Save {len(runs)} payroll run(s) for {pay_date}?"):
+            return
+
+        self.progress.config(mode="indeterminate")
+        self.progress.start()
+        self.controller.worker.submit(save_payroll_cycle, pay_date, runs,
+                                      on_success=self.on_cycle_saved, on_error=self.on_save_error, cancellable=False)
+
+    def on_cycle_saved(self, result):
+        """Confirm a saved cycle."""
+        count = result['saved']
+        self.progress.stop()
+        self.progress.config(mode="determinate", value=self.progress['maximum'])
+        message = f"Saved {count} payroll run(s) for {self.cycle_pay_date}."
+        if result['already_paid']:
+            message += (f"\n\nAn earlier save of this cycle did not finish; {len(result['already_paid'])} "
+                        f"employee(s) it had already paid were left as they are.")
+        messagebox.showinfo("Success", message)
+        self.controller.events.publish(PayrollCycleSaved(self.cycle_pay_date, count))
+        self.clear_grid()
+
+    def on_save_error(self, e):
+        """Report a failed save. Nothing from the cycle is saved."""
+        self.progress.stop()
+        self.progress.config(mode="determinate", value=0)
+        if isinstance(e, ValueError):
+            messagebox.showerror("Payroll Cycle Not Saved", str(e))
+        else:
+            messagebox.showerror("Error", f"Failed to save payroll cycle: {str(e)}")
+
+    def clear_grid(self):
+        """Clear the review grid and progress."""
+        self.tree.delete(*self.tree.get_children())
+        self.entries = {}
+        self.cycle_calculated = False
+        self.progress.config(mode="determinate", value=0)
+        self.summary_label.config(text="Choose a pay date and click Calculate All")
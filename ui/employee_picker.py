@@ -0,0 +1,155 @@
+# ui/employee_picker.py
+"""
+Type-ahead employee picker.
+Searches employees by name prefix as the user types (debounced, run on the
+background worker) and shows a bounded list of matches under the entry.
+The selected employee is kept as a record, so callers get the id directly.
+"""
+import tkinter as tk
+from db.database import search_employees
+from ui.events import EmployeeUpdated, EmployeeDeleted
+
+# Wait this long after the last keystroke before searching
+DEBOUNCE_MS = 200
+# Maximum matches shown
+MAX_RESULTS = 20
+
+
+class EmployeePicker(tk.Frame):
+    """
+    Entry with a drop-down list of matching employees.
+    Generates <<EmployeeSelected>> when an employee is picked or cleared.
+    """
+    def __init__(self, parent, controller, width=30, font=("Arial", 11)):
+        super().__init__(parent)
+        self.controller = controller
+        self.employee = None
+        self.matches = []
+        self._debounce_id = None
+        self._search_key = f"picker.{id(self)}"
+
+        self.text_var = tk.StringVar()
+        self.entry = tk.Entry(self, textvariable=self.text_var, width=width, font=font)
+        self.entry.pack(fill="x")
+
+        # Results overlay the widgets below instead of pushing them down
+        self.listbox = tk.Listbox(self.winfo_toplevel(), height=8, font=font, activestyle="dotbox",
+                                  exportselection=False)
+
+        self.entry.bind("<KeyRelease>", self.on_key)
+        self.entry.bind("<FocusIn>", self.on_focus)
+        self.entry.bind("<Down>", self.focus_results)
+        self.entry.bind("<Return>", self.pick_first)
+        self.entry.bind("<FocusOut>", lambda event: self.after(150, self.hide_results_if_unfocused))
+        self.listbox.bind("<ButtonRelease-1>", self.pick_selected)
+        self.listbox.bind("<Return>", self.pick_selected)
+        self.listbox.bind("<Escape>", lambda event: self.hide_results())
+        self.listbox.bind("<FocusOut>", lambda event: self.after(150, self.hide_results_if_unfocused))
+
+        controller.events.subscribe(EmployeeUpdated, self.on_employee_updated)
+        controller.events.subscribe(EmployeeDeleted, self.on_employee_deleted)
+
+    @staticmethod
+    def display_text(employee) -> str:
+        """Text shown for an employee in the entry and results."""
+        return f"{employee['name']} ({employee['province']})"
+
+    def get_employee(self):
+        """The selected employee as a dict, or None."""
+        return self.employee
+
+    def get_employee_id(self):
+        """The selected employee's id, or None."""
+        return self.employee['id'] if self.employee else None
+
+    def set_employee(self, employee):
+        """Select an employee (dict or row), or clear the selection with None."""
+        self.employee = dict(employee) if employee else None
+        self.text_var.set(self.display_text(self.employee) if self.employee else "")
+        self.hide_results()
+        self.event_generate("<<EmployeeSelected>>")
+
+    def on_key(self, event):
+        """Search again after typing pauses. Editing the text drops the current selection."""
+        if event.keysym in ("Down", "Return", "Escape", "Tab"):
+            return
+        if self.employee and self.text_var.get() != self.display_text(self.employee):
+            self.employee = None
+            self.event_generate("<<EmployeeSelected>>")
+        self.schedule_search()
+
+    def on_focus(self, event):
+        """Offer the first employees by name when focusing an empty picker."""
+        if not self.employee:
+            self.schedule_search()
+
+    def schedule_search(self):
+        """Restart the debounce timer for the next search."""
+        if self._debounce_id:
+            self.after_cancel(self._debounce_id)
+        self._debounce_id = self.after(DEBOUNCE_MS, self.search)
+
+    def search(self):
+        """Run the prefix query on the background worker."""
+        self._debounce_id = None
+        prefix = self.text_var.get().strip()
+        if self.employee and prefix == self.display_text(self.employee):
+            prefix = ""
+        self.controller.worker.submit(search_employees, prefix, MAX_RESULTS, key=self._search_key,
+                                      on_success=self.show_results)
+
+    def show_results(self, employees):
+        """Show the matches under the entry."""
+        if self.focus_get() not in (self.entry, self.listbox):
+            return
+        self.matches = [dict(emp) for emp in employees]
+        self.listbox.delete(0, "end")
+        if not self.matches:
+            self.listbox.insert("end", "No matching employees")
+        for emp in self.matches:
+            self.listbox.insert("end", self.display_text(emp))
+        self.listbox.config(height=min(8, max(1, len(self.matches))))
+        self.listbox.place(in_=self.entry, x=0, rely=1.0, relwidth=1.0)
+        self.listbox.lift()
+
+    def hide_results(self):
+        """Hide the results list."""
+        self.listbox.place_forget()
+
+    def hide_results_if_unfocused(self):
+        """Hide the results list once focus has left the picker."""
+        if self.focus_get() not in (self.entry, self.listbox):
+            self.hide_results()
+
+    def focus_results(self, event):
+        """Move keyboard focus from the entry into the results list."""
+        if self.matches and self.listbox.winfo_ismapped():
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, "end")
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        return "break"
+
+    def pick_first(self, event):
+        """Pick the top match when Return is pressed in the entry."""
+        if self.matches and self.listbox.winfo_ismapped():
+            self.set_employee(self.matches[0])
+        return "break"
+
+    def pick_selected(self, event):
+        """Pick the clicked or highlighted match."""
+        selection = self.listbox.curselection()
+        if selection and selection[0] < len(self.matches):
+            self.set_employee(self.matches[selection[0]])
+            self.entry.focus_set()
+        return "break"
+
+    def on_employee_updated(self, event):
+        """Keep the selected employee's name and province current."""
+        if self.employee and self.employee['id'] == event.employee['id']:
+            self.set_employee(event.employee)
+
+    def on_employee_deleted(self, event):
+        """Clear the selection if the selected employee was deleted."""
+        if self.employee and self.employee['id'] == event.employee_id:
+            self.set_employee(None)
@@ -1,15 +1,52 @@
 # ui/employees.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-from db.database import get_all_employees, add_employee, update_employee, delete_employee, get_employee
+from db.database import get_employees_page, add_employee, update_employee, delete_employee, get_employee
 from ui.custom_button import CustomButton
+from ui.events import EmployeeAdded, EmployeeUpdated, EmployeeDeleted
+from ui.paging import KeysetPageSource, PREFETCH_THRESHOLD, nocase, show_sort_arrow
+
+# Column headings, and the query column each sortable heading sorts by
+HEADINGS = {"ID": "ID", "Name": "Name", "SIN": "SIN", "Province": "Province", "Salary": "Annual Salary"}
+SORT_COLUMNS = {"ID": "id", "Name": "name", "Province": "province", "Salary": "salary"}
+
+def add_and_fetch_employee(name, sin, province, salary):
+    """Add an employee and return the saved row as a dict. Runs on the background worker."""
+    return dict(get_employee(add_employee(name, sin, province, salary)))
+
+def update_and_fetch_employee(employee_id, name, sin, province, salary):
+    """Update an employee and return the saved row as a dict. Runs on the background worker."""
+    update_employee(employee_id, name, sin, province, salary)
+    return dict(get_employee(employee_id))
+
+def employee_row_values(emp):
+    """Treeview values for one employee."""
+    return (emp['id'], emp['name'], emp['sin'], emp['province'], f"${emp['salary'] or 0:.2f}")
+
+def employee_matches_filters(emp, filters) -> bool:
+    """True if an employee passes the list filters (the same tests as the query)."""
+    if filters.get('name') and not nocase(emp['name']).startswith(nocase(filters['name'])):
+        return False
+    if filters.get('province') and emp['province'] != filters['province']:
+        return False
+    if filters.get('min_salary') is not None and (emp['salary'] or 0) < filters['min_salary']:
+        return False
+    if filters.get('max_salary') is not None and (emp['salary'] or 0) > filters['max_salary']:
+        return False
+    return True
 
 class EmployeesFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
         self.selected_employee_id = None
+        self.source = KeysetPageSource(get_employees_page, sort=("name", False), nocase_columns=("name",))
+        self.loaded = False
         self.create_widgets()
+        
+        controller.events.subscribe(EmployeeAdded, self.on_employee_added)
+        controller.events.subscribe(EmployeeUpdated, self.on_employee_updated)
+        controller.events.subscribe(EmployeeDeleted, self.on_employee_deleted)
 
     def create_widgets(self):
         # Header
@@ -28,6 +65,37 @@ class EmployeesFrame(tk.Frame):
         
         tk.Label(left_frame, text="Employee List", font=("Arial", 13, "bold"), fg="#000000").pack(anchor="w", pady=(0, 5))
         
+        # Filter bar
+        filter_frame = tk.Frame(left_frame)
+        filter_frame.pack(fill="x", pady=(0, 5))
+        
+        tk.Label(filter_frame, text="Name:", font=("Arial", 10, "bold"), fg="#000000").pack(side="left")
+        self.name_filter_entry = tk.Entry(filter_frame, width=14, font=("Arial", 10))
+        self.name_filter_entry.pack(side="left", padx=(5, 10))
+        
+        tk.Label(filter_frame, text="Province:", font=("Arial", 10, "bold"), fg="#000000").pack(side="left")
+        self.province_filter_var = tk.StringVar(value="All")
+        ttk.Combobox(filter_frame, textvariable=self.province_filter_var, state="readonly", width=5, font=("Arial", 10),
+                     values=["All", "ON", "QC", "BC", "AB", "SK", "MB", "NB", "NS", "PE", "NL", "YT", "NT", "NU"]
+                     ).pack(side="left", padx=(5, 10))
+        
+        tk.Label(filter_frame, text="Salary:", font=("Arial", 10, "bold"), fg="#000000").pack(side="left")
+        self.min_salary_entry = tk.Entry(filter_frame, width=9, font=("Arial", 10))
+        self.min_salary_entry.pack(side="left", padx=(5, 2))
+        tk.Label(filter_frame, text="to", font=("Arial", 10), fg="#000000").pack(side="left")
+        self.max_salary_entry = tk.Entry(filter_frame, width=9, font=("Arial", 10))
+        self.max_salary_entry.pack(side="left", padx=(2, 10))
+        
+        apply_btn = CustomButton(filter_frame, text="Apply", command=self.apply_filters,
+                                 bg_color="#6600cc", padx=10, pady=4)
+        apply_btn.pack(side="left", padx=2)
+        clear_btn = CustomButton(filter_frame, text="Clear", command=self.clear_filters,
+                                 bg_color="#333333", padx=10, pady=4)
+        clear_btn.pack(side="left", padx=2)
+        
+        for entry in (self.name_filter_entry, self.min_salary_entry, self.max_salary_entry):
+            entry.bind("<Return>", lambda event: self.apply_filters())
+        
         # Treeview for employee list
         tree_frame = tk.Frame(left_frame)
         tree_frame.pack(fill="both", expand=True)
@@ -62,21 +130,23 @@ class EmployeesFrame(tk.Frame):
                  background=[("active", "#0088ee")],
                  foreground=[("active", "white")])
         
-        self.tree = ttk.Treeview(tree_frame, columns=("ID", "Name", "SIN", "Province"), 
-                                 show="headings", yscrollcommand=scrollbar.set,
+        self.tree = ttk.Treeview(tree_frame, columns=tuple(HEADINGS), 
+                                 show="headings", yscrollcommand=self.on_tree_scroll,
                                  style="EmployeeTree.Treeview")
-        self.tree.heading("ID", text="ID")
-        self.tree.heading("Name", text="Name")
-        self.tree.heading("SIN", text="SIN")
-        self.tree.heading("Province", text="Province")
+        # Clicking a sortable heading sorts by it
+        for tree_column, query_column in SORT_COLUMNS.items():
+            self.tree.heading(tree_column, command=lambda c=query_column: self.sort_by(c))
+        show_sort_arrow(self.tree, HEADINGS, SORT_COLUMNS, self.source.sort)
         
         self.tree.column("ID", width=50)
         self.tree.column("Name", width=200)
         self.tree.column("SIN", width=120)
         self.tree.column("Province", width=80)
+        self.tree.column("Salary", width=110)
         
         self.tree.pack(fill="both", expand=True)
         scrollbar.config(command=self.tree.yview)
+        self.scrollbar = scrollbar
         
         self.tree.bind("<<TreeviewSelect>>", self.on_select)
         
@@ -107,6 +177,12 @@ class EmployeesFrame(tk.Frame):
                                       state="readonly", width=28, font=("Arial", 11))
         province_combo.grid(row=2, column=1, pady=5, sticky="ew")
         
+        # Annual salary (used as the default gross pay for batch payroll)
+        tk.Label(form_frame, text="Annual Salary:", font=("Arial", 11, "bold"), fg="#000000").grid(row=3, column=0, sticky="w", pady=5)
+        self.salary_entry = tk.Entry(form_frame, width=30, font=("Arial", 11))
+        self.salary_entry.grid(row=3, column=1, pady=5, sticky="ew")
+        tk.Label(form_frame, text="Optional", font=("Arial", 9), fg="#666666").grid(row=3, column=2, sticky="w", padx=(5, 0))
+        
         form_frame.columnconfigure(1, weight=1)
         
         # Buttons
@@ -134,19 +210,118 @@ class EmployeesFrame(tk.Frame):
         clear_btn.pack(fill="x", pady=2)
 
     def refresh(self):
-        """Refresh employee list."""
-        self.load_employees()
+        """Load the employee list the first time the frame is shown; later changes arrive as events."""
+        if not self.loaded:
+            self.load_employees()
 
     def load_employees(self):
-        """Load all employees into the treeview."""
+        """Load the first page of employees into the treeview."""
+        # Drop any page still loading for the previous listing
+        self.controller.worker.cancel("employees.page")
+        self.source.reset()
+        self.controller.worker.submit(self.source.fetch_next, key="employees.list",
+                                      on_success=self.show_employees,
+                                      on_error=self.on_load_error)
+
+    def show_employees(self, employees):
+        """Replace the treeview contents with the first page of employees."""
         # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Load employees
-        employees = get_all_employees()
+        self.tree.delete(*self.tree.get_children())
+        self.append_employees(employees)
+        self.loaded = True
+
+    def load_next_page(self):
+        """Fetch the next page of employees in the background."""
+        worker = self.controller.worker
+        if self.source.exhausted or worker.has_pending("employees.list") or worker.has_pending("employees.page"):
+            return
+        worker.submit(self.source.fetch_next, key="employees.page",
+                      on_success=self.append_employees, on_error=self.on_load_error)
+
+    def append_employees(self, employees):
+        """Append a page of employees to the treeview."""
+        self.source.accept(employees)
         for emp in employees:
-            self.tree.insert("", "end", values=(emp['id'], emp['name'], emp['sin'], emp['province']))
+            self.tree.insert("", "end", iid=str(emp['id']), values=employee_row_values(emp))
+
+    def on_tree_scroll(self, first, last):
+        """Update the scrollbar and fetch more rows when nearing the end of the loaded ones."""
+        self.scrollbar.set(first, last)
+        if float(last) >= 1.0 - PREFETCH_THRESHOLD:
+            self.load_next_page()
+
+    def on_load_error(self, e):
+        """Report a failed load."""
+        messagebox.showerror("Error", f"Failed to load employees: {str(e)}")
+
+    def sort_by(self, column):
+        """Sort by a column heading, reversing the order if it is already sorted by it."""
+        self.source.sort_by(column, descending=column == "salary")
+        show_sort_arrow(self.tree, HEADINGS, SORT_COLUMNS, self.source.sort)
+        self.load_employees()
+
+    def get_filters(self):
+        """Read the filter bar. Returns the filters dict, or None if a field is invalid."""
+        filters = {}
+        if self.name_filter_entry.get().strip():
+            filters['name'] = self.name_filter_entry.get().strip()
+        if self.province_filter_var.get() != "All":
+            filters['province'] = self.province_filter_var.get()
+        for key, entry, label in (('min_salary', self.min_salary_entry, "Minimum salary"),
+                                  ('max_salary', self.max_salary_entry, "Maximum salary")):
+            text = entry.get().strip().replace(",", "").lstrip("$")
+            if text:
+                try:
+                    filters[key] = float(text)
+                except ValueError:
+                    messagebox.showerror("Invalid Filter", f"{label} must be a number.")
+                    return None
+        return filters
+
+    def apply_filters(self):
+        """Reload the list with the filter bar's filters."""
+        filters = self.get_filters()
+        if filters is None:
+            return
+        self.source.set_filters(filters)
+        self.load_employees()
+
+    def clear_filters(self):
+        """Clear the filter bar and reload all employees."""
+        self.name_filter_entry.delete(0, tk.END)
+        self.province_filter_var.set("All")
+        self.min_salary_entry.delete(0, tk.END)
+        self.max_salary_entry.delete(0, tk.END)
+        self.source.set_filters({})
+        self.load_employees()
+
+    def place_employee(self, emp):
+        """Insert an employee's row at its sorted position, if it passes the filters and is in the loaded range."""
+        if not employee_matches_filters(emp, self.source.filters):
+            return
+        index = self.source.insert(emp)
+        if index is not None:
+            self.tree.insert("", index, iid=str(emp['id']), values=employee_row_values(emp))
+
+    def on_employee_added(self, event):
+        """Insert the new employee's row at its sorted position."""
+        if not self.loaded:
+            return
+        self.place_employee(event.employee)
+
+    def on_employee_updated(self, event):
+        """Update the employee's row, moving it if its sort position changed."""
+        if not self.loaded:
+            return
+        emp = event.employee
+        if self.source.remove(emp['id']):
+            self.tree.delete(str(emp['id']))
+        self.place_employee(emp)
+
+    def on_employee_deleted(self, event):
+        """Remove the employee's row."""
+        if self.source.remove(event.employee_id):
+            self.tree.delete(str(event.employee_id))
 
     def on_select(self, event):
         """Handle employee selection."""
@@ -155,14 +330,35 @@ class EmployeesFrame(tk.Frame):
             item = self.tree.item(selection[0])
             values = item['values']
             self.selected_employee_id = values[0]
-            
-            # Populate form
-            employee = get_employee(self.selected_employee_id)
-            self.name_entry.delete(0, tk.END)
-            self.name_entry.insert(0, employee['name'])
-            self.sin_entry.delete(0, tk.END)
-            self.sin_entry.insert(0, employee['sin'] or "")
-            self.province_var.set(employee['province'])
+            self.controller.worker.submit(get_employee, self.selected_employee_id, key="employees.select",
+                                          on_success=self.show_employee)
+
+    def show_employee(self, employee):
+        """Populate the form with the selected employee."""
+        if not employee:
+            return
+        self.name_entry.delete(0, tk.END)
+        self.name_entry.insert(0, employee['name'])
+        self.sin_entry.delete(0, tk.END)
+        self.sin_entry.insert(0, employee['sin'] or "")
+        self.province_var.set(employee['province'])
+        self.salary_entry.delete(0, tk.END)
+        if employee['salary']:
+            self.salary_entry.insert(0, f"{employee['salary']:.2f}")
+
+    def get_salary(self):
+        """Parse the annual salary field. Blank means no salary; returns None if invalid."""
+        salary_text = self.salary_entry.get().strip().replace(",", "").lstrip("$")
+        if not salary_text:
+            return 0.0
+        try:
+            salary = float(salary_text)
+        except ValueError:
+            salary = -1
+        if salary < 0:
+            messagebox.showerror("Invalid Input", "Annual salary must be a positive number.")
+            return None
+        return salary
 
     def add_new(self):
         """Add a new employee."""
@@ -174,18 +370,18 @@ class EmployeesFrame(tk.Frame):
             messagebox.showerror("Invalid Input", "Please enter employee name.")
             return
         
-        try:
-            employee_id = add_employee(name, sin, province)
-            messagebox.showinfo("Success", f"Employee added successfully! (ID: {employee_id})")
-            self.load_employees()
+        salary = self.get_salary()
+        if salary is None:
+            return
+        
+        def on_added(employee):
+            messagebox.showinfo("Success", f"Employee added successfully! (ID: {employee['id']})")
             self.clear_form()
-            # Notify other frames to refresh their employee lists
-            if hasattr(self.controller, 'frames'):
-                for frame_name, frame in self.controller.frames.items():
-                    if hasattr(frame, 'refresh_employee_list') and frame_name != 'EmployeesFrame':
-                        frame.refresh_employee_list(silent=True)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add employee: {str(e)}")
+            self.controller.events.publish(EmployeeAdded(employee))
+        
+        self.controller.worker.submit(add_and_fetch_employee, name, sin, province, salary, on_success=on_added,
+                                      cancellable=False,
+                                      on_error=lambda e: messagebox.showerror("Error", f"Failed to add employee: {str(e)}"))
 
     def update_existing(self):
         """Update selected employee."""
@@ -201,18 +397,18 @@ class EmployeesFrame(tk.Frame):
             messagebox.showerror("Invalid Input", "Please enter employee name.")
             return
         
-        try:
-            update_employee(self.selected_employee_id, name, sin, province)
+        salary = self.get_salary()
+        if salary is None:
+            return
+        
+        def on_updated(employee):
             messagebox.showinfo("Success", "Employee updated successfully!")
-            self.load_employees()
             self.clear_form()
-            # Notify other frames to refresh their employee lists
-            if hasattr(self.controller, 'frames'):
-                for frame_name, frame in self.controller.frames.items():
-                    if hasattr(frame, 'refresh_employee_list') and frame_name != 'EmployeesFrame':
-                        frame.refresh_employee_list(silent=True)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update employee: {str(e)}")
+            self.controller.events.publish(EmployeeUpdated(employee))
+        
+        self.controller.worker.submit(update_and_fetch_employee, self.selected_employee_id, name, sin, province, salary,
+                                      on_success=on_updated, cancellable=False,
+                                      on_error=lambda e: messagebox.showerror("Error", f"Failed to update employee: {str(e)}"))
 
     def delete_existing(self):
         """Delete selected employee."""
@@ -220,28 +416,33 @@ class EmployeesFrame(tk.Frame):
             messagebox.showerror("No Selection", "Please select an employee to delete.")
             return
         
-        employee = get_employee(self.selected_employee_id)
+        employee_id = self.selected_employee_id
+        self.controller.worker.submit(get_employee, employee_id,
+                                      on_success=lambda employee: self.confirm_delete(employee_id, employee))
+
+    def confirm_delete(self, employee_id, employee):
+        """Ask for confirmation, then delete the employee in the background."""
+        if not employee:
+            messagebox.showerror("Error", "Employee not found.")
+            return
+        
         confirm = messagebox.askyesno("Confirm Delete", 
                                       f"Are you sure you want to delete employee '{employee['name']}'?\n\n"
                                       "This will also delete all associated payroll runs.")
         
         if confirm:
-            try:
-                delete_employee(self.selected_employee_id)
+            def on_deleted(_):
                 messagebox.showinfo("Success", "Employee deleted successfully!")
-                self.load_employees()
                 self.clear_form()
-                # Notify other frames to refresh their employee lists
-                if hasattr(self.controller, 'frames'):
-                    for frame_name, frame in self.controller.frames.items():
-                        if hasattr(frame, 'refresh_employee_list') and frame_name != 'EmployeesFrame':
-                            frame.refresh_employee_list()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete employee: {str(e)}")
+                self.controller.events.publish(EmployeeDeleted(employee_id))
+            
+            self.controller.worker.submit(delete_employee, employee_id, on_success=on_deleted, cancellable=False,
+                                          on_error=lambda e: messagebox.showerror("Error", f"Failed to delete employee: {str(e)}"))
 
     def clear_form(self):
         """Clear the form."""
         self.name_entry.delete(0, tk.END)
         self.sin_entry.delete(0, tk.END)
         self.province_var.set("ON")
+        self.salary_entry.delete(0, tk.END)
         self.selected_employee_id = None
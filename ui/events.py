@@ -0,0 +1,55 @@
+# ui/events.py
+"""
+Change notifications for the UI layer.
+Screens publish typed events after a change is saved, and every other screen
+applies a targeted update to its own widgets instead of reloading everything.
+Events are published and delivered on the Tk event loop.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class EmployeeAdded:
+    employee: dict
+
+
+@dataclass(frozen=True)
+class EmployeeUpdated:
+    employee: dict
+
+
+@dataclass(frozen=True)
+class EmployeeDeleted:
+    employee_id: int
+
+
+@dataclass(frozen=True)
+class PayrollRunSaved:
+    run: dict
+
+
+@dataclass(frozen=True)
+class PayrollCycleSaved:
+    pay_date: str
+    count: int
+
+
+class EventBus:
+    """Publish/subscribe by event type. Handlers run in subscription order."""
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, event_type, handler):
+        """Call handler(event) for every published event of event_type."""
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type, handler):
+        """Stop calling handler for event_type."""
+        handlers = self._handlers.get(event_type, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def publish(self, event):
+        """Deliver event to every handler subscribed to its type."""
+        for handler in list(self._handlers.get(type(event), [])):
+            handler(event)
@@ -3,9 +3,17 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 import os
-from db.database import get_all_employees, get_payroll_runs_by_year, get_employee
+from db.database import get_payroll_runs_by_year, get_employee
 from logic.t4_generator import generate_t4_html
 from ui.custom_button import CustomButton
+from ui.employee_picker import EmployeePicker
+
+def fetch_year_runs(employee_id: int, year: int):
+    """Get the employee and all their payroll runs for the year. Runs on the background worker."""
+    employee = get_employee(employee_id)
+    if not employee:
+        return None, []
+    return employee, get_payroll_runs_by_year(employee_id, year)
 
 class GenerateT4Frame(tk.Frame):
     def __init__(self, parent, controller):
@@ -31,9 +39,8 @@ class GenerateT4Frame(tk.Frame):
         
         # Employee selection
         tk.Label(form_frame, text="Select Employee:", font=("Arial", 11, "bold"), fg="#000000").grid(row=0, column=0, sticky="w", pady=5)
-        self.employee_var = tk.StringVar()
-        self.employee_combo = ttk.Combobox(form_frame, textvariable=self.employee_var, state="readonly", width=40, font=("Arial", 11))
-        self.employee_combo.grid(row=0, column=1, pady=5, sticky="ew")
+        self.employee_picker = EmployeePicker(form_frame, self.controller, width=40)
+        self.employee_picker.grid(row=0, column=1, pady=5, sticky="ew")
         
         # Year selection
         tk.Label(form_frame, text="Tax Year:", font=("Arial", 11, "bold"), fg="#000000").grid(row=1, column=0, sticky="w", pady=5)
@@ -80,36 +87,29 @@ class GenerateT4Frame(tk.Frame):
         # Store last T4 HTML
         self.last_t4_html = None
 
-    def refresh(self):
-        """Refresh employee list when frame is shown."""
-        employees = get_all_employees()
-        employee_names = [f"{emp['id']}: {emp['name']}" for emp in employees]
-        self.employee_combo['values'] = employee_names
-        if employee_names:
-            self.employee_combo.current(0)
-
     def calculate_totals(self):
         """Calculate year-end totals for T4."""
-        if not self.employee_var.get():
+        employee_id = self.employee_picker.get_employee_id()
+        if employee_id is None:
             messagebox.showerror("No Employee", "Please select an employee.")
             return
         
         try:
-            employee_id = int(self.employee_var.get().split(":")[0])
             year = int(self.year_var.get())
         except ValueError:
-            messagebox.showerror("Invalid Input", "Invalid employee or year selection.")
+            messagebox.showerror("Invalid Input", "Invalid year selection.")
             return
         
-        # Get employee info
-        employee = get_employee(employee_id)
+        self.controller.worker.submit(fetch_year_runs, employee_id, year, key="t4.totals",
+                                      on_success=lambda data: self.show_totals(data, year))
+
+    def show_totals(self, data, year):
+        """Display year-end totals from the data returned by fetch_year_runs()."""
+        employee, runs = data
         if not employee:
             messagebox.showerror("Error", "Employee not found.")
             return
         
-        # Get all payroll runs for the year
-        runs = get_payroll_runs_by_year(employee_id, year)
-        
         if not runs:
             messagebox.showinfo("No Records", f"No payroll records found for {employee['name']} in {year}.")
             self.output.delete("1.0", "end")
@@ -193,10 +193,15 @@ Pay Period Details with YTD Progression:
             messagebox.showerror("No Calculation", "Please calculate totals first.")
             return
         
+        # Convert sqlite3.Row to dict for template compatibility
+        employee_dict = dict(self.current_employee)
+        self.controller.worker.submit(generate_t4_html, employee_dict, self.current_year, self.totals,
+                                      on_success=self.show_t4_preview, cancellable=False,
+                                      on_error=lambda e: messagebox.showerror("Error", f"Failed to generate T4: {str(e)}"))
+
+    def show_t4_preview(self, html):
+        """Show the generated T4 HTML in a preview window."""
         try:
-            # Convert sqlite3.Row to dict for template compatibility
-            employee_dict = dict(self.current_employee)
-            html = generate_t4_html(employee_dict, self.current_year, self.totals)
             self.last_t4_html = html
             
             # Show preview in a new window
@@ -1,18 +1,40 @@
 # ui/main_window.py
+import importlib
 import tkinter as tk
-from tkinter import ttk
-from ui.run_payroll import RunPayrollFrame
-from ui.employees import EmployeesFrame
-from ui.records import RecordsFrame
-from ui.generate_t4 import GenerateT4Frame
-from ui.settings import SettingsFrame
 from ui.custom_button import CustomButton
+from ui.worker import BackgroundWorker
+from ui.events import EventBus
+from utils import startup_timing
+
+# Frame class name -> module that defines it. Modules (and through them the
+# tax tables and database layer) are imported on first navigation.
+FRAME_MODULES = {
+    "RunPayrollFrame": "ui.run_payroll",
+    "BatchPayrollFrame": "ui.batch_payroll",
+    "EmployeesFrame": "ui.employees",
+    "RecordsFrame": "ui.records",
+    "GenerateT4Frame": "ui.generate_t4",
+    "SettingsFrame": "ui.settings",
+}
+
+def init_database():
+    """Create or migrate the database schema. Runs as the first background job."""
+    from db.database import init_db
+    init_db()
 
 class MainWindow(tk.Frame):
     def __init__(self, master):
         super().__init__(master)
         self.pack(fill="both", expand=True)
+        # Database and calculation work runs off the Tk event loop
+        self.worker = BackgroundWorker(self, on_busy_change=self.show_busy)
+        # Screens publish changes here and apply targeted updates to each other
+        self.events = EventBus()
+        # Queued ahead of every screen's first query
+        self.worker.submit(init_database, cancellable=False)
         self.create_widgets()
+        # Escape cancels whatever is still loading; saves always finish
+        master.bind("<Escape>", lambda event: self.worker.cancel())
 
     def create_widgets(self):
         nav = tk.Frame(self, bg="#1a1a1a", height=50)
@@ -26,6 +48,10 @@ class MainWindow(tk.Frame):
                               bg_color="#0066cc", padx=15, pady=10)  # Blue
         self.nav_buttons['run'].pack(side="left", padx=3, pady=5)
         
+        self.nav_buttons['batch'] = CustomButton(nav, text="Run All", command=self.show_batch,
+                              bg_color="#0044aa", padx=15, pady=10)  # Dark blue
+        self.nav_buttons['batch'].pack(side="left", padx=3, pady=5)
+        
         self.nav_buttons['employees'] = CustomButton(nav, text="Employees", command=self.show_employees,
                               bg_color="#6600cc", padx=15, pady=10)  # Purple
         self.nav_buttons['employees'].pack(side="left", padx=3, pady=5)
@@ -42,6 +68,11 @@ class MainWindow(tk.Frame):
                                     bg_color="#6600cc", padx=15, pady=10)  # Purple
         self.nav_buttons['settings'].pack(side="left", padx=3, pady=5)
         
+        # In-progress indicator for background work
+        self.busy_label = tk.Label(nav, text="", bg="#1a1a1a", fg="#ffcc00",
+                                   font=("Arial", 10, "bold"))
+        self.busy_label.pack(side="right", padx=10)
+        
         # Track active tab
         self.active_tab = None
 
@@ -50,18 +81,18 @@ class MainWindow(tk.Frame):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
         
+        # Frames are built on first navigation; only built frames are in here
         self.frames = {}
-        for F in (RunPayrollFrame, EmployeesFrame, RecordsFrame, GenerateT4Frame, SettingsFrame):
-            page = F(self.container, self)
-            self.frames[F.__name__] = page
-            page.grid(row=0, column=0, sticky="nsew")
+        startup_timing.mark("navigation built")
         self.show_run()
+        startup_timing.mark("first frame built")
 
     def highlight_active_tab(self, active_key):
         """Highlight the active tab button."""
         # Base colors matching tab headers
         base_colors = {
             'run': '#0066cc',       # Blue
+            'batch': '#0044aa',     # Dark blue
             'employees': '#6600cc', # Purple
             'records': '#cc6600',   # Orange
             't4': '#009999',        # Teal
@@ -71,6 +102,7 @@ class MainWindow(tk.Frame):
         # Bright colors for active state
         active_colors = {
             'run': '#0088ff',       # Bright blue
+            'batch': '#0066ee',     # Bright dark blue
             'employees': '#8800ff', # Bright purple
             'records': '#ff8800',   # Bright orange
             't4': '#00cccc',        # Bright teal
@@ -87,14 +119,35 @@ class MainWindow(tk.Frame):
             self.nav_buttons[active_key].bg_color = active_colors[active_key]
             self.nav_buttons[active_key].config(bg=active_colors[active_key])
     
+    def show_busy(self, busy):
+        """Show or hide the in-progress indicator while background work is pending."""
+        if busy:
+            loading = self.worker.can_cancel()
+            self.busy_label.config(text="Loading... (Esc to cancel)" if loading else "Working...")
+            self.config(cursor="watch")
+        else:
+            self.busy_label.config(text="")
+            self.config(cursor="")
+
+    def get_frame(self, name):
+        """Return the named frame, importing its module and building it on first use."""
+        if name not in self.frames:
+            module = importlib.import_module(FRAME_MODULES[name])
+            page = getattr(module, name)(self.container, self)
+            page.grid(row=0, column=0, sticky="nsew")
+            self.frames[name] = page
+        return self.frames[name]
+
     def show_frame(self, name, tab_key):
-        self.frames[name].tkraise()
+        frame = self.get_frame(name)
+        frame.tkraise()
         self.highlight_active_tab(tab_key)
         # Refresh the frame if it has a refresh method
-        if hasattr(self.frames[name], 'refresh'):
-            self.frames[name].refresh()
+        if hasattr(frame, 'refresh'):
+            frame.refresh()
 
     def show_run(self): self.show_frame("RunPayrollFrame", 'run')
+    def show_batch(self): self.show_frame("BatchPayrollFrame", 'batch')
     def show_employees(self): self.show_frame("EmployeesFrame", 'employees')
     def show_records(self): self.show_frame("RecordsFrame", 'records')
     def show_t4(self): self.show_frame("GenerateT4Frame", 't4')
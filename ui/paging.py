@@ -0,0 +1,140 @@
+# ui/paging.py
+"""
+Keyset paging for the list screens.
+Each page continues after the sort key (sort value, id) of the last row shown,
+so the database seeks straight to it through an index however far the user scrolls.
+The sort order and filters are applied in SQL; the screen only holds the rows
+it has displayed.
+"""
+import bisect
+import string
+
+# Rows fetched per page; covers the visible rows plus a prefetch window
+PAGE_SIZE = 100
+# Fetch the next page when the view is scrolled within this fraction of the end
+PREFETCH_THRESHOLD = 0.2
+
+# ASCII-only case folding, the same as SQLite's NOCASE collation
+_NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def nocase(text: str) -> str:
+    """Fold text for comparison the way SQLite's NOCASE collation and LIKE do."""
+    return text.translate(_NOCASE)
+
+
+def descending_index(keys, key):
+    """Position of key in a list sorted in descending order (after any equal keys)."""
+    lo, hi = 0, len(keys)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if keys[mid] >= key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class KeysetPageSource:
+    """
+    Keyset-paged reader over a sorted, filtered query.
+    fetch_page(limit, after=, filters=, sort=) returns rows with an 'id' column, where
+    sort is (column, descending). tie_breaks maps a sort column to the row columns the
+    query orders by between it and id. Keeps the sort key of every displayed row so rows
+    changed elsewhere can be placed without re-reading.
+    """
+    def __init__(self, fetch_page, sort, page_size=PAGE_SIZE, nocase_columns=(), tie_breaks=None):
+        self.fetch_page = fetch_page
+        self.sort = sort
+        self.filters = {}
+        self.page_size = page_size
+        self.nocase_columns = set(nocase_columns)
+        self.tie_breaks = tie_breaks or {}
+        self.reset()
+
+    def reset(self):
+        """Start again from the top of the listing."""
+        self.last_key = None
+        self.exhausted = False
+        # Sort key of each displayed row in display order, and by row id
+        self.keys = []
+        self.key_by_id = {}
+
+    def sort_by(self, column, descending):
+        """Sort by column, or reverse the order if already sorted by it. Call load again afterwards."""
+        if self.sort[0] == column:
+            self.sort = (column, not self.sort[1])
+        else:
+            self.sort = (column, descending)
+        self.reset()
+
+    def set_filters(self, filters):
+        """Replace the filters. Call load again afterwards."""
+        self.filters = dict(filters)
+        self.reset()
+
+    def fetch_next(self):
+        """
+        Fetch the page after the last accepted one. Doesn't move the cursor,
+        so it is safe to run on the background worker and discard the result.
+        """
+        return self.fetch_page(self.page_size, after=self.last_key, filters=self.filters, sort=self.sort)
+
+    def accept(self, rows):
+        """Move the cursor past a page that has been displayed."""
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if rows:
+            self.last_key = self.page_key(rows[-1])
+        for row in rows:
+            key = self.sort_key(row)
+            self.keys.append(key)
+            self.key_by_id[row['id']] = key
+
+    def page_key(self, row):
+        """The values the query orders by for a row: sort value, any tie-breaks, then id."""
+        column = self.sort[0]
+        return (row[column], *(row[tie] for tie in self.tie_breaks.get(column, ())), row['id'])
+
+    def sort_key(self, row):
+        """Sort key of a row, compared the same way as in the query."""
+        key = self.page_key(row)
+        if self.sort[0] in self.nocase_columns:
+            key = (nocase(key[0]),) + key[1:]
+        return key
+
+    def insert(self, row):
+        """
+        Record a row added or changed elsewhere. Returns its display index, or None
+        if it sorts after the rows loaded so far and will arrive with a later page.
+        """
+        key = self.sort_key(row)
+        if self.sort[1]:
+            index = descending_index(self.keys, key)
+        else:
+            index = bisect.bisect(self.keys, key)
+        if index == len(self.keys) and not self.exhausted:
+            return None
+        self.keys.insert(index, key)
+        self.key_by_id[row['id']] = key
+        return index
+
+    def remove(self, row_id):
+        """Forget a displayed row. Returns True if it was displayed."""
+        key = self.key_by_id.pop(row_id, None)
+        if key is None:
+            return False
+        self.keys.remove(key)
+        return True
+
+
+def show_sort_arrow(tree, headings, sort_columns, sort):
+    """
+    Label the tree's column headings, marking the sorted column with its direction.
+    headings maps tree column to label; sort_columns maps tree column to query column.
+    """
+    column, descending = sort
+    for tree_column, label in headings.items():
+        if sort_columns.get(tree_column) == column:
+            label += " ▼" if descending else " ▲"
+        tree.heading(tree_column, text=label)
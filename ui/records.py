@@ -1,14 +1,59 @@
 # ui/records.py
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk, messagebox
-from db.database import get_all_payroll_runs
+from db.database import PAYROLL_RUN_TIE_BREAKS, get_payroll_runs_page, get_payroll_runs_summary
 from ui.custom_button import CustomButton
+from ui.employee_picker import EmployeePicker
+from ui.events import EmployeeUpdated, EmployeeDeleted, PayrollRunSaved, PayrollCycleSaved
+from ui.paging import KeysetPageSource, PREFETCH_THRESHOLD, show_sort_arrow
+
+# Column headings, and the query column each sortable heading sorts by
+HEADINGS = {
+    "ID": "ID", "Employee": "Employee", "Date": "Pay Date", "Gross": "Gross", "CPP": "CPP (Emp)",
+    "EI": "EI (Emp)", "Fed Tax": "Fed Tax", "Prov Tax": "Prov Tax", "Total Ded": "Total Ded", "Net": "Net Pay",
+}
+SORT_COLUMNS = {"ID": "id", "Employee": "employee_name", "Date": "pay_date", "Gross": "gross", "Net": "net"}
+# Text columns sort A-Z first; dates and amounts newest/largest first
+ASCENDING_FIRST = ("employee_name",)
+
+
+def run_matches_filters(run, filters) -> bool:
+    """True if a payroll run passes the Records filters (the same tests as the query)."""
+    if filters.get('employee_id') and run['employee_id'] != filters['employee_id']:
+        return False
+    if filters.get('province') and run['employee_province'] != filters['province']:
+        return False
+    if filters.get('date_from') and run['pay_date'] < filters['date_from']:
+        return False
+    if filters.get('date_to') and run['pay_date'] > filters['date_to']:
+        return False
+    if filters.get('min_gross') is not None and run['gross'] < filters['min_gross']:
+        return False
+    if filters.get('max_gross') is not None and run['gross'] > filters['max_gross']:
+        return False
+    return True
+
 
 class RecordsFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
+        self.source = KeysetPageSource(get_payroll_runs_page, sort=("pay_date", True),
+                                       nocase_columns=("employee_name",),
+                                       tie_breaks={column: list(ties) for column, ties in PAYROLL_RUN_TIE_BREAKS.items()})
+        # Loaded row ids by employee, for renaming and removing their rows
+        self.items_by_employee = {}
+        self.summary = None
+        self.loaded = False
+        # Set when a change can't be applied as a targeted update; reloads on next show
+        self.stale = False
         self.create_widgets()
+        
+        controller.events.subscribe(PayrollRunSaved, self.on_run_saved)
+        controller.events.subscribe(PayrollCycleSaved, self.on_cycle_saved)
+        controller.events.subscribe(EmployeeUpdated, self.on_employee_updated)
+        controller.events.subscribe(EmployeeDeleted, self.on_employee_deleted)
 
     def create_widgets(self):
         # Header
@@ -35,6 +80,47 @@ class RecordsFrame(tk.Frame):
                                    bg_color="#009933", padx=20, pady=10)
         details_btn.pack(side="left", padx=5)
         
+        # Filter bar
+        filter_frame = tk.LabelFrame(content, text="Filter", padx=10, pady=5,
+                                     font=("Arial", 11, "bold"), fg="#000000")
+        filter_frame.pack(fill="x", pady=(0, 10))
+        
+        tk.Label(filter_frame, text="Employee:", font=("Arial", 10, "bold"), fg="#000000").grid(row=0, column=0, sticky="w")
+        self.employee_picker = EmployeePicker(filter_frame, self.controller, width=22, font=("Arial", 10))
+        self.employee_picker.grid(row=0, column=1, padx=(5, 15), sticky="w")
+        
+        tk.Label(filter_frame, text="Province:", font=("Arial", 10, "bold"), fg="#000000").grid(row=0, column=2, sticky="w")
+        self.province_var = tk.StringVar(value="All")
+        ttk.Combobox(filter_frame, textvariable=self.province_var, state="readonly", width=5, font=("Arial", 10),
+                     values=["All", "ON", "QC", "BC", "AB", "SK", "MB", "NB", "NS", "PE", "NL", "YT", "NT", "NU"]
+                     ).grid(row=0, column=3, padx=(5, 15), sticky="w")
+        
+        tk.Label(filter_frame, text="Dates:", font=("Arial", 10, "bold"), fg="#000000").grid(row=0, column=4, sticky="w")
+        self.date_from_entry = tk.Entry(filter_frame, width=11, font=("Arial", 10))
+        self.date_from_entry.grid(row=0, column=5, padx=(5, 2))
+        tk.Label(filter_frame, text="to", font=("Arial", 10), fg="#000000").grid(row=0, column=6)
+        self.date_to_entry = tk.Entry(filter_frame, width=11, font=("Arial", 10))
+        self.date_to_entry.grid(row=0, column=7, padx=(2, 15))
+        
+        tk.Label(filter_frame, text="Gross:", font=("Arial", 10, "bold"), fg="#000000").grid(row=0, column=8, sticky="w")
+        self.min_gross_entry = tk.Entry(filter_frame, width=9, font=("Arial", 10))
+        self.min_gross_entry.grid(row=0, column=9, padx=(5, 2))
+        tk.Label(filter_frame, text="to", font=("Arial", 10), fg="#000000").grid(row=0, column=10)
+        self.max_gross_entry = tk.Entry(filter_frame, width=9, font=("Arial", 10))
+        self.max_gross_entry.grid(row=0, column=11, padx=(2, 15))
+        
+        apply_btn = CustomButton(filter_frame, text="Apply", command=self.apply_filters,
+                                 bg_color="#cc6600", padx=12, pady=4)
+        apply_btn.grid(row=0, column=12, padx=2)
+        clear_btn = CustomButton(filter_frame, text="Clear", command=self.clear_filters,
+                                 bg_color="#333333", padx=12, pady=4)
+        clear_btn.grid(row=0, column=13, padx=2)
+        tk.Label(filter_frame, text="Dates as YYYY-MM-DD; blank fields are not filtered",
+                 font=("Arial", 9), fg="#666666").grid(row=1, column=0, columnspan=14, sticky="w")
+        
+        for entry in (self.date_from_entry, self.date_to_entry, self.min_gross_entry, self.max_gross_entry):
+            entry.bind("<Return>", lambda event: self.apply_filters())
+        
         # Treeview for records
         tree_frame = tk.Frame(content)
         tree_frame.pack(fill="both", expand=True)
@@ -73,23 +159,16 @@ class RecordsFrame(tk.Frame):
                  foreground=[("active", "white")])
         
         self.tree = ttk.Treeview(tree_frame, 
-                                 columns=("ID", "Employee", "Date", "Gross", "CPP", "EI", "Fed Tax", "Prov Tax", "Total Ded", "Net"),
+                                 columns=tuple(HEADINGS),
                                  show="headings", 
-                                 yscrollcommand=scrollbar_y.set,
+                                 yscrollcommand=self.on_tree_scroll,
                                  xscrollcommand=scrollbar_x.set,
                                  style="RecordsTree.Treeview")
         
-        # Column headings
-        self.tree.heading("ID", text="ID")
-        self.tree.heading("Employee", text="Employee")
-        self.tree.heading("Date", text="Pay Date")
-        self.tree.heading("Gross", text="Gross")
-        self.tree.heading("CPP", text="CPP (Emp)")
-        self.tree.heading("EI", text="EI (Emp)")
-        self.tree.heading("Fed Tax", text="Fed Tax")
-        self.tree.heading("Prov Tax", text="Prov Tax")
-        self.tree.heading("Total Ded", text="Total Ded")
-        self.tree.heading("Net", text="Net Pay")
+        # Column headings; clicking a sortable heading sorts by it
+        for tree_column, query_column in SORT_COLUMNS.items():
+            self.tree.heading(tree_column, command=lambda c=query_column: self.sort_by(c))
+        show_sort_arrow(self.tree, HEADINGS, SORT_COLUMNS, self.source.sort)
         
         # Column widths
         self.tree.column("ID", width=50)
@@ -105,6 +184,7 @@ class RecordsFrame(tk.Frame):
         
         self.tree.pack(fill="both", expand=True)
         scrollbar_y.config(command=self.tree.yview)
+        self.scrollbar_y = scrollbar_y
         scrollbar_x.config(command=self.tree.xview)
         
         # Summary frame
@@ -117,62 +197,191 @@ class RecordsFrame(tk.Frame):
         self.summary_label.pack()
 
     def refresh(self):
-        """Refresh records when frame is shown."""
-        self.load_records()
+        """Load records the first time the frame is shown, or if they went stale."""
+        if not self.loaded or self.stale:
+            self.load_records()
 
     def load_records(self):
-        """Load all payroll records."""
+        """Load the first page of payroll records and the summary totals."""
+        # Drop any page still loading for the previous listing
+        self.controller.worker.cancel("records.page")
+        self.source.reset()
+        self.controller.worker.submit(self.fetch_first_page, key="records",
+                                      on_success=self.show_first_page,
+                                      on_error=self.on_load_error)
+
+    def fetch_first_page(self):
+        """Read the first page and the summary totals. Runs on the background worker."""
+        return self.source.fetch_next(), get_payroll_runs_summary(self.source.filters)
+
+    def show_first_page(self, page):
+        """Replace the table contents with the first page and update the summary."""
+        records, summary = page
+        
         # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.tree.delete(*self.tree.get_children())
+        self.items_by_employee = {}
+        self.append_records(records)
+        self.loaded = True
+        self.stale = False
         
-        # Load records
-        records = get_all_payroll_runs()
+        # Update summary from a single aggregate query
+        self.show_summary(summary)
+
+    def sort_by(self, column):
+        """Sort by a column heading, reversing the order if it is already sorted by it."""
+        self.source.sort_by(column, descending=column not in ASCENDING_FIRST)
+        show_sort_arrow(self.tree, HEADINGS, SORT_COLUMNS, self.source.sort)
+        self.load_records()
+
+    def get_filters(self):
+        """Read the filter bar. Returns the filters dict, or None if a field is invalid."""
+        filters = {}
+        if self.employee_picker.get_employee_id():
+            filters['employee_id'] = self.employee_picker.get_employee_id()
+        if self.province_var.get() != "All":
+            filters['province'] = self.province_var.get()
         
-        total_gross = 0.0
-        total_net = 0.0
-        total_deductions = 0.0
-        total_cra_remittance = 0.0
+        for key, entry, label in (('date_from', self.date_from_entry, "From date"),
+                                  ('date_to', self.date_to_entry, "To date")):
+            text = entry.get().strip()
+            if text:
+                try:
+                    datetime.strptime(text, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showerror("Invalid Filter", f"{label} must be in YYYY-MM-DD format.")
+                    return None
+                filters[key] = text
         
-        for record in records:
-            # Calculate CRA remittance for this record
-            cra_remittance = (
-                record['cpp_employee'] + 
-                record['ei_employee'] + 
-                record['federal_withholding'] + 
-                record['provincial_withholding'] + 
-                record['cpp_employer'] + 
-                record['ei_employer']
-            )
-            
-            self.tree.insert("", "end", values=(
-                record['id'],
-                record['employee_name'],
-                record['pay_date'],
-                f"${record['gross']:.2f}",
-                f"${record['cpp_employee']:.2f}",
-                f"${record['ei_employee']:.2f}",
-                f"${record['federal_withholding']:.2f}",
-                f"${record['provincial_withholding']:.2f}",
-                f"${record['total_deductions']:.2f}",
-                f"${record['net']:.2f}"
-            ))
-            
-            total_gross += record['gross']
-            total_net += record['net']
-            total_deductions += record['total_deductions']
-            total_cra_remittance += cra_remittance
-        
-        # Update summary
-        count = len(records)
-        if count > 0:
+        for key, entry, label in (('min_gross', self.min_gross_entry, "Minimum gross"),
+                                  ('max_gross', self.max_gross_entry, "Maximum gross")):
+            text = entry.get().strip().replace(",", "").lstrip("$")
+            if text:
+                try:
+                    filters[key] = float(text)
+                except ValueError:
+                    messagebox.showerror("Invalid Filter", f"{label} must be a number.")
+                    return None
+        return filters
+
+    def apply_filters(self):
+        """Reload the first page with the filter bar's filters."""
+        filters = self.get_filters()
+        if filters is None:
+            return
+        self.source.set_filters(filters)
+        self.load_records()
+
+    def clear_filters(self):
+        """Clear the filter bar and reload all records."""
+        self.employee_picker.set_employee(None)
+        self.province_var.set("All")
+        for entry in (self.date_from_entry, self.date_to_entry, self.min_gross_entry, self.max_gross_entry):
+            entry.delete(0, tk.END)
+        self.source.set_filters({})
+        self.load_records()
+
+    def show_summary(self, summary):
+        """Show record count and totals."""
+        self.summary = summary
+        if summary['count'] > 0:
             self.summary_label.config(
-                text=f"Total Records: {count} | Gross: ${total_gross:.2f} | "
-                     f"Net: ${total_net:.2f} | CRA Remittance: ${total_cra_remittance:.2f}"
+                text=f"Total Records: {summary['count']} | Gross: ${summary['total_gross']:.2f} | "
+                     f"Net: ${summary['total_net']:.2f} | CRA Remittance: ${summary['total_cra_remittance']:.2f}"
             )
         else:
             self.summary_label.config(text="No records found")
 
+    def load_next_page(self):
+        """Fetch the next page of payroll records in the background."""
+        worker = self.controller.worker
+        if self.source.exhausted or worker.has_pending("records") or worker.has_pending("records.page"):
+            return
+        worker.submit(self.source.fetch_next, key="records.page",
+                      on_success=self.append_records, on_error=self.on_load_error)
+
+    def append_records(self, records):
+        """Append a page of payroll records to the table."""
+        self.source.accept(records)
+        for record in records:
+            self.insert_record("end", record)
+
+    def insert_record(self, index, record):
+        """Insert one payroll record row at index."""
+        self.items_by_employee.setdefault(record['employee_id'], []).append(str(record['id']))
+        self.tree.insert("", index, iid=str(record['id']), values=(
+            record['id'],
+            record['employee_name'],
+            record['pay_date'],
+            f"${record['gross']:.2f}",
+            f"${record['cpp_employee']:.2f}",
+            f"${record['ei_employee']:.2f}",
+            f"${record['federal_withholding']:.2f}",
+            f"${record['provincial_withholding']:.2f}",
+            f"${record['total_deductions']:.2f}",
+            f"${record['net']:.2f}"
+        ))
+
+    def on_run_saved(self, event):
+        """Insert a newly saved run at its sorted position and add it to the summary."""
+        if not self.loaded:
+            return
+        run = event.run
+        if not run_matches_filters(run, self.source.filters):
+            return
+        index = self.source.insert(run)
+        # Runs sorting after everything loaded so far arrive with a later page
+        if index is not None:
+            self.insert_record(index, run)
+        
+        summary = dict(self.summary)
+        summary['count'] += 1
+        summary['total_gross'] += run['gross']
+        summary['total_net'] += run['net']
+        summary['total_deductions'] += run['total_deductions']
+        summary['total_cra_remittance'] += (
+            run['cpp_employee'] + run['ei_employee'] + run['federal_withholding'] +
+            run['provincial_withholding'] + run['cpp_employer'] + run['ei_employer']
+        )
+        self.show_summary(summary)
+
+    def on_cycle_saved(self, event):
+        """A whole cycle was saved; reload the first page next time the frame is shown."""
+        self.stale = True
+
+    def on_employee_updated(self, event):
+        """Update the employee name on their loaded rows."""
+        if not self.loaded:
+            return
+        # A rename can reorder rows, and a province change can filter them in or out
+        if self.source.sort[0] == "employee_name" or self.source.filters.get('province'):
+            self.load_records()
+            return
+        for item_id in self.items_by_employee.get(event.employee['id'], []):
+            self.tree.set(item_id, "Employee", event.employee['name'])
+
+    def on_employee_deleted(self, event):
+        """Remove the employee's loaded rows and re-read the summary totals."""
+        if not self.loaded:
+            return
+        item_ids = self.items_by_employee.pop(event.employee_id, [])
+        if item_ids:
+            for item_id in item_ids:
+                self.source.remove(int(item_id))
+            self.tree.delete(*item_ids)
+        self.controller.worker.submit(get_payroll_runs_summary, self.source.filters, key="records.summary",
+                                      on_success=self.show_summary)
+
+    def on_load_error(self, e):
+        """Report a failed load."""
+        messagebox.showerror("Error", f"Failed to load payroll records: {str(e)}")
+
+    def on_tree_scroll(self, first, last):
+        """Update the scrollbar and fetch more rows when nearing the end of the loaded ones."""
+        self.scrollbar_y.set(first, last)
+        if float(last) >= 1.0 - PREFETCH_THRESHOLD:
+            self.load_next_page()
+
     def view_details(self):
         """View detailed information for selected record."""
         selection = self.tree.selection()
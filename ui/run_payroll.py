@@ -1,20 +1,144 @@
 # ui/run_payroll.py
+import string
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from logic.payroll_calc import compute_payroll
-from db.database import get_all_employees, add_payroll_run, get_employee, get_ytd_contributions
+from db.database import add_payroll_run, get_employee, get_ytd_contributions, get_payroll_run
 from ui.custom_button import CustomButton
+from ui.employee_picker import EmployeePicker
+from ui.events import PayrollRunSaved, PayrollCycleSaved
 from utils.validators import validate_gross_pay, validate_pay_period_count
 
+# Recalculate this long after the last change to the form
+RECALC_DEBOUNCE_MS = 150
+
+# Result layout. Each {field} is drawn as a separately tagged span of the output,
+# so a recalculation only rewrites the figures that changed.
+RESULT_TEMPLATE = """
+PAYROLL CALCULATION RESULTS
+{rule}
+
+Employee:          {employee_name}
+Province:          {province}
+Pay Date:          {pay_date}
+Pay Periods/Year:  {period_count}
+
+{rule}
+EARNINGS
+{rule}
+Gross Pay:                             ${gross:>10.2f}
+
+DEDUCTIONS
+{rule}
+CPP Employee Contribution:             ${cpp_employee:>10.2f}
+EI Employee Premium:                   ${ei_employee:>10.2f}
+Federal Income Tax:                    ${federal_withholding:>10.2f}
+Provincial Income Tax:                 ${provincial_withholding:>10.2f}
+{rule}
+Total Deductions:                      ${total_deductions:>10.2f}
+
+{rule}
+NET PAY:                               ${net:>10.2f}
+{rule}
+
+EMPLOYER COSTS
+{rule}
+CPP Employer Contribution:             ${cpp_employer:>10.2f}
+EI Employer Premium:                   ${ei_employer:>10.2f}
+Total Employer Cost:                   ${employer_cost:>10.2f}
+
+{rule}
+CRA REMITTANCE (Amount to Send to CRA)
+{rule}
+Employee CPP:                          ${cpp_employee:>10.2f}
+Employee EI:                           ${ei_employee:>10.2f}
+Federal Income Tax:                    ${federal_withholding:>10.2f}
+Provincial Income Tax:                 ${provincial_withholding:>10.2f}
+Employer CPP:                          ${cpp_employer:>10.2f}
+Employer EI:                           ${ei_employer:>10.2f}
+{rule}
+TOTAL CRA REMITTANCE:                  ${cra_remittance:>10.2f}
+{rule}
+
+{rule}
+YEAR-TO-DATE TRACKING
+{rule}
+YTD CPP (before this pay):             ${ytd_cpp:>10.2f}
+YTD EI (before this pay):              ${ytd_ei:>10.2f}
+YTD CPP (after this pay):              ${ytd_cpp_after:>10.2f}
+YTD EI (after this pay):               ${ytd_ei_after:>10.2f}
+
+{rule}
+⚠️  IMPORTANT TAX WITHHOLDING NOTICE
+{rule}
+Tax withholding is SIMPLIFIED and does NOT account for:
+- Basic Personal Amount (BPA)
+- TD1 claim codes or credits
+- CPP/EI deductions reducing taxable income
+
+This will result in OVER-WITHHOLDING of taxes.
+
+For CRA-compliant withholding, use:
+- CRA PDOC (Payroll Deductions Online Calculator)
+- T4127 tables with proper claim codes
+
+This tool is for estimation only. Verify actual
+withholding amounts before processing payroll.
+"""
+# (literal text, field name, format spec) segments of the layout, and the spec of each field
+RESULT_SEGMENTS = [segment[:3] for segment in string.Formatter().parse(RESULT_TEMPLATE)]
+FIELD_SPECS = {field: spec for _, field, spec in RESULT_SEGMENTS if field is not None}
+
+
+def fetch_pay_context(employee_id: int, pay_date: str):
+    """
+    Fetch the employee and their YTD contributions before pay_date. Runs on the background worker.
+    Returns (employee, ytd_data), or None if the employee no longer exists.
+    """
+    employee = get_employee(employee_id)
+    if not employee:
+        return None
+    return dict(employee), get_ytd_contributions(employee_id, pay_date)
+
+def result_figures(employee, ytd_data, result, pay_date, period_count) -> dict:
+    """Values for the RESULT_TEMPLATE fields."""
+    figures = dict(result)
+    figures.update(
+        rule='=' * 50,
+        employee_name=employee['name'],
+        province=employee['province'],
+        pay_date=pay_date,
+        period_count=period_count,
+        employer_cost=result['cpp_employer'] + result['ei_employer'],
+        cra_remittance=(result['cpp_employee'] + result['ei_employee'] + result['federal_withholding'] +
+                        result['provincial_withholding'] + result['cpp_employer'] + result['ei_employer']),
+        ytd_cpp=ytd_data['ytd_cpp'],
+        ytd_ei=ytd_data['ytd_ei'],
+    )
+    return figures
+
+def save_and_fetch_run(employee_id: int, pay_date: str, payroll_data: dict, period_count: int):
+    """Save a payroll run and return the saved row as a dict. Runs on the background worker."""
+    return dict(get_payroll_run(add_payroll_run(employee_id, pay_date, payroll_data, period_count)))
+
 class RunPayrollFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
+        # (employee_id, pay_date) the cached employee and YTD values were read for
+        self.context_key = None
+        self.context = None
+        # Text of each figure currently shown in the output, by field
+        self.shown_figures = {}
+        self._recalc_id = None
         self.create_widgets()
+        
+        controller.events.subscribe(PayrollRunSaved, self.on_payroll_saved)
+        controller.events.subscribe(PayrollCycleSaved, self.on_payroll_saved)
 
     def create_widgets(self):
         # Header
@@ -34,9 +158,9 @@ class RunPayrollFrame(tk.Frame):
         
         # Employee selection
         tk.Label(form, text="Select Employee:", font=("Arial", 11, "bold"), fg="#000000").grid(row=0, column=0, sticky="w", pady=5)
-        self.employee_var = tk.StringVar()
-        self.employee_combo = ttk.Combobox(form, textvariable=self.employee_var, state="readonly", width=30, font=("Arial", 11))
-        self.employee_combo.grid(row=0, column=1, pady=5, sticky="ew")
+        self.employee_picker = EmployeePicker(form, self.controller, width=30)
+        self.employee_picker.grid(row=0, column=1, pady=5, sticky="ew")
+        self.employee_picker.bind("<<EmployeeSelected>>", self.on_employee_selected)
         
         # Pay date - use dropdowns for better UX
         tk.Label(form, text="Pay Date:", font=("Arial", 11, "bold"), fg="#000000").grid(row=1, column=0, sticky="w", pady=5)
@@ -80,12 +204,18 @@ class RunPayrollFrame(tk.Frame):
                                          state="readonly", width=10, font=("Arial", 11))
         self.period_count.set("12")
         self.period_count.pack(side="left")
+        self.period_count.bind("<<ComboboxSelected>>", lambda event: self.schedule_recalc())
         tk.Label(period_frame, text="  (12=Monthly, 24=Semi-monthly, 26=Bi-weekly, 52=Weekly)", 
                 font=("Arial", 9), fg="#666666").pack(side="left")
         period_frame.columnconfigure(0, weight=1)
         
         form.columnconfigure(1, weight=1)
         
+        # Recalculate as the form changes
+        self.gross.bind("<KeyRelease>", lambda event: self.schedule_recalc())
+        for var in (self.year_var, self.month_var, self.day_var):
+            var.trace_add("write", lambda *args: self.schedule_recalc())
+        
         # Buttons frame
         btn_frame = tk.Frame(content)
         btn_frame.pack(fill="x", pady=(0, 15))
@@ -105,17 +235,27 @@ class RunPayrollFrame(tk.Frame):
                                  bg_color="#333333", padx=25, pady=10)
         clear_btn.pack(side="left", padx=5)
         
+        # Pay stubs button - custom label-based button
+        stubs_btn = CustomButton(btn_frame, text="Export Pay Stubs", command=self.export_pay_stubs,
+                                 bg_color="#6600cc", padx=25, pady=10)
+        stubs_btn.pack(side="left", padx=5)
+        
         # Results frame
         results_frame = tk.LabelFrame(content, text="Payroll Results", padx=15, pady=15, 
                                      font=("Arial", 12, "bold"), fg="#000000")
         results_frame.pack(fill="both", expand=True)
         
+        self.status_label = tk.Label(results_frame, text="Select an employee to see the calculation.",
+                                     font=("Arial", 10), fg="#666666", anchor="w")
+        self.status_label.pack(fill="x", pady=(0, 5))
+        
         self.output = tk.Text(results_frame, height=12, font=("Courier", 11), wrap="word", 
                              bg="#ffffff", fg="#000000", relief="solid", borderwidth=1)
         self.output.pack(fill="both", expand=True)
         
-        # Store last calculation
+        # Store last calculation and the inputs it was made for
         self.last_result = None
+        self.last_inputs = None
 
     def get_pay_date(self):
         """Get pay date in YYYY-MM-DD format from dropdowns."""
@@ -124,29 +264,8 @@ class RunPayrollFrame(tk.Frame):
         day = self.day_var.get()
         return f"{year}-{month}-{day}"
 
-    def refresh(self):
-        """Refresh employee list when frame is shown."""
-        self.refresh_employee_list()
-
-    def refresh_employee_list(self, silent=False):
-        """Refresh the employee dropdown list."""
-        employees = get_all_employees()
-        employee_names = [f"{emp['id']}: {emp['name']} ({emp['province']})" for emp in employees]
-        self.employee_combo['values'] = employee_names
-        if employee_names:
-            # Try to keep the same selection if it still exists
-            current_selection = self.employee_var.get()
-            if current_selection in employee_names:
-                self.employee_combo.set(current_selection)
-            else:
-                self.employee_combo.current(0)
-        else:
-            self.employee_var.set("")
-            if not silent:
-                messagebox.showinfo("No Employees", "No employees found. Please add employees first.")
-
     def compute(self):
-        """Calculate payroll deductions."""
+        """Calculate payroll deductions, re-reading the employee and YTD values."""
         try:
             gross = float(self.gross.get())
             period_count = int(self.period_count.get())
@@ -166,147 +285,205 @@ class RunPayrollFrame(tk.Frame):
             messagebox.showerror("Invalid Pay Period", error_msg)
             return
         
-        if not self.employee_var.get():
+        employee_id = self.employee_picker.get_employee_id()
+        if employee_id is None:
             messagebox.showerror("No Employee", "Please select an employee.")
             return
         
-        # Get employee ID from selection
-        employee_id = int(self.employee_var.get().split(":")[0])
-        employee = get_employee(employee_id)
+        pay_date = self.get_pay_date()
         
-        # Check if employee exists
-        if not employee:
-            messagebox.showerror("Employee Not Found", 
-                               "The selected employee no longer exists. Please refresh the employee list.")
+        # Validate pay date format
+        try:
+            datetime.strptime(pay_date, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Invalid Date", "Pay date must be in YYYY-MM-DD format.")
             return
         
-        province = employee['province']
+        self.invalidate_context()
+        self.recalculate()
+
+    def schedule_recalc(self):
+        """Recalculate once the form has stopped changing for RECALC_DEBOUNCE_MS."""
+        if self._recalc_id:
+            self.after_cancel(self._recalc_id)
+        self._recalc_id = self.after(RECALC_DEBOUNCE_MS, self.recalculate)
+
+    def read_inputs(self):
+        """
+        Read the form without prompting. Returns ((employee_id, pay_date, gross, period_count), None),
+        or (None, message) if the form isn't complete or valid yet.
+        """
+        employee_id = self.employee_picker.get_employee_id()
+        if employee_id is None:
+            return None, "Select an employee to see the calculation."
         
-        # Get YTD contributions for this employee up to the pay date
         pay_date = self.get_pay_date()
-        
-        # Validate pay date format
         try:
-            from datetime import datetime
             datetime.strptime(pay_date, "%Y-%m-%d")
         except ValueError:
-            messagebox.showerror("Invalid Date", "Pay date must be in YYYY-MM-DD format.")
+            return None, f"{pay_date} is not a valid pay date."
+        
+        try:
+            gross = float(self.gross.get())
+        except ValueError:
+            return None, "Enter a numeric gross pay."
+        is_valid, error_msg = validate_gross_pay(gross)
+        if not is_valid:
+            return None, error_msg
+        
+        period_count = int(self.period_count.get())
+        return (employee_id, pay_date, gross, period_count), None
+
+    def recalculate(self):
+        """
+        Recalculate from the form. The employee and YTD values are read in the background
+        only when the employee or pay date changed; otherwise this is a pure calculation.
+        """
+        self._recalc_id = None
+        inputs, message = self.read_inputs()
+        if inputs is None:
+            # Don't leave the previous deductions on screen next to input they don't match
+            self.clear_output()
+            self.status_label.config(text=message)
             return
         
-        ytd_data = get_ytd_contributions(employee_id, pay_date)
+        employee_id, pay_date, gross, period_count = inputs
+        if self.context_key != (employee_id, pay_date):
+            self.clear_output()
+            self.status_label.config(text="Calculating...")
+            self.controller.worker.submit(fetch_pay_context, employee_id, pay_date, key="run.context",
+                                          on_success=lambda context: self.on_context_loaded(employee_id, pay_date, context),
+                                          on_error=self.on_context_error)
+            return
         
-        # Calculate payroll with YTD tracking
-        result = compute_payroll(gross, province, period_count, 
+        employee, ytd_data = self.context
+        result = compute_payroll(gross, employee['province'], period_count, 
                                 ytd_cpp=ytd_data['ytd_cpp'], 
                                 ytd_ei=ytd_data['ytd_ei'])
         self.last_result = result
-        
-        # Display results
-        self.output.delete("1.0", "end")
-        output_text = f"""
-PAYROLL CALCULATION RESULTS
-{'='*50}
-
-Employee:          {employee['name']}
-Province:          {province}
-Pay Date:          {self.get_pay_date()}
-Pay Periods/Year:  {period_count}
+        self.last_inputs = (employee_id, pay_date, period_count)
+        self.status_label.config(text="")
+        self.show_figures(result_figures(employee, ytd_data, result, pay_date, period_count))
 
-{'='*50}
-EARNINGS
-{'='*50}
-Gross Pay:                             ${result['gross']:>10.2f}
-
-DEDUCTIONS
-{'='*50}
-CPP Employee Contribution:             ${result['cpp_employee']:>10.2f}
-EI Employee Premium:                   ${result['ei_employee']:>10.2f}
-Federal Income Tax:                    ${result['federal_withholding']:>10.2f}
-Provincial Income Tax:                 ${result['provincial_withholding']:>10.2f}
-{'='*50}
-Total Deductions:                      ${result['total_deductions']:>10.2f}
-
-{'='*50}
-NET PAY:                               ${result['net']:>10.2f}
-{'='*50}
+    def on_context_loaded(self, employee_id, pay_date, context):
+        """Cache the employee and YTD values read by fetch_pay_context() and recalculate."""
+        if context is None:
+            self.clear_output()
+            self.status_label.config(text="The selected employee no longer exists.")
+            return
+        self.context_key = (employee_id, pay_date)
+        self.context = context
+        self.recalculate()
 
-EMPLOYER COSTS
-{'='*50}
-CPP Employer Contribution:             ${result['cpp_employer']:>10.2f}
-EI Employer Premium:                   ${result['ei_employer']:>10.2f}
-Total Employer Cost:                   ${result['cpp_employer'] + result['ei_employer']:>10.2f}
+    def on_context_error(self, e):
+        """Report a failed read of the employee and YTD values in place of the calculation."""
+        self.clear_output()
+        self.status_label.config(text=f"Failed to load the employee and YTD values: {str(e)}")
 
-{'='*50}
-CRA REMITTANCE (Amount to Send to CRA)
-{'='*50}
-Employee CPP:                          ${result['cpp_employee']:>10.2f}
-Employee EI:                           ${result['ei_employee']:>10.2f}
-Federal Income Tax:                    ${result['federal_withholding']:>10.2f}
-Provincial Income Tax:                 ${result['provincial_withholding']:>10.2f}
-Employer CPP:                          ${result['cpp_employer']:>10.2f}
-Employer EI:                           ${result['ei_employer']:>10.2f}
-{'='*50}
-TOTAL CRA REMITTANCE:                  ${result['cpp_employee'] + result['ei_employee'] + result['federal_withholding'] + result['provincial_withholding'] + result['cpp_employer'] + result['ei_employer']:>10.2f}
-{'='*50}
-
-{'='*50}
-YEAR-TO-DATE TRACKING
-{'='*50}
-YTD CPP (before this pay):             ${ytd_data['ytd_cpp']:>10.2f}
-YTD EI (before this pay):              ${ytd_data['ytd_ei']:>10.2f}
-YTD CPP (after this pay):              ${result['ytd_cpp_after']:>10.2f}
-YTD EI (after this pay):               ${result['ytd_ei_after']:>10.2f}
+    def invalidate_context(self):
+        """Drop the cached employee and YTD values so the next calculation re-reads them."""
+        self.context_key = None
+        self.context = None
 
-{'='*50}
-⚠️  IMPORTANT TAX WITHHOLDING NOTICE
-{'='*50}
-Tax withholding is SIMPLIFIED and does NOT account for:
-- Basic Personal Amount (BPA)
-- TD1 claim codes or credits
-- CPP/EI deductions reducing taxable income
+    def on_employee_selected(self, event):
+        """Recalculate for a newly picked employee, or for the same one after it was edited."""
+        employee = self.employee_picker.get_employee()
+        if employee is None:
+            self.clear_output()
+        elif self.context and self.context_key[0] == employee['id']:
+            # Same employee with a new name or province; the YTD values still hold
+            self.context = (employee, self.context[1])
+        self.schedule_recalc()
 
-This will result in OVER-WITHHOLDING of taxes.
+    def on_payroll_saved(self, event):
+        """Saved runs change YTD values; re-read them for the next calculation."""
+        if self.context_key:
+            self.invalidate_context()
+            self.schedule_recalc()
 
-For CRA-compliant withholding, use:
-- CRA PDOC (Payroll Deductions Online Calculator)
-- T4127 tables with proper claim codes
+    def show_figures(self, figures):
+        """Show the calculation, rewriting only the figures that changed since the last one."""
+        if not self.shown_figures:
+            self.output.delete("1.0", "end")
+            for literal, field, spec in RESULT_SEGMENTS:
+                self.output.insert("end", literal)
+                if field is not None:
+                    text = format(figures[field], spec)
+                    self.output.insert("end", text, (f"figure.{field}",))
+                    self.shown_figures[field] = text
+            return
+        
+        for field, old_text in list(self.shown_figures.items()):
+            text = format(figures[field], FIELD_SPECS[field])
+            if text == old_text:
+                continue
+            # A field can appear more than once; replace from the end so earlier indexes stay valid
+            ranges = self.output.tag_ranges(f"figure.{field}")
+            for start, end in reversed(list(zip(ranges[0::2], ranges[1::2]))):
+                self.output.delete(start, end)
+                self.output.insert(start, text, (f"figure.{field}",))
+            self.shown_figures[field] = text
 
-This tool is for estimation only. Verify actual
-withholding amounts before processing payroll.
-"""
-        self.output.insert("1.0", output_text)
+    def clear_output(self):
+        """Clear the results."""
+        self.output.delete("1.0", "end")
+        self.shown_figures = {}
+        self.last_result = None
+        self.last_inputs = None
 
     def save_run(self):
         """Save the payroll run to the database."""
+        # Apply any edit still waiting for its recalculation
+        if self._recalc_id:
+            self.after_cancel(self._recalc_id)
+            self.recalculate()
+        
         if not self.last_result:
             messagebox.showerror("No Calculation", "Please calculate payroll first before saving.")
             return
         
-        if not self.employee_var.get():
-            messagebox.showerror("No Employee", "Please select an employee.")
-            return
-        
-        try:
-            employee_id = int(self.employee_var.get().split(":")[0])
-            pay_date = self.get_pay_date()
-            period_count = int(self.period_count.get())
-            
-            # Validate date format
-            try:
-                datetime.strptime(pay_date, "%Y-%m-%d")
-            except ValueError:
-                messagebox.showerror("Invalid Date", "Please enter date in YYYY-MM-DD format.")
-                return
-            
-            run_id = add_payroll_run(employee_id, pay_date, self.last_result, period_count)
-            messagebox.showinfo("Success", f"Payroll run saved successfully! (ID: {run_id})")
-            
-        except ValueError as e:
+        employee_id, pay_date, period_count = self.last_inputs
+        self.controller.worker.submit(save_and_fetch_run, employee_id, pay_date, self.last_result, period_count,
+                                      on_success=self.on_run_saved, on_error=self.on_save_error, cancellable=False)
+
+    def on_run_saved(self, run):
+        """Confirm a saved payroll run."""
+        messagebox.showinfo("Success", f"Payroll run saved successfully! (ID: {run['id']})")
+        self.controller.events.publish(PayrollRunSaved(run))
+
+    def on_save_error(self, e):
+        """Report a failed save."""
+        if isinstance(e, ValueError):
             # This catches duplicate payroll run errors from the database
             messagebox.showerror("Duplicate Payroll Run", str(e))
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"Failed to save payroll run: {str(e)}")
 
+    def export_pay_stubs(self):
+        """Write pay stubs for every payroll run saved on the selected pay date."""
+        pay_date = self.get_pay_date()
+        try:
+            datetime.strptime(pay_date, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Invalid Date", "Please select a valid pay date.")
+            return
+        
+        directory = filedialog.askdirectory(title=f"Save pay stubs for {pay_date}")
+        if not directory:
+            return
+        
+        # Imported here: it pulls in zipfile and the process pool, which the first screen doesn't need
+        from logic.pay_stub_generator import generate_pay_stubs
+
+        def on_done(count):
+            if count:
+                messagebox.showinfo("Success", f"{count} pay stub(s) for {pay_date} saved to:\n{directory}")
+            else:
+                messagebox.showinfo("No Records", f"No payroll runs found for {pay_date}.")
+        
+        self.controller.worker.submit(generate_pay_stubs, pay_date, directory, on_success=on_done, cancellable=False,
+                                      on_error=lambda e: messagebox.showerror("Error", f"Failed to generate pay stubs: {str(e)}"))
+
     def clear_form(self):
         """Clear the form and results."""
         self.gross.delete(0, tk.END)
@@ -321,5 +498,5 @@ withholding amounts before processing payroll.
                  "07-Jul", "08-Aug", "09-Sep", "10-Oct", "11-Nov", "12-Dec"]
         self.month_var.set(months[current_month - 1])
         self.day_var.set(str(current_day).zfill(2))
-        self.output.delete("1.0", "end")
-        self.last_result = None
+        self.clear_output()
+        self.schedule_recalc()
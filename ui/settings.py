@@ -124,9 +124,13 @@ class SettingsFrame(tk.Frame):
 
     def load_settings(self):
         """Load company settings from database."""
+        self.controller.worker.submit(get_company_settings, key="settings.load",
+                                      on_success=self.show_settings,
+                                      on_error=lambda e: messagebox.showerror("Error", f"Failed to load settings: {str(e)}"))
+
+    def show_settings(self, settings):
+        """Fill the form with the loaded company settings."""
         try:
-            settings = get_company_settings()
-            
             self.company_name.delete(0, tk.END)
             self.company_name.insert(0, settings['company_name'])
             
@@ -178,7 +182,8 @@ class SettingsFrame(tk.Frame):
             else:
                 freq = 12
             
-            update_company_settings(
+            self.controller.worker.submit(
+                update_company_settings,
                 company_name=company_name,
                 business_number=self.business_number.get().strip(),
                 address_street=self.address_street.get().strip(),
@@ -188,10 +193,11 @@ class SettingsFrame(tk.Frame):
                 phone=self.phone.get().strip(),
                 email=self.email.get().strip(),
                 payroll_account=self.payroll_account.get().strip(),
-                default_pay_frequency=freq
+                default_pay_frequency=freq,
+                on_success=lambda _: messagebox.showinfo("Success", "Company settings saved successfully!"),
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to save settings: {str(e)}"),
+                cancellable=False
             )
             
-            messagebox.showinfo("Success", "Company settings saved successfully!")
-            
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
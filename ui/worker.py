@@ -0,0 +1,151 @@
+# ui/worker.py
+"""
+Background worker that owns database and calculation work for the Tk UI.
+Jobs run one at a time on a single daemon thread. Results are handed back to
+the Tk event loop by polling a result queue with after(), so widgets are only
+ever touched from the UI thread.
+"""
+import queue
+import threading
+
+# How often the UI thread checks for finished jobs while work is pending
+POLL_INTERVAL_MS = 25
+
+
+class Job:
+    """A queued unit of background work. Cancelled jobs are skipped, or their result dropped."""
+    def __init__(self, func, args, kwargs, on_success, on_error, key, cancellable=True):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_success = on_success
+        self.on_error = on_error
+        self.key = key
+        self.cancellable = cancellable
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancel the job. Its callbacks will not be called."""
+        if self.cancellable:
+            self.cancelled = True
+
+
+class BackgroundWorker:
+    """
+    Single background thread with a request queue.
+    submit() is called from the UI thread; on_success/on_error callbacks
+    are called back on the UI thread through widget.after().
+    """
+    def __init__(self, widget, on_busy_change=None):
+        self.widget = widget
+        self.on_busy_change = on_busy_change
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        # Only touched from the UI thread
+        self._pending = []
+        self._latest_by_key = {}
+        self._poll_scheduled = False
+        # (busy, can_cancel) as last reported to on_busy_change
+        self._busy = (False, False)
+        self._thread = threading.Thread(target=self._run, name="payroll-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, on_success=None, on_error=None, key=None, cancellable=True, **kwargs):
+        """
+        Queue func(*args, **kwargs) to run on the worker thread.
+        Submitting a job with the same key as a still-pending one cancels the older job,
+        so repeated refreshes of the same screen only deliver the latest result.
+        Jobs submitted with cancellable=False always run and always report back; every write
+        (saves, deletes, exports) must be submitted that way, so Esc can't drop its result.
+        Returns the Job, which can be cancelled.
+        """
+        if key is not None and key in self._latest_by_key:
+            self._latest_by_key[key].cancel()
+        job = Job(func, args, kwargs, on_success, on_error, key, cancellable)
+        if key is not None:
+            self._latest_by_key[key] = job
+        self._pending.append(job)
+        self._requests.put(job)
+        self._update_busy()
+        self._schedule_poll()
+        return job
+
+    def cancel(self, key=None):
+        """Cancel pending jobs with the given key, or every pending job if key is None."""
+        for job in self._pending:
+            if key is None or job.key == key:
+                job.cancel()
+        self._update_busy()
+
+    def has_pending(self, key) -> bool:
+        """True while a job with the given key is queued or running and not cancelled."""
+        job = self._latest_by_key.get(key)
+        return job is not None and not job.cancelled
+
+    def is_busy(self) -> bool:
+        """True while any job that hasn't been cancelled is queued or running."""
+        return any(not job.cancelled for job in self._pending)
+
+    def can_cancel(self) -> bool:
+        """True while a job that cancel() would stop is queued or running."""
+        return any(job.cancellable and not job.cancelled for job in self._pending)
+
+    def stop(self):
+        """Stop the worker thread once the queued jobs have run."""
+        self._requests.put(None)
+
+    def _run(self):
+        """Worker thread loop."""
+        while True:
+            job = self._requests.get()
+            if job is None:
+                break
+            if job.cancelled:
+                self._results.put((job, None, None))
+                continue
+            try:
+                result = job.func(*job.args, **job.kwargs)
+                self._results.put((job, result, None))
+            except Exception as e:
+                self._results.put((job, None, e))
+
+    def _schedule_poll(self):
+        if not self._poll_scheduled:
+            self._poll_scheduled = True
+            self.widget.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        """Deliver finished jobs to their callbacks on the UI thread."""
+        self._poll_scheduled = False
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.remove(job)
+            if self._latest_by_key.get(job.key) is job:
+                del self._latest_by_key[job.key]
+            if job.cancelled:
+                continue
+            try:
+                if error is not None:
+                    if job.on_error:
+                        job.on_error(error)
+                    else:
+                        raise error
+                elif job.on_success:
+                    job.on_success(result)
+            except Exception as e:
+                # Same reporting as an exception raised from any other Tk callback
+                self.widget._root().report_callback_exception(type(e), e, e.__traceback__)
+
+        if self._pending:
+            self._schedule_poll()
+        self._update_busy()
+
+    def _update_busy(self):
+        busy = (self.is_busy(), self.can_cancel())
+        if busy != self._busy:
+            self._busy = busy
+            if self.on_busy_change:
+                self.on_busy_change(busy[0])
@@ -0,0 +1,257 @@
+# utils/profiling.py
+"""
+Opt-in timing of the payroll hot paths.
+enable() wraps every db.database function, the payroll calculations and
+generate_t4_html with timers and call counters, and can also run cProfile or a
+stack sampler over the whole run. Nothing is wrapped until enable() is called,
+so there is no cost when profiling is off.
+
+Set PAYROLL_PROFILE=1 (timers only), cprofile or sample, and optionally
+PAYROLL_PROFILE_JSON=path, to get a report on stderr when the program exits.
+The command line also takes --profile and --profile-json.
+"""
+import atexit
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+
+MODES = ("timers", "cprofile", "sample")
+# Seconds between stack samples in "sample" mode
+SAMPLE_INTERVAL = 0.005
+# Rows shown in each section of the report
+REPORT_ROWS = 20
+# Only names bound in these packages are rewired to the timed functions
+_PACKAGES = ("db", "logic", "ui", "payroll", "utils", "__main__", "main")
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}
+_originals = []
+_state = {"mode": None, "started": None, "profiler": None, "sampler": None}
+
+
+def _record(name, elapsed, self_time):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = [0, 0.0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += self_time
+        if elapsed > stats[3]:
+            stats[3] = elapsed
+
+
+def _timed(name, func):
+    """Wrap func so each call records its total time and its time outside other timed calls."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = _local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            child_time = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            _record(name, elapsed, elapsed - child_time)
+    return wrapper
+
+
+def _targets():
+    """Return [(owner, attribute, label)] for everything that gets a timer."""
+    from db import database
+    from logic import payroll_calc, t4_generator
+    targets = [(database, name, f"db.{name}") for name, value in vars(database).items()
+               if inspect.isfunction(value) and value.__module__ == database.__name__ and not name.startswith("_")]
+    targets += [
+        (payroll_calc, "compute_payroll", "calc.compute_payroll"),
+        (payroll_calc, "compute_payroll_batch", "calc.compute_payroll_batch"),
+        (payroll_calc.RateContext, "compute", "calc.RateContext.compute"),
+        (t4_generator, "generate_t4_html", "t4.generate_t4_html"),
+    ]
+    return targets
+
+
+def _rebind(original, replacement):
+    """Point names imported with "from module import name" at the replacement."""
+    for module_name, module in list(sys.modules.items()):
+        if module is None or module_name.split(".")[0] not in _PACKAGES:
+            continue
+        for attribute, value in list(vars(module).items()):
+            if value is original:
+                setattr(module, attribute, replacement)
+                _originals.append((module, attribute, original))
+
+
+def enable(mode: str = "timers"):
+    """Start profiling: install the timers, plus cProfile or the sampler for those modes."""
+    if mode not in MODES:
+        raise ValueError(f"Profiling mode must be one of: {', '.join(MODES)}")
+    if _state["mode"]:
+        return
+    for owner, attribute, label in _targets():
+        original = getattr(owner, attribute)
+        wrapped = _timed(label, original)
+        setattr(owner, attribute, wrapped)
+        _originals.append((owner, attribute, original))
+        if not inspect.isclass(owner):
+            _rebind(original, wrapped)
+
+    _state["mode"] = mode
+    _state["started"] = time.perf_counter()
+    if mode == "cprofile":
+        import cProfile
+        import pstats  # noqa: F401 - loaded now so the import isn't profiled
+        _state["profiler"] = cProfile.Profile()
+        _state["profiler"].enable()
+    elif mode == "sample":
+        _state["sampler"] = _Sampler(threading.get_ident())
+        _state["sampler"].start()
+
+
+def disable():
+    """Stop profiling and put the original functions back. Collected numbers are kept."""
+    _stop_profilers()
+    for owner, attribute, original in reversed(_originals):
+        setattr(owner, attribute, original)
+    _originals.clear()
+    _state["mode"] = None
+
+
+def _stop_profilers():
+    if _state["profiler"]:
+        _state["profiler"].disable()
+    if _state["sampler"] and _state["sampler"].is_alive():
+        _state["sampler"].stop()
+
+
+def is_enabled() -> bool:
+    return _state["mode"] is not None
+
+
+class _Sampler(threading.Thread):
+    """Counts which functions are on one thread's stack every SAMPLE_INTERVAL."""
+    def __init__(self, thread_id):
+        super().__init__(name="payroll-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.samples = 0
+        self.leaf = {}
+        self.inclusive = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                if leaf:
+                    self.leaf[key] = self.leaf.get(key, 0) + 1
+                    leaf = False
+                if key not in seen:
+                    seen.add(key)
+                    self.inclusive[key] = self.inclusive.get(key, 0) + 1
+                frame = frame.f_back
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def get_report() -> dict:
+    """Collected numbers as a JSON-ready dict."""
+    with _lock:
+        stats = {name: list(values) for name, values in _stats.items()}
+    report = {
+        "mode": _state["mode"],
+        "wall_seconds": round(time.perf_counter() - _state["started"], 4) if _state["started"] else 0.0,
+        "functions": [
+            {"name": name, "calls": calls, "total_ms": round(total * 1000, 3), "self_ms": round(self_time * 1000, 3),
+             "mean_us": round(total / calls * 1e6, 2), "max_ms": round(longest * 1000, 3)}
+            for name, (calls, total, self_time, longest) in sorted(stats.items(), key=lambda item: -item[1][2])
+        ],
+    }
+    if _state["profiler"]:
+        import pstats
+        profile = pstats.Stats(_state["profiler"])
+        entries = sorted(profile.stats.items(), key=lambda item: -item[1][3])[:REPORT_ROWS]
+        report["cprofile"] = [
+            {"function": f"{func} ({os.path.basename(filename)}:{line})", "calls": calls,
+             "self_s": round(self_time, 4), "cumulative_s": round(cumulative, 4)}
+            for (filename, line, func), (_, calls, self_time, cumulative, _) in entries
+        ]
+    if _state["sampler"]:
+        sampler = _state["sampler"]
+        report["samples"] = {
+            "count": sampler.samples,
+            "interval_ms": SAMPLE_INTERVAL * 1000,
+            "leaf": [{"function": key, "samples": count}
+                     for key, count in sorted(sampler.leaf.items(), key=lambda item: -item[1])[:REPORT_ROWS]],
+            "inclusive": [{"function": key, "samples": count}
+                          for key, count in sorted(sampler.inclusive.items(), key=lambda item: -item[1])[:REPORT_ROWS]],
+        }
+    return report
+
+
+def format_report(report: dict = None) -> str:
+    """Format a report as tables: timed functions by self time, then the cProfile or sample summary."""
+    report = report or get_report()
+    lines = [f"PROFILE ({report['mode'] or 'stopped'}, {report['wall_seconds'] * 1000:.1f} ms wall)", "=" * 90,
+             f"{'Function':<40}{'Calls':>8}{'Total ms':>11}{'Self ms':>11}{'Mean us':>10}{'Max ms':>10}"]
+    for row in report["functions"]:
+        lines.append(f"{row['name'][:39]:<40}{row['calls']:>8}{row['total_ms']:>11.1f}{row['self_ms']:>11.1f}"
+                     f"{row['mean_us']:>10.1f}{row['max_ms']:>10.2f}")
+    if "cprofile" in report:
+        lines += ["", f"{'cProfile (by cumulative time)':<64}{'Calls':>8}{'Self s':>9}{'Cum s':>9}"]
+        for row in report["cprofile"]:
+            lines.append(f"{row['function'][:63]:<64}{row['calls']:>8}{row['self_s']:>9.3f}{row['cumulative_s']:>9.3f}")
+    if "samples" in report:
+        samples = report["samples"]
+        lines += ["", f"Stack samples: {samples['count']} every {samples['interval_ms']:g} ms",
+                  f"{'Function (on the stack)':<72}{'Samples':>9}"]
+        for row in samples["inclusive"]:
+            lines.append(f"{row['function'][:71]:<72}{row['samples']:>9}")
+    return "\n".join(lines)
+
+
+def write_json(path: str, report: dict = None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report or get_report(), f, indent=2)
+
+
+def finish(json_path: str = None):
+    """Stop profiling, print the report to stderr and write it as JSON if json_path is given."""
+    if not is_enabled():
+        return
+    # Stop collecting first, so building the report isn't part of the profile
+    _stop_profilers()
+    report = get_report()
+    disable()
+    print(format_report(report), file=sys.stderr)
+    if json_path:
+        write_json(json_path, report)
+
+
+def enable_from_env() -> bool:
+    """
+    Start profiling if PAYROLL_PROFILE is set, reporting at exit (and to PAYROLL_PROFILE_JSON).
+    Returns True if profiling was started.
+    """
+    value = os.environ.get("PAYROLL_PROFILE", "")
+    if value in ("", "0"):
+        return False
+    enable("timers" if value == "1" else value)
+    atexit.register(finish, os.environ.get("PAYROLL_PROFILE_JSON") or None)
+    return True
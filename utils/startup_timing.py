@@ -0,0 +1,42 @@
+# utils/startup_timing.py
+"""
+Startup timing marks for the desktop app.
+Import this module first; times are measured from that import.
+Set PAYROLL_STARTUP_REPORT=1 to print the report once the first screen is shown,
+and PAYROLL_EXIT_AFTER_STARTUP=1 to close the app right after (for benchmarks).
+"""
+import os
+import time
+
+_START = time.perf_counter()
+_marks = []
+
+
+def mark(label: str):
+    """Record the time since startup for a named step."""
+    _marks.append((label, time.perf_counter() - _START))
+
+
+def get_marks() -> list:
+    """Return [(label, seconds_since_start)] in the order they were recorded."""
+    return list(_marks)
+
+
+def format_report() -> str:
+    """Format the recorded marks as a table with cumulative and per-step times."""
+    lines = ["STARTUP TIMING", "=" * 50, f"{'Step':<30}{'Total ms':>10}{'Step ms':>10}"]
+    previous = 0.0
+    for label, elapsed in _marks:
+        lines.append(f"{label:<30}{elapsed * 1000:>10.1f}{(elapsed - previous) * 1000:>10.1f}")
+        previous = elapsed
+    return "\n".join(lines)
+
+
+def report_enabled() -> bool:
+    """True if the startup report was requested via PAYROLL_STARTUP_REPORT."""
+    return os.environ.get("PAYROLL_STARTUP_REPORT", "") not in ("", "0")
+
+
+def exit_requested() -> bool:
+    """True if the app should close once the first screen is shown (PAYROLL_EXIT_AFTER_STARTUP)."""
+    return os.environ.get("PAYROLL_EXIT_AFTER_STARTUP", "") not in ("", "0")